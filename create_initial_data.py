@@ -1,13 +1,37 @@
 #!/usr/bin/env python
+import argparse
+import contextlib
+import io
 import os
+import random
 import sys
+from datetime import timedelta
+
 import django
 
 # Configurar Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_base.settings')
 django.setup()
 
-from model_students.models import Grade, Admin
+from django.db import transaction
+from django.utils import timezone
+
+from model_students.models import (
+    Grade, Admin, Teacher, Student, Course, Evaluation, Punctuation, UserIdentity
+)
+from model_students.counters import reconcile_counters
+from model_students.directory import rebuild_directory_index
+from model_students.stats import rebuild_stats
+
+# Datos de ejemplo para el generador de pruebas de rendimiento
+FIRST_NAMES = ['José', 'María', 'Luis', 'Ana', 'Carlos', 'Lucía', 'Ángel', 'Sofía', 'Andrés', 'Valentina',
+               'Jesús', 'Camila', 'Miguel', 'Daniela', 'Raúl', 'Gabriela', 'Iván', 'Mónica', 'Ramón', 'Inés']
+LAST_NAMES = ['Álvarez', 'Castillo', 'Romero', 'González', 'Rodríguez', 'Pérez', 'Hernández', 'Martínez',
+              'García', 'López', 'Díaz', 'Sánchez', 'Ramírez', 'Núñez', 'Muñoz', 'Peña', 'Ibáñez', 'Suárez']
+COURSE_NAMES = ['Matemáticas', 'Lenguaje', 'Ciencias Naturales', 'Ciencias Sociales', 'Inglés',
+                'Educación Física', 'Arte', 'Música', 'Informática', 'Historia', 'Geografía', 'Química']
+EVALUATION_TYPES = ['Examen', 'Taller', 'Exposición', 'Tarea', 'Proyecto']
+
 
 def create_initial_data():
     # Crear grados básicos
@@ -19,7 +43,7 @@ def create_initial_data():
         {'name': 'Quinto Grado', 'level': 5, 'description': 'Quinto año de educación primaria'},
         {'name': 'Sexto Grado', 'level': 6, 'description': 'Sexto año de educación primaria'},
     ]
-    
+
     for grade_data in grades_data:
         grade, created = Grade.objects.get_or_create(
             level=grade_data['level'],
@@ -32,7 +56,7 @@ def create_initial_data():
             print(f"Grado creado: {grade.name}")
         else:
             print(f"Grado ya existe: {grade.name}")
-    
+
     # Crear administrador por defecto
     admin, created = Admin.objects.get_or_create(
         username='admin',
@@ -45,12 +69,161 @@ def create_initial_data():
             'password': 'admin123'
         }
     )
-    
+
     if created:
         print(f"Administrador creado: {admin.username}")
     else:
         print(f"Administrador ya existe: {admin.username}")
 
+
+def create_benchmark_data(grades=6, teachers=30, courses_per_grade=8, students=5000,
+                          evaluations_per_course=10, seed=42, batch_size=5000, verbose=True):
+    """Crea un colegio sintético para pruebas de rendimiento.
+
+    Cada estudiante recibe una nota en cada evaluación de las materias de su
+    grado, así que el total de notas es students * courses_per_grade *
+    evaluations_per_course. Los datos son reproducibles con la misma semilla.
+    Como bulk_create no dispara señales, aquí también se llenan las tablas
+    que normalmente mantienen los receptores.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    def log(message):
+        if verbose:
+            print(message)
+
+    def person(prefix, number):
+        first = rng.choice(FIRST_NAMES)
+        last = f'{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}'
+        username = f'{prefix}{number:06d}'
+        return {
+            'ci': f'{prefix.upper()}{number:06d}',
+            'username': username,
+            'name': first,
+            'last_name': last,
+            'email': f'{username}@bench.thinkit.edu',
+            'password': 'bench123',
+        }
+
+    with transaction.atomic():
+        with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+            create_initial_data()
+
+        for level in range(1, grades + 1):
+            Grade.objects.get_or_create(level=level, defaults={'name': f'Grado {level}'})
+
+        teacher_objs = [Teacher(**person('bt', i)) for i in range(1, teachers + 1)]
+        Teacher.objects.bulk_create(teacher_objs, batch_size=batch_size)
+        log(f'Profesores creados: {len(teacher_objs)}')
+
+        student_objs = []
+        for i in range(1, students + 1):
+            data = person('bs', i)
+            data['grade'] = (i - 1) % grades + 1
+            student_objs.append(Student(**data))
+        Student.objects.bulk_create(student_objs, batch_size=batch_size)
+        log(f'Estudiantes creados: {len(student_objs)}')
+
+        # bulk_create no dispara señales: registrar identidades directamente
+        UserIdentity.objects.bulk_create(
+            [UserIdentity(ci=u.ci, username=u.username, email=u.email, user_type='teacher') for u in teacher_objs] +
+            [UserIdentity(ci=u.ci, username=u.username, email=u.email, user_type='student') for u in student_objs],
+            batch_size=batch_size
+        )
+
+        # Cada profesor recibe un bloque contiguo de materias (normalmente de un solo grado)
+        course_objs = []
+        total_courses = grades * courses_per_grade
+        for level in range(1, grades + 1):
+            for index in range(courses_per_grade):
+                name = COURSE_NAMES[index % len(COURSE_NAMES)]
+                if index >= len(COURSE_NAMES):
+                    name = f'{name} {index // len(COURSE_NAMES) + 1}'
+                course_objs.append(Course(
+                    name_course=name,
+                    description='Materia generada para pruebas de rendimiento',
+                    grade=level,
+                    teacher=teacher_objs[len(course_objs) * len(teacher_objs) // total_courses] if teacher_objs else None,
+                ))
+        Course.objects.bulk_create(course_objs, batch_size=batch_size)
+        course_objs = list(Course.objects.filter(description='Materia generada para pruebas de rendimiento'))
+        log(f'Materias creadas: {len(course_objs)}')
+
+        evaluation_objs = []
+        for course in course_objs:
+            for index in range(evaluations_per_course):
+                # Dos tercios en el pasado y un tercio en el futuro
+                offset = rng.randint(-120, 60)
+                evaluation_objs.append(Evaluation(
+                    date=now + timedelta(days=offset),
+                    subject=f'Evaluación {index + 1}',
+                    type=rng.choice(EVALUATION_TYPES),
+                    course=course,
+                ))
+        Evaluation.objects.bulk_create(evaluation_objs, batch_size=batch_size)
+        evaluation_objs = list(Evaluation.objects.filter(course__in=course_objs).values_list('id', 'course__grade'))
+        log(f'Evaluaciones creadas: {len(evaluation_objs)}')
+
+        students_by_grade = {}
+        for student in student_objs:
+            students_by_grade.setdefault(student.grade, []).append(student.ci)
+
+        created = 0
+        batch = []
+        for evaluation_id, grade in evaluation_objs:
+            for ci in students_by_grade.get(grade, []):
+                batch.append(Punctuation(
+                    evaluation_id=evaluation_id,
+                    student_id=ci,
+                    score=round(rng.uniform(4, 20), 2),
+                ))
+                if len(batch) >= batch_size:
+                    Punctuation.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+        if batch:
+            Punctuation.objects.bulk_create(batch)
+            created += len(batch)
+        log(f'Notas creadas: {created}')
+
+        log(f'Estadísticas por materia: {rebuild_stats()}')
+        log(f'Contadores del dashboard: {reconcile_counters()}')
+        log(f'Directorio de búsqueda: {rebuild_directory_index()} personas')
+
+    return {
+        'grades': grades,
+        'teachers': len(teacher_objs),
+        'students': len(student_objs),
+        'courses': len(course_objs),
+        'evaluations': len(evaluation_objs),
+        'punctuations': created,
+    }
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Crea los datos iniciales (y opcionalmente un colegio sintético)')
+    parser.add_argument('--benchmark', action='store_true', help='Crear datos sintéticos para pruebas de rendimiento')
+    parser.add_argument('--grades', type=int, default=6)
+    parser.add_argument('--teachers', type=int, default=30)
+    parser.add_argument('--courses-per-grade', type=int, default=8)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--evaluations-per-course', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
 if __name__ == '__main__':
-    create_initial_data()
-    print("Datos iniciales creados exitosamente!")
\ No newline at end of file
+    args = parse_args(sys.argv[1:])
+    if args.benchmark:
+        create_benchmark_data(
+            grades=args.grades,
+            teachers=args.teachers,
+            courses_per_grade=args.courses_per_grade,
+            students=args.students,
+            evaluations_per_course=args.evaluations_per_course,
+            seed=args.seed,
+        )
+    else:
+        create_initial_data()
+    print("Datos iniciales creados exitosamente!")
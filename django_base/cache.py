@@ -0,0 +1,42 @@
+"""Configuración de la caché a partir de variables de entorno.
+
+CACHE_BACKEND=locmem (por defecto) usa memoria local de cada proceso.
+CACHE_BACKEND=file guarda en disco (CACHE_LOCATION, por defecto BASE_DIR/cache),
+compartido entre los procesos del mismo servidor.
+CACHE_BACKEND=redis usa cualquier servidor con protocolo Redis (Redis, Valkey,
+KeyDB...) en CACHE_LOCATION; requiere pip install redis.
+CACHE_TIMEOUT fija el TTL por defecto en segundos.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+from .database import env_int
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+DEFAULT_REDIS_LOCATION = 'redis://127.0.0.1:6379/1'
+
+
+def cache_config(base_dir, environ):
+    """Devuelve CACHES['default'] según CACHE_BACKEND"""
+    backend = environ.get('CACHE_BACKEND', 'locmem').strip().lower()
+    if backend not in CACHE_BACKENDS:
+        raise ImproperlyConfigured(f'CACHE_BACKEND no soportado: {backend!r} (use locmem, file o redis)')
+
+    config = {
+        'BACKEND': CACHE_BACKENDS[backend],
+        'TIMEOUT': env_int(environ, 'CACHE_TIMEOUT', 300),
+        'KEY_PREFIX': environ.get('CACHE_KEY_PREFIX', 'colegio'),
+    }
+    if backend == 'locmem':
+        config['LOCATION'] = 'gestion-colegio'
+        config['OPTIONS'] = {'MAX_ENTRIES': env_int(environ, 'CACHE_MAX_ENTRIES', 10000)}
+    elif backend == 'file':
+        config['LOCATION'] = environ.get('CACHE_LOCATION') or base_dir / 'cache'
+        config['OPTIONS'] = {'MAX_ENTRIES': env_int(environ, 'CACHE_MAX_ENTRIES', 10000)}
+    else:
+        config['LOCATION'] = environ.get('CACHE_LOCATION') or DEFAULT_REDIS_LOCATION
+    return config
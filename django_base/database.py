@@ -0,0 +1,89 @@
+"""Configuración de la base de datos a partir de variables de entorno.
+
+DB_ENGINE=sqlite (por defecto) usa db.sqlite3 en BASE_DIR o DB_NAME, y aplica
+los pragmas de SQLITE_PRAGMAS a cada conexión nueva.
+DB_ENGINE=postgresql usa DB_NAME, DB_USER, DB_PASSWORD, DB_HOST y DB_PORT, con
+conexiones persistentes (DB_CONN_MAX_AGE, DB_CONN_HEALTH_CHECKS) o un pool
+de psycopg 3 (DB_POOL=1, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT).
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+POSTGRESQL_ENGINE = 'django.db.backends.postgresql'
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on', 'si', 'sí')
+
+
+def env_bool(environ, name, default=False):
+    value = environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.strip().lower() in TRUE_VALUES
+
+
+def env_int(environ, name, default):
+    value = environ.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ImproperlyConfigured(f'{name} debe ser un número entero (valor: {value!r})')
+
+
+def sqlite_init_command(pragmas):
+    """PRAGMA nombre=valor separados por ';' (Django los ejecuta al abrir cada conexión)"""
+    for name, value in pragmas.items():
+        if not name.isidentifier() or not str(value).lstrip('-').isalnum():
+            raise ImproperlyConfigured(f'Pragma de SQLite inválido: {name}={value!r}')
+    return ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items())
+
+
+def sqlite_config(base_dir, environ, pragmas=None):
+    config = {
+        'ENGINE': SQLITE_ENGINE,
+        'NAME': environ.get('DB_NAME') or base_dir / 'db.sqlite3',
+        'OPTIONS': {},
+    }
+    if pragmas:
+        config['OPTIONS']['init_command'] = sqlite_init_command(pragmas)
+        # BEGIN IMMEDIATE: las transacciones toman el bloqueo de escritura al empezar y
+        # esperan busy_timeout, en lugar de fallar al pasar de lectura a escritura
+        config['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+    return config
+
+
+def postgresql_config(environ):
+    config = {
+        'ENGINE': POSTGRESQL_ENGINE,
+        'NAME': environ.get('DB_NAME', 'gestion_colegio'),
+        'USER': environ.get('DB_USER', ''),
+        'PASSWORD': environ.get('DB_PASSWORD', ''),
+        'HOST': environ.get('DB_HOST', 'localhost'),
+        'PORT': environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': env_int(environ, 'DB_CONN_MAX_AGE', 60),
+        'CONN_HEALTH_CHECKS': env_bool(environ, 'DB_CONN_HEALTH_CHECKS', True),
+        'OPTIONS': {},
+    }
+    if environ.get('DB_SSLMODE'):
+        config['OPTIONS']['sslmode'] = environ['DB_SSLMODE']
+
+    if env_bool(environ, 'DB_POOL'):
+        # Con pool las conexiones las administra psycopg; Django exige CONN_MAX_AGE = 0
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': env_int(environ, 'DB_POOL_MIN_SIZE', 2),
+            'max_size': env_int(environ, 'DB_POOL_MAX_SIZE', 10),
+            'timeout': env_int(environ, 'DB_POOL_TIMEOUT', 10),
+        }
+    return config
+
+
+def database_config(base_dir, environ, sqlite_pragmas=None):
+    """Devuelve DATABASES['default'] según DB_ENGINE"""
+    engine = environ.get('DB_ENGINE', 'sqlite').strip().lower()
+    if engine in ('sqlite', 'sqlite3'):
+        return sqlite_config(base_dir, environ, sqlite_pragmas)
+    if engine in ('postgres', 'postgresql'):
+        return postgresql_config(environ)
+    raise ImproperlyConfigured(f'DB_ENGINE no soportado: {engine!r} (use sqlite o postgresql)')
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .cache import cache_config
+from .database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,12 +46,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'pages.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'pages.middleware.SchoolUserMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -55,7 +61,7 @@ ROOT_URLCONF = 'django_base.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'pages.template_backend.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,12 +79,36 @@ WSGI_APPLICATION = 'django_base.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# SQLite por defecto; DB_ENGINE=postgresql para producción (ver django_base/database.py)
+
+# Pragmas aplicados a cada conexión de SQLite (vacío = valores por defecto de SQLite)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',      # Lectores y un escritor en paralelo
+    'busy_timeout': 5000,       # ms de espera ante un bloqueo antes de "database is locked"
+    'synchronous': 'NORMAL',    # Seguro con WAL y mucho más rápido que FULL
+    'mmap_size': 134217728,     # 128 MB de lectura por memoria mapeada
+    'cache_size': -20000,       # Negativo = KiB (unos 20 MB por conexión)
+    'temp_store': 'MEMORY',
+}
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR, os.environ, SQLITE_PRAGMAS),
+}
+
+# Caché: CACHE_BACKEND=locmem (por defecto), file o redis (ver django_base/cache.py)
+CACHES = {
+    'default': cache_config(BASE_DIR, os.environ),
+}
+
+# Caché de datos de dashboards y listados (pages/view_cache.py)
+# TIMEOUTS: TTL en segundos por vista; las escrituras invalidan antes de que venza
+VIEW_CACHE = {
+    'ENABLED': True,
+    'TIMEOUT': 300,
+    'TIMEOUTS': {
+        'dashboard': 60,        # Incluye "próximas evaluaciones", que dependen de la hora
+        'admin_dashboard': 60,
+    },
 }
 
 
@@ -134,3 +164,59 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Login settings
 LOGIN_URL = '/'
 LOGIN_REDIRECT_URL = '/dashboard/'
+
+# Pruebas: el ejecutor desactiva el buffer de logs (se escriben directamente) y lo
+# detiene antes de borrar la base de prueba
+TEST_RUNNER = 'django_base.test_runner.TestRunner'
+
+# Buffer de logs del sistema (utils/logger.py)
+# OVERFLOW: drop_new, drop_oldest, block o sync
+SYSTEM_LOG_BUFFER = {
+    'ENABLED': True,
+    'MAX_SIZE': 10000,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2.0,
+    'OVERFLOW': 'drop_oldest',
+}
+
+# Política de registro de actividad (utils/logger.py)
+# CREATE, UPDATE, DELETE, BACKUP y RESTORE se registran siempre
+SYSTEM_LOG_POLICY = {
+    'DISABLED_ACTIONS': [],
+    'SAMPLE_RATES': {'home': 0.1},
+    'DEDUPE_ACTIONS': ['VIEW'],
+    'DEDUPE_WINDOW': 300,
+}
+
+# Archivo de logs del sistema (model_students/log_archive.py)
+# Los logs más antiguos que RETENTION_DAYS pasan a log_archive/ con: python manage.py archive_system_logs
+SYSTEM_LOG_ARCHIVE = {
+    'RETENTION_DAYS': 90,
+    'DIRECTORY': BASE_DIR / 'log_archive',
+    'BATCH_SIZE': 5000,
+}
+
+# Respaldos de la base de datos (pages/backup.py)
+# COMPRESSION: none, gzip o zstd (zstd requiere pip install zstandard)
+DATABASE_BACKUP = {
+    'COMPRESSION': 'gzip',
+    'PAGES_PER_STEP': 1024,
+    'KEEP_SAFETY_COPIES': 3,
+}
+
+# Procesos para generar boletines por lotes (0 o 1 = en el mismo proceso)
+REPORT_CARD_WORKERS = 4
+
+# Métricas de consultas y tiempos por vista (pages/metrics.py)
+# QUERY_BUDGETS: máximo de consultas por nombre de URL; al superarlo se registra un warning
+VIEW_METRICS = {
+    'ENABLED': True,
+    'WINDOW': 500,
+    'DEFAULT_QUERY_BUDGET': None,
+    'QUERY_BUDGETS': {
+        'dashboard': 15,
+        'teacher_subjects': 15,
+        'generate_student_report': 15,
+        'manage_users': 15,
+    },
+}
@@ -0,0 +1,26 @@
+"""Ejecutor de pruebas del proyecto"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Sin hilo ni cola: cada log se escribe al momento en la base de prueba
+        self.log_buffer_settings = override_settings(
+            SYSTEM_LOG_BUFFER={**getattr(settings, 'SYSTEM_LOG_BUFFER', {}), 'ENABLED': False}
+        )
+        self.log_buffer_settings.enable()
+
+    def teardown_databases(self, old_config, **kwargs):
+        # Los logs encolados (pruebas que activan el buffer) deben escribirse en la
+        # base de prueba, no en la real al salir
+        from utils.logger import stop_log_buffer
+
+        stop_log_buffer()
+        super().teardown_databases(old_config, **kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        self.log_buffer_settings.disable()
+        super().teardown_test_environment(**kwargs)
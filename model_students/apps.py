@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ModelStudentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'model_students'
+
+    def ready(self):
+        from . import signals  # Registrar receptores de señales
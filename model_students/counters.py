@@ -0,0 +1,66 @@
+"""Contadores de estudiantes, profesores, materias y grados para el dashboard.
+
+Las señales suman o restan 1 al crear o eliminar un registro, así que leerlos
+cuesta una consulta sin importar el tamaño de las tablas. Las escrituras que no
+disparan señales (bulk_create, SQL directo) los desajustan:
+reconcile_counters los vuelve a calcular (comando reconcile_counters, pensado
+para ejecutarse periódicamente).
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Student, Teacher, Course, Grade, SchoolCounter
+
+COUNTED_MODELS = {
+    'students': Student,
+    'teachers': Teacher,
+    'courses': Course,
+    'grades': Grade,
+}
+
+COUNTER_NAMES = {model: name for name, model in COUNTED_MODELS.items()}
+
+
+def add_to_counter(name, delta):
+    """Suma delta al contador (actualización atómica en la base, sin leer el valor)"""
+    updated = SchoolCounter.objects.filter(name=name).update(value=F('value') + delta, updated_at=timezone.now())
+    if not updated:
+        reconcile_counters([name])
+
+
+def get_counters():
+    """Valores de todos los contadores en una sola consulta"""
+    counters = dict(SchoolCounter.objects.values_list('name', 'value'))
+    missing = [name for name in COUNTED_MODELS if name not in counters]
+    if missing:
+        counters.update(reconcile_counters(missing))
+    return counters
+
+
+def reconcile_counters(names=None):
+    """Recalcula los contadores con COUNT(*); devuelve {nombre: valor}.
+
+    La fila del contador se bloquea antes de contar: un incremento concurrente
+    espera y se aplica sobre el valor nuevo, o ya está incluido en el conteo.
+    """
+    values = {}
+    for name in names or COUNTED_MODELS:
+        with transaction.atomic():
+            counter, _ = SchoolCounter.objects.select_for_update().get_or_create(name=name)
+            counter.value = COUNTED_MODELS[name].objects.count()
+            counter.updated_at = timezone.now()
+            counter.save(update_fields=['value', 'updated_at'])
+            values[name] = counter.value
+    return values
+
+
+def find_counter_mismatches():
+    """Compara los contadores con COUNT(*); devuelve [(nombre, guardado, esperado)]"""
+    stored = dict(SchoolCounter.objects.values_list('name', 'value'))
+    mismatches = []
+    for name, model in COUNTED_MODELS.items():
+        expected = model.objects.count()
+        if stored.get(name) != expected:
+            mismatches.append((name, stored.get(name), expected))
+    return mismatches
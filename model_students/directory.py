@@ -0,0 +1,205 @@
+"""Directorio de personas: búsqueda de texto sobre estudiantes y profesores.
+
+SQLite: tabla FTS5 propia (people_fts) con índice de prefijos, sin acentos y
+ordenada por relevancia (bm25). Cada fila se copia de Student o Teacher y se
+identifica por (user_type, ci), sin depender del registro de identidades. Se
+mantiene con los receptores de signals.py; las escrituras que no disparan señales
+(bulk_create, update) deben llamar a rebuild_directory_index (comando
+rebuild_directory_index).
+PostgreSQL: ILIKE con índices GIN de trigramas sobre nombre y apellido, creados
+por la migración 0016 (con la extensión pg_trgm).
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .log_query import fts_query
+from .models import Student, Teacher
+
+DIRECTORY_TABLE = 'people_fts'
+
+# Columnas con texto buscable; user_type y grade solo se guardan para filtrar
+DIRECTORY_COLUMNS = ['name', 'last_name', 'ci', 'username', 'email']
+NAME_COLUMNS = ['name', 'last_name']
+
+# Peso de cada columna en bm25 (mismo orden que DIRECTORY_COLUMNS)
+RANK_WEIGHTS = (10.0, 10.0, 5.0, 2.0, 1.0)
+
+AUTOCOMPLETE_LIMIT = 10
+
+DIRECTORY_MODELS = {'student': Student, 'teacher': Teacher}
+
+# prefix='1 2 3': las primeras letras que se escriben en el autocompletado se
+# resuelven con el índice de prefijos en lugar de recorrer todos los términos
+SQLITE_DIRECTORY_TABLE = f"""CREATE VIRTUAL TABLE IF NOT EXISTS {DIRECTORY_TABLE} USING fts5(
+    name, last_name, ci, username, email, user_type UNINDEXED, grade UNINDEXED,
+    tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+)"""
+
+SQLITE_DIRECTORY_INSERT = f"""INSERT INTO {DIRECTORY_TABLE}(name, last_name, ci, username, email, user_type, grade)
+    SELECT person.name, person.last_name, person.ci, person.username, person.email, %s, {{grade}}
+    FROM {{table}} person"""
+
+
+def insert_people(cursor, user_type, where='', params=()):
+    """Copia al índice las personas de un tipo (todas o las que cumplen where)"""
+    model = DIRECTORY_MODELS[user_type]
+    sql = SQLITE_DIRECTORY_INSERT.format(
+        table=model._meta.db_table,
+        grade='person.grade' if user_type == 'student' else 'NULL',
+    )
+    cursor.execute(sql + where, [user_type, *params])
+    return cursor.rowcount
+
+
+def ensure_directory_index(db=connection):
+    """Crea el índice FTS5 del directorio si falta (y lo llena); se llama después de cada migrate.
+
+    Devuelve True si hubo que crearlo. En PostgreSQL los índices son de la migración.
+    """
+    if db.vendor != 'sqlite':
+        return False
+    with db.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [DIRECTORY_TABLE])
+        if cursor.fetchone():
+            return False
+        cursor.execute(SQLITE_DIRECTORY_TABLE)
+        for user_type in DIRECTORY_MODELS:
+            insert_people(cursor, user_type)
+        return True
+
+
+def rebuild_directory_index(db=connection):
+    """Vacía el índice y lo vuelve a llenar desde las tablas; devuelve cuántas personas quedaron"""
+    if db.vendor != 'sqlite':
+        return 0
+    with db.cursor() as cursor:
+        cursor.execute(SQLITE_DIRECTORY_TABLE)
+        cursor.execute(f"DELETE FROM {DIRECTORY_TABLE}")
+        return sum(insert_people(cursor, user_type) for user_type in DIRECTORY_MODELS)
+
+
+def find_directory_mismatches(db=connection):
+    """Cantidad de personas en las tablas y en el índice, por tipo, cuando no coinciden"""
+    if db.vendor != 'sqlite':
+        return []
+    with db.cursor() as cursor:
+        cursor.execute(f"SELECT user_type, COUNT(*) FROM {DIRECTORY_TABLE} GROUP BY user_type")
+        indexed = dict(cursor.fetchall())
+    mismatches = []
+    for user_type, model in DIRECTORY_MODELS.items():
+        expected = model.objects.count()
+        if indexed.get(user_type, 0) != expected:
+            mismatches.append((user_type, indexed.get(user_type, 0), expected))
+    return mismatches
+
+
+def index_person(user_type, person, db=connection):
+    """Agrega o actualiza a la persona en el índice"""
+    if db.vendor != 'sqlite' or user_type not in DIRECTORY_MODELS:
+        return
+    unindex_person(user_type, person.ci, db)
+    with db.cursor() as cursor:
+        insert_people(cursor, user_type, ' WHERE person.ci = %s', [person.ci])
+
+
+def unindex_person(user_type, ci, db=connection):
+    """Quita a la persona del índice"""
+    if db.vendor != 'sqlite' or user_type not in DIRECTORY_MODELS:
+        return
+    sql = f"SELECT rowid FROM {DIRECTORY_TABLE} WHERE ci = %s AND user_type = %s"
+    params = [ci, user_type]
+    # Buscar la cédula con el índice (frase con sus palabras) en lugar de recorrer la tabla
+    words = re.findall(r'\w+', ci)
+    if words:
+        sql += f" AND {DIRECTORY_TABLE} MATCH %s"
+        params.append(f'ci : "{" ".join(words)}"')
+    with db.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {DIRECTORY_TABLE} WHERE rowid IN ({sql})", params)
+
+
+def match_query(text, columns=None):
+    """Consulta FTS5 con cada palabra como prefijo, opcionalmente limitada a unas columnas.
+
+    La palabra completa también se busca sola para que bm25 ponga primero a "José"
+    que a "Josefina" cuando se escribe "jose".
+    """
+    query = ' AND '.join(f'({term[:-1]} OR {term})' for term in fts_query(text).split())
+    if query and columns:
+        return f'{{{" ".join(columns)}}} : ({query})'
+    return query
+
+
+def search_directory(query, user_type=None, grade=None, limit=None):
+    """Filas (user_type, ci, nombre, apellido, grado) que cumplen la consulta FTS5, de la más relevante a la menos.
+
+    bm25 se calcula para todas las coincidencias (con un prefijo común como "mar" son
+    miles) y SQLite solo conserva las `limit` mejores mientras ordena.
+    """
+    sql = f"""SELECT user_type, ci, name, last_name, grade
+        FROM {DIRECTORY_TABLE} WHERE {DIRECTORY_TABLE} MATCH %s"""
+    params = [query]
+    if user_type:
+        sql += ' AND user_type = %s'
+        params.append(user_type)
+    if grade is not None:
+        sql += ' AND grade = %s'
+        params.append(grade)
+    sql += f' ORDER BY bm25({DIRECTORY_TABLE}, {", ".join(map(str, RANK_WEIGHTS))})'
+    if limit:
+        sql += ' LIMIT %s'
+        params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def autocomplete(text, user_type=None, grade=None, limit=AUTOCOMPLETE_LIMIT):
+    """Sugerencias para lo que se está escribiendo: "jose nu" encuentra a José Núñez"""
+    if connection.vendor != 'sqlite':
+        return fallback_autocomplete(text, user_type, grade, limit)
+    query = match_query(text)
+    if not query:
+        return []
+    return [
+        {'user_type': row[0], 'ci': row[1], 'name': row[2], 'last_name': row[3], 'grade': row[4]}
+        for row in search_directory(query, user_type, grade, limit)
+    ]
+
+
+def fallback_search(queryset, name='', ci=''):
+    """Búsqueda sin FTS5 (PostgreSQL): cada palabra en el nombre o el apellido, y la cédula"""
+    for word in name.split():
+        queryset = queryset.filter(Q(name__icontains=word) | Q(last_name__icontains=word))
+    if ci:
+        queryset = queryset.filter(ci__icontains=ci)
+    return queryset.order_by('name', 'last_name')
+
+
+def fallback_autocomplete(text, user_type, grade, limit):
+    results = []
+    for model_type, model in DIRECTORY_MODELS.items():
+        if (user_type and model_type != user_type) or (grade is not None and model is not Student):
+            continue
+        people = model.objects.filter(grade=grade) if grade is not None else model.objects.all()
+        for person in fallback_search(people, text)[:limit]:
+            results.append({
+                'user_type': model_type, 'ci': person.ci, 'name': person.name,
+                'last_name': person.last_name, 'grade': getattr(person, 'grade', None),
+            })
+    return results[:limit]
+
+
+def search_students(grade, name='', ci=''):
+    """Estudiantes de un grado que coinciden con el nombre y la cédula, ordenados por relevancia"""
+    students = Student.objects.filter(grade=grade)
+    if connection.vendor != 'sqlite':
+        return list(fallback_search(students, name, ci))
+    query = ' AND '.join(filter(None, [match_query(name, NAME_COLUMNS), match_query(ci, ['ci'])]))
+    if not query:
+        return list(students.order_by('name', 'last_name'))
+
+    ranked = [row[1] for row in search_directory(query, 'student', grade)]
+    by_ci = students.in_bulk(ranked)
+    return [by_ci[ci] for ci in ranked if ci in by_ci]
@@ -0,0 +1,148 @@
+"""Archivo de logs del sistema: los registros más antiguos que RETENTION_DAYS salen
+de la tabla SystemLog a archivos mensuales JSONL comprimidos con gzip.
+
+Cada archivo queda registrado en SystemLogArchive; el visor de logs los lee bajo
+demanda. Los archivos no forman parte del respaldo de la base de datos.
+"""
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SystemLog, SystemLogArchive
+
+# Configuración por defecto (se puede sobreescribir con SYSTEM_LOG_ARCHIVE en settings.py)
+DEFAULT_ARCHIVE_SETTINGS = {
+    'RETENTION_DAYS': 90,     # Días que los logs quedan en la tabla
+    'DIRECTORY': None,        # Por defecto BASE_DIR / 'log_archive'
+    'BATCH_SIZE': 5000,       # Filas leídas por consulta al archivar
+}
+
+LOG_FIELDS = ['id', 'timestamp', 'user_type', 'user_id', 'user_name', 'action', 'description', 'ip_address']
+
+
+def get_archive_settings():
+    config = dict(DEFAULT_ARCHIVE_SETTINGS)
+    config.update(getattr(settings, 'SYSTEM_LOG_ARCHIVE', {}))
+    if config['DIRECTORY'] is None:
+        config['DIRECTORY'] = settings.BASE_DIR / 'log_archive'
+    return config
+
+
+def archive_path(file_name):
+    return os.path.join(get_archive_settings()['DIRECTORY'], file_name)
+
+
+def month_range(value):
+    """Inicio del mes de value (hora local) y del mes siguiente"""
+    start = timezone.localtime(value).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def encode_log(row):
+    row = dict(row)
+    row['timestamp'] = row['timestamp'].isoformat()
+    return json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def decode_log(line):
+    data = json.loads(line)
+    data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+    return SystemLog(**data)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def archive_range(start, end, directory, batch_size):
+    """Escribe los logs de [start, end) en un archivo y los borra de la tabla.
+
+    El archivo se completa antes de tocar la tabla; el registro en SystemLogArchive y
+    el borrado van en la misma transacción. Solo se borran filas con id <= al mayor
+    id escrito, por si llegan logs nuevos con fecha vieja mientras tanto.
+    """
+    logs = SystemLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    file_name = f"systemlog_{start:%Y-%m}_{timezone.now():%Y%m%d%H%M%S}.jsonl.gz"
+    path = os.path.join(directory, file_name)
+    partial = path + '.part'
+
+    rows = 0
+    max_id = first = last = None
+    try:
+        with gzip.open(partial, 'wt', encoding='utf-8') as f:
+            for row in logs.order_by('timestamp', 'id').values(*LOG_FIELDS).iterator(chunk_size=batch_size):
+                f.write(encode_log(row))
+                rows += 1
+                max_id = row['id'] if max_id is None else max(max_id, row['id'])
+                first = first or row['timestamp']
+                last = row['timestamp']
+        if not rows:
+            os.remove(partial)
+            return None
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    with transaction.atomic():
+        archive = SystemLogArchive.objects.create(
+            month=start.date(),
+            file_name=file_name,
+            rows=rows,
+            first_timestamp=first,
+            last_timestamp=last,
+            sha256=file_sha256(path),
+        )
+        logs.filter(id__lte=max_id).delete()
+    return archive
+
+
+def archive_logs(before=None):
+    """Archiva por meses los logs anteriores a before (por defecto hoy - RETENTION_DAYS)"""
+    config = get_archive_settings()
+    if before is None:
+        before = timezone.now() - timedelta(days=config['RETENTION_DAYS'])
+    os.makedirs(config['DIRECTORY'], exist_ok=True)
+
+    archives = []
+    while True:
+        oldest = SystemLog.objects.filter(timestamp__lt=before).order_by('timestamp').values_list('timestamp', flat=True).first()
+        if oldest is None:
+            return archives
+        start, end = month_range(oldest)
+        archive = archive_range(start, min(end, before), config['DIRECTORY'], config['BATCH_SIZE'])
+        if archive is None:
+            return archives
+        archives.append(archive)
+
+
+def pending_archive_count(before=None):
+    """Cuántos logs se archivarían con la configuración actual"""
+    if before is None:
+        before = timezone.now() - timedelta(days=get_archive_settings()['RETENTION_DAYS'])
+    return SystemLog.objects.filter(timestamp__lt=before).count()
+
+
+def archived_months():
+    """Meses con archivos, del más reciente al más antiguo"""
+    return list(SystemLogArchive.objects.order_by('-month').values_list('month', flat=True).distinct())
+
+
+def iter_archived_logs(month):
+    """SystemLog (sin guardar) de los archivos de un mes, en orden cronológico"""
+    for archive in SystemLogArchive.objects.filter(month=month).order_by('first_timestamp'):
+        with gzip.open(archive_path(archive.file_name), 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield decode_log(line)
@@ -0,0 +1,251 @@
+"""Filtros, búsqueda de texto y paginación por cursor (keyset) de los logs del sistema.
+
+Se usan en el visor de logs y en la exportación, tanto sobre la tabla SystemLog
+como sobre los meses archivados (log_archive).
+"""
+import ipaddress
+import re
+import unicodedata
+from collections import deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+LOG_PAGE_SIZE = 100
+
+FILTER_FIELDS = ['user_type', 'action', 'user_id', 'ip_address', 'date_from', 'date_to', 'q']
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Búsqueda de texto en SystemLog (ver ensure_search_index):
+# SQLite: tabla FTS5 de contenido externo (no copia el texto) mantenida con triggers.
+# PostgreSQL: índices GIN de trigramas para description/user_name ILIKE '%texto%',
+# creados por la migración 0015 (con la extensión pg_trgm).
+FTS_TABLE = 'systemlog_fts'
+
+SQLITE_FTS_TABLE = f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    description, user_name,
+    content='model_students_systemlog', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)"""
+
+SQLITE_FTS_TRIGGERS = {
+    'systemlog_fts_insert': f"""CREATE TRIGGER systemlog_fts_insert AFTER INSERT ON model_students_systemlog BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description, user_name) VALUES (new.id, new.description, new.user_name);
+    END""",
+    'systemlog_fts_delete': f"""CREATE TRIGGER systemlog_fts_delete AFTER DELETE ON model_students_systemlog BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, user_name)
+        VALUES ('delete', old.id, old.description, old.user_name);
+    END""",
+    'systemlog_fts_update': f"""CREATE TRIGGER systemlog_fts_update AFTER UPDATE ON model_students_systemlog BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, user_name)
+        VALUES ('delete', old.id, old.description, old.user_name);
+        INSERT INTO {FTS_TABLE}(rowid, description, user_name) VALUES (new.id, new.description, new.user_name);
+    END""",
+}
+
+def ensure_search_index(db=connection):
+    """Crea el índice FTS5 de SQLite si falta; se llama después de cada migrate.
+
+    Django recrea la tabla al alterarla y eso borra los triggers: si falta alguno
+    se vuelven a crear y se reconstruye el índice desde la tabla. Devuelve True si
+    hubo que crear o reconstruir algo. En PostgreSQL los índices son de la migración.
+    """
+    if db.vendor != 'sqlite':
+        return False
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+            [FTS_TABLE + '%']
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in SQLITE_FTS_TRIGGERS if name not in existing]
+        if FTS_TABLE in existing and not missing:
+            return False
+        cursor.execute(SQLITE_FTS_TABLE)
+        for name in missing:
+            cursor.execute(SQLITE_FTS_TRIGGERS[name])
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        return True
+
+
+class LogFilterError(ValueError):
+    """Filtro de logs con un valor inválido"""
+
+
+def parse_date(value, label):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise LogFilterError(f'La fecha "{label}" debe tener el formato AAAA-MM-DD')
+
+
+def parse_log_filters(params):
+    """Filtros limpios a partir de request.GET (o de las opciones de un comando)"""
+    filters = {name: (params.get(name) or '').strip() for name in FILTER_FIELDS}
+    for name, label in (('date_from', 'Desde'), ('date_to', 'Hasta')):
+        if filters[name]:
+            filters[name] = parse_date(filters[name], label)
+    if filters['ip_address']:
+        try:
+            filters['ip_address'] = str(ipaddress.ip_address(filters['ip_address']))
+        except ValueError:
+            raise LogFilterError('La IP no es válida')
+    return filters
+
+
+def filter_query_string(filters):
+    """Filtros activos como parámetros de URL (para enlaces de paginación y exportación)"""
+    return {name: str(value) for name, value in filters.items() if value}
+
+
+def day_start(value):
+    return timezone.make_aware(datetime.combine(value, datetime.min.time()))
+
+
+def fts_query(text):
+    """Cada palabra como prefijo: "accedi gest" encuentra "Accedió a gestión ..." """
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def normalize_text(value):
+    """Minúsculas y sin acentos, igual que el tokenizador de la tabla FTS"""
+    value = unicodedata.normalize('NFKD', value.lower())
+    return ''.join(char for char in value if not unicodedata.combining(char))
+
+
+def search_logs(logs, text):
+    if connection.vendor == 'sqlite':
+        query = fts_query(text)
+        if not query:
+            return logs
+        return logs.filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query]))
+    # PostgreSQL: cada palabra en la descripción o en el usuario, como las columnas de
+    # la tabla FTS; ILIKE usa los índices GIN de trigramas
+    for word in re.findall(r'\w+', text):
+        logs = logs.filter(Q(description__icontains=word) | Q(user_name__icontains=word))
+    return logs
+
+
+def filter_logs(logs, filters):
+    """Aplica los filtros a un queryset de SystemLog"""
+    for name in ('user_type', 'action', 'user_id', 'ip_address'):
+        if filters.get(name):
+            logs = logs.filter(**{name: filters[name]})
+    if filters.get('date_from'):
+        logs = logs.filter(timestamp__gte=day_start(filters['date_from']))
+    if filters.get('date_to'):
+        logs = logs.filter(timestamp__lt=day_start(filters['date_to'] + timedelta(days=1)))
+    if filters.get('q'):
+        logs = search_logs(logs, filters['q'])
+    return logs
+
+
+def log_matches(log, filters):
+    """Lo mismo que filter_logs para un SystemLog leído de un archivo"""
+    for name in ('user_type', 'action', 'user_id', 'ip_address'):
+        if filters.get(name) and getattr(log, name) != filters[name]:
+            return False
+    if filters.get('date_from') and log.timestamp < day_start(filters['date_from']):
+        return False
+    if filters.get('date_to') and log.timestamp >= day_start(filters['date_to'] + timedelta(days=1)):
+        return False
+    if filters.get('q'):
+        text = normalize_text(f'{log.description} {log.user_name}')
+        words = re.findall(r'\w+', normalize_text(filters['q']))
+        # Prefijo de alguna palabra de la descripción o del usuario, como en la consulta FTS
+        tokens = re.findall(r'\w+', text)
+        if not all(any(token.startswith(word) for token in tokens) for word in words):
+            return False
+    return True
+
+
+def encode_cursor(log):
+    """Cursor "microsegundos-id" de la posición (timestamp, id) de un log"""
+    return f'{(log.timestamp - EPOCH) // timedelta(microseconds=1)}-{log.id}'
+
+
+def decode_cursor(value):
+    try:
+        micros, log_id = value.split('-')
+        return EPOCH + timedelta(microseconds=int(micros)), int(log_id)
+    except ValueError:
+        raise LogFilterError('Cursor de paginación inválido')
+
+
+def log_position(log):
+    return log.timestamp, log.id
+
+
+def page_logs(logs, after=None, before=None, limit=LOG_PAGE_SIZE):
+    """Una página de logs ordenados por (timestamp, id) descendente, sin OFFSET.
+
+    after: cursor del último log de la página anterior (ir a logs más antiguos).
+    before: cursor del primer log de la página siguiente (volver a logs más recientes).
+    Devuelve (logs, older_cursor, newer_cursor); los cursores son None si no hay más.
+    """
+    if before:
+        timestamp, log_id = decode_cursor(before)
+        # (timestamp, id) > cursor, escrito para que use el índice por timestamp
+        rows = list(
+            logs.filter(timestamp__gte=timestamp).exclude(timestamp=timestamp, id__lte=log_id)
+            .order_by('timestamp', 'id')[:limit + 1]
+        )
+        has_newer = len(rows) > limit
+        rows = rows[:limit][::-1]
+        has_older = True
+    else:
+        if after:
+            timestamp, log_id = decode_cursor(after)
+            # (timestamp, id) < cursor
+            logs = logs.filter(timestamp__lte=timestamp).exclude(timestamp=timestamp, id__gte=log_id)
+        rows = list(logs.order_by('-timestamp', '-id')[:limit + 1])
+        has_older = len(rows) > limit
+        rows = rows[:limit]
+        has_newer = bool(after)
+
+    if not rows:
+        return [], None, None
+    return (
+        rows,
+        encode_cursor(rows[-1]) if has_older else None,
+        encode_cursor(rows[0]) if has_newer else None,
+    )
+
+
+def page_archived_logs(logs, after=None, before=None, limit=LOG_PAGE_SIZE):
+    """page_logs para logs de un archivo (iterador en orden cronológico), con memoria acotada"""
+    if before:
+        cursor = decode_cursor(before)
+        rows = []
+        for log in logs:
+            if log_position(log) > cursor:
+                rows.append(log)
+                if len(rows) > limit:
+                    break
+        has_newer = len(rows) > limit
+        rows = rows[:limit][::-1]
+        has_older = True
+    else:
+        cursor = decode_cursor(after) if after else None
+        latest = deque(maxlen=limit + 1)
+        for log in logs:
+            if cursor is not None and log_position(log) >= cursor:
+                break
+            latest.append(log)
+        rows = list(latest)[::-1]
+        has_older = len(rows) > limit
+        rows = rows[:limit]
+        has_newer = bool(after)
+
+    if not rows:
+        return [], None, None
+    return (
+        rows,
+        encode_cursor(rows[-1]) if has_older else None,
+        encode_cursor(rows[0]) if has_newer else None,
+    )
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from model_students.log_archive import archive_logs, get_archive_settings, pending_archive_count
+
+
+class Command(BaseCommand):
+    help = 'Mueve los logs más antiguos que RETENTION_DAYS a archivos mensuales comprimidos (ejecutar con cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Días a conservar en la tabla (por defecto SYSTEM_LOG_ARCHIVE)')
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar los logs que se archivarían')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else get_archive_settings()['RETENTION_DAYS']
+        before = timezone.now() - timedelta(days=days)
+
+        if options['dry_run']:
+            self.stdout.write(f'{pending_archive_count(before)} logs anteriores a {before:%d/%m/%Y} para archivar')
+            return
+
+        archives = archive_logs(before)
+        for archive in archives:
+            self.stdout.write(f'{archive.file_name}: {archive.rows} registros')
+        total = sum(archive.rows for archive in archives)
+        self.stdout.write(self.style.SUCCESS(f'{total} logs archivados en {len(archives)} archivos'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from model_students.stats import find_stats_mismatches, rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la tabla StudentCourseStats desde las notas (o solo verifica con --check)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Solo comparar con las notas, sin modificar la tabla')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = find_stats_mismatches()
+            for student_id, course_id, stored, expected in mismatches[:50]:
+                self.stdout.write(f'Estudiante {student_id}, materia {course_id}: guardado {stored}, esperado {expected}')
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} estadísticas no coinciden con las notas')
+            self.stdout.write(self.style.SUCCESS('Las estadísticas coinciden con las notas'))
+            return
+
+        created = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(f'{created} estadísticas recalculadas'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from model_students.directory import find_directory_mismatches, rebuild_directory_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda del directorio de personas (o solo verifica con --check)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Solo comparar con las tablas, sin modificar el índice')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = find_directory_mismatches()
+            for user_type, indexed, expected in mismatches:
+                self.stdout.write(f'{user_type}: {indexed} en el índice, {expected} en la tabla')
+            if mismatches:
+                raise CommandError('El índice del directorio no coincide con las tablas')
+            self.stdout.write(self.style.SUCCESS('El índice del directorio coincide con las tablas'))
+            return
+
+        indexed = rebuild_directory_index()
+        self.stdout.write(self.style.SUCCESS(f'{indexed} personas indexadas'))
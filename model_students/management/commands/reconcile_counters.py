@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from model_students.counters import find_counter_mismatches, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores del dashboard con COUNT(*) (o solo verifica con --check); ejecutar periódicamente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Solo comparar con las tablas, sin modificar los contadores')
+
+    def handle(self, *args, **options):
+        mismatches = find_counter_mismatches()
+        for name, stored, expected in mismatches:
+            self.stdout.write(f'{name}: guardado {stored}, esperado {expected}')
+
+        if options['check']:
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} contadores no coinciden con las tablas')
+            self.stdout.write(self.style.SUCCESS('Los contadores coinciden con las tablas'))
+            return
+
+        values = reconcile_counters()
+        summary = ', '.join(f'{name}={value}' for name, value in values.items())
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados: {summary}'))
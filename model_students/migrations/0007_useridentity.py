@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:33
+
+from django.db import migrations, models
+
+
+def populate_identities(apps, schema_editor):
+    """Llena el registro con los usuarios existentes de las tres tablas"""
+    UserIdentity = apps.get_model('model_students', 'UserIdentity')
+    identities = []
+    for model_name, user_type in [('Admin', 'admin'), ('Teacher', 'teacher'), ('Student', 'student')]:
+        model = apps.get_model('model_students', model_name)
+        for ci, username, email in model.objects.values_list('ci', 'username', 'email'):
+            identities.append(UserIdentity(ci=ci, username=username, email=email, user_type=user_type))
+
+    # Si hay datos duplicados entre roles se conserva el primero
+    UserIdentity.objects.bulk_create(identities, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_students', '0006_systemlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserIdentity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ci', models.CharField(max_length=20, unique=True)),
+                ('username', models.CharField(max_length=50, unique=True)),
+                ('email', models.EmailField(max_length=80, unique=True)),
+                ('user_type', models.CharField(choices=[('student', 'Estudiante'), ('teacher', 'Profesor'), ('admin', 'Administrador')], max_length=20)),
+            ],
+            options={
+                'verbose_name': 'User Identity',
+                'verbose_name_plural': 'User Identities',
+            },
+        ),
+        migrations.RunPython(populate_identities, migrations.RunPython.noop),
+    ]
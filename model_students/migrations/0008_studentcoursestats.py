@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:43
+
+from decimal import Decimal
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Q, Sum
+
+
+def populate_stats(apps, schema_editor):
+    """Calcula las estadísticas de las notas existentes con una consulta agrupada"""
+    Punctuation = apps.get_model('model_students', 'Punctuation')
+    StudentCourseStats = apps.get_model('model_students', 'StudentCourseStats')
+    now = django.utils.timezone.now()
+    rows = Punctuation.objects.values('student_id', course_id=F('evaluation__course_id')).annotate(
+        count=Count('id'),
+        passed_count=Count('id', filter=Q(score__gte=10)),
+        total=Sum('score'),
+        min_score=Min('score'),
+        max_score=Max('score'),
+    ).order_by()
+    stats = []
+    for row in rows:
+        total = Decimal(row['total']).quantize(Decimal('0.01'))
+        stats.append(StudentCourseStats(
+            student_id=row['student_id'],
+            course_id=row['course_id'],
+            count=row['count'],
+            passed_count=row['passed_count'],
+            total=total,
+            average=(total / row['count']).quantize(Decimal('0.01')),
+            min_score=row['min_score'],
+            max_score=row['max_score'],
+            updated_at=now,
+        ))
+    StudentCourseStats.objects.bulk_create(stats, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_students', '0007_useridentity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentCourseStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('average', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('min_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('max_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_stats', to='model_students.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_stats', to='model_students.student')),
+            ],
+            options={
+                'verbose_name': 'Student Course Stats',
+                'verbose_name_plural': 'Student Course Stats',
+                'unique_together': {('student', 'course')},
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
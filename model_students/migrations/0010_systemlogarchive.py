@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_students', '0009_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('file_name', models.CharField(max_length=255, unique=True)),
+                ('rows', models.PositiveIntegerField()),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'System Log Archive',
+                'verbose_name_plural': 'System Log Archives',
+                'ordering': ['-month', '-first_timestamp'],
+                'indexes': [models.Index(fields=['month'], name='systemlogarchive_month_idx')],
+            },
+        ),
+    ]
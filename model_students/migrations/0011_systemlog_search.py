@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_students', '0010_systemlogarchive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='systemlog',
+            name='systemlog_timestamp_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='systemlog',
+            name='systemlog_type_ts_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='systemlog',
+            name='systemlog_action_ts_idx',
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['timestamp', 'id'], name='systemlog_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['user_type', 'timestamp', 'id'], name='systemlog_type_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['action', 'timestamp', 'id'], name='systemlog_action_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['user_id', 'timestamp', 'id'], name='systemlog_user_ts_idx'),
+        ),
+    ]
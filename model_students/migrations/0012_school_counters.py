@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    """Contadores iniciales con el total actual de cada tabla"""
+    SchoolCounter = apps.get_model('model_students', 'SchoolCounter')
+    for name, model_name in (('students', 'Student'), ('teachers', 'Teacher'), ('courses', 'Course'), ('grades', 'Grade')):
+        SchoolCounter.objects.create(name=name, value=apps.get_model('model_students', model_name).objects.count())
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_students', '0011_systemlog_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'School Counter',
+                'verbose_name_plural': 'School Counters',
+            },
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='teacher',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['created_at', 'ci'], name='student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['created_at', 'ci'], name='teacher_created_idx'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_students', '0012_school_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentityStamp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_type', models.CharField(choices=[('student', 'Estudiante'), ('teacher', 'Profesor'), ('admin', 'Administrador')], max_length=20)),
+                ('user_id', models.CharField(max_length=20)),
+                ('changed_at', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'Identity Stamp',
+                'verbose_name_plural': 'Identity Stamps',
+                'constraints': [models.UniqueConstraint(fields=('user_type', 'user_id'), name='identity_stamp_user')],
+            },
+        ),
+    ]
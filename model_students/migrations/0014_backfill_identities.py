@@ -0,0 +1,55 @@
+from django.db import IntegrityError, migrations
+
+IDENTITY_FIELDS = ('ci', 'username', 'email')
+
+
+def backfill_missing_identities(apps, schema_editor):
+    """Registra a los usuarios que 0007 omitió por tener datos repetidos entre roles.
+
+    Si hay datos repetidos no crea nada y falla con la lista de usuarios a corregir
+    (y el rol que ya tiene ese dato).
+    """
+    UserIdentity = apps.get_model('model_students', 'UserIdentity')
+    taken = {field: {} for field in IDENTITY_FIELDS}
+    registered = set()
+    for row in UserIdentity.objects.values('user_type', *IDENTITY_FIELDS):
+        registered.add((row['user_type'], row['ci']))
+        for field in IDENTITY_FIELDS:
+            taken[field][row[field]] = row
+
+    missing, conflicts = [], []
+    for model_name, user_type in [('Admin', 'admin'), ('Teacher', 'teacher'), ('Student', 'student')]:
+        model = apps.get_model('model_students', model_name)
+        for row in model.objects.order_by('ci').values(*IDENTITY_FIELDS):
+            if (user_type, row['ci']) in registered:
+                continue
+            row['user_type'] = user_type
+            owners = [(field, taken[field].get(row[field])) for field in IDENTITY_FIELDS]
+            owners = [(field, owner) for field, owner in owners if owner is not None]
+            if owners:
+                field, owner = owners[0]
+                conflicts.append(
+                    f"{user_type} {row['ci']}: {field} {row[field]!r} ya pertenece a {owner['user_type']} {owner['ci']}"
+                )
+                continue
+            for field in IDENTITY_FIELDS:
+                taken[field][row[field]] = row
+            missing.append(UserIdentity(**row))
+
+    if conflicts:
+        raise IntegrityError(
+            'Hay usuarios con cédula, usuario o email repetidos entre roles; corríjalos y vuelva a migrar:\n'
+            + '\n'.join(conflicts)
+        )
+    UserIdentity.objects.bulk_create(missing)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_students', '0013_identitystamp'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_missing_identities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Búsqueda de texto de los logs en PostgreSQL (en SQLite se usa FTS5, ver log_query.py).
+# CREATE EXTENSION necesita un rol con permiso para crear extensiones en la base
+# (pg_trgm es "trusted" desde PostgreSQL 13: basta con ser dueño de la base). Si el
+# usuario de la aplicación no lo tiene, un superusuario debe ejecutar antes
+# CREATE EXTENSION pg_trgm; y esta migración ya no intenta crearla.
+TRIGRAM_INDEXES = {
+    'systemlog_description_trgm': 'description',
+    'systemlog_user_name_trgm': 'user_name',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON model_students_systemlog USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_students', '0014_backfill_identities'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
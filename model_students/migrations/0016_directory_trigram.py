@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# Búsqueda de personas en PostgreSQL por nombre y apellido (en SQLite se usa FTS5,
+# ver directory.py). La extensión pg_trgm se crea en 0015.
+TRIGRAM_INDEXES = {
+    f'{table}_{column}_trgm': (f'model_students_{table}', column)
+    for table in ('student', 'teacher') for column in ('name', 'last_name')
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, (table, column) in TRIGRAM_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+# Copia de las personas al índice FTS5 del directorio, tal como estaban las tablas
+# en esta migración (el código de directory.py puede cambiar después)
+SQLITE_DIRECTORY_INSERTS = [
+    """INSERT INTO people_fts(name, last_name, ci, username, email, user_type, grade)
+        SELECT name, last_name, ci, username, email, 'student', grade FROM model_students_student""",
+    """INSERT INTO people_fts(name, last_name, ci, username, email, user_type, grade)
+        SELECT name, last_name, ci, username, email, 'teacher', NULL FROM model_students_teacher""",
+]
+
+
+def rebuild_sqlite_directory(apps, schema_editor):
+    """El índice ya no toma el rowid del registro de identidades: se vuelve a llenar
+    desde las tablas, con las personas que antes quedaban fuera por no tener identidad"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'people_fts'")
+        if not cursor.fetchone():
+            return
+        cursor.execute('DELETE FROM people_fts')
+        for sql in SQLITE_DIRECTORY_INSERTS:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_students', '0015_systemlog_trigram'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+        migrations.RunPython(rebuild_sqlite_directory, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,49 @@
-from django.db import models
+from django.db import models, router
+from django.dispatch import Signal
+from django.utils import timezone
+
+# Borrado directo de una nota (Punctuation.delete). Las notas que se borran en cascada
+# con su evaluación o materia no la envían: de eso se encargan los receptores del
+# padre, y así Django puede borrarlas con un solo DELETE sin cargarlas
+punctuation_deleted = Signal()
+
+
+class TracksLoadedValues:
+    """Recuerda los valores de TRACKED_FIELDS tal como se leyeron de la base.
+
+    Las señales los comparan con los nuevos para saber si cambió el grado, el
+    profesor o la materia sin volver a consultar la fila antes de guardar.
+    """
+    TRACKED_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def remember_loaded_values(self):
+        self._loaded_values = {name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__}
+
+    def loaded_values(self, fields, using=None):
+        """Valores anteriores de fields ({} si el objeto es nuevo); solo consulta los que no se leyeron"""
+        if self._state.adding or self.pk is None:
+            return {}
+        loaded = getattr(self, '_loaded_values', {})
+        values = {name: loaded[name] for name in fields if name in loaded}
+        missing = [name for name in fields if name not in values]
+        if missing:
+            manager = type(self)._default_manager.using(using or self._state.db)
+            values.update(manager.filter(pk=self.pk).values(*missing).first() or {})
+        return values
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.remember_loaded_values()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.remember_loaded_values()
 
 #### Tabla de Profesores
 
@@ -10,17 +55,24 @@ class Teacher(models.Model):
     email = models.EmailField(unique=True, max_length=80)
     password = models.CharField(max_length=20)
     profile_photo = models.ImageField(upload_to='profile_photos/', null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = "Teacher"
         verbose_name_plural = "Teachers"
+        indexes = [
+            # Profesores recientes del dashboard de administración
+            models.Index(fields=['created_at', 'ci'], name='teacher_created_idx'),
+        ]
 
     def __str__(self):
         return self.name + " " + self.last_name
 
 #### Tabla de Estudiantes
 
-class Student(models.Model):
+class Student(TracksLoadedValues, models.Model):
+    TRACKED_FIELDS = ['grade']
+
     username = models.CharField(max_length=50, unique=True)
     name =  models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
@@ -29,22 +81,36 @@ class Student(models.Model):
     email = models.EmailField(unique=True, max_length=80)
     grade = models.IntegerField(default=1)
     profile_photo = models.ImageField(upload_to='profile_photos/', null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         verbose_name = "Student"
         verbose_name_plural = "Students"
+        indexes = [
+            # Listados por grado ordenados por apellido (boletines, planillas)
+            models.Index(fields=['grade', 'last_name', 'name'], name='student_grade_name_idx'),
+            # Estudiantes recientes del dashboard de administración
+            models.Index(fields=['created_at', 'ci'], name='student_created_idx'),
+        ]
 
     def __str__(self):
         return self.name + " " + self.last_name
 
 #### Tabla de Materia
 
-class Course(models.Model):
+class Course(TracksLoadedValues, models.Model):
+    TRACKED_FIELDS = ['grade', 'teacher_id']
+
     name_course = models.CharField(max_length=50)
     description = models.TextField(blank=True, null=True)
     teacher = models.ForeignKey(Teacher, verbose_name='assigned teacher', on_delete=models.SET_NULL, null=True, blank=True)
     grade = models.IntegerField(default=1)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['grade', 'name_course'], name='course_grade_name_idx'),
+        ]
+
     def __str__(self):
         return self.name_course
 
@@ -66,13 +132,21 @@ class Grade(models.Model):
 
 #### Tabla de Evaluacion
 
-class Evaluation(models.Model):
+class Evaluation(TracksLoadedValues, models.Model):
+    TRACKED_FIELDS = ['course_id']
+
     date = models.DateTimeField()
     subject = models.CharField(max_length=40)
     type = models.CharField(max_length=20)
 
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     
+    class Meta:
+        indexes = [
+            # Evaluaciones de una materia por fecha (próximas, recientes)
+            models.Index(fields=['course', 'date'], name='evaluation_course_date_idx'),
+        ]
+    
     def __str__(self):
         return self.subject
 
@@ -85,6 +159,47 @@ class Punctuation(models.Model):
     
     class Meta:
         unique_together = ['evaluation', 'student']
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(self.__class__, instance=self)
+        result = super().delete(using, keep_parents)
+        punctuation_deleted.send(sender=Punctuation, instance=self, using=using)
+        return result
+    
+#### Estadísticas por estudiante y materia (se mantienen con señales de Punctuation)
+
+class StudentCourseStats(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='course_stats')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='student_stats')
+    count = models.PositiveIntegerField(default=0)         # Notas registradas
+    passed_count = models.PositiveIntegerField(default=0)  # Notas aprobadas
+    total = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    average = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    min_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    max_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Student Course Stats"
+        verbose_name_plural = "Student Course Stats"
+        unique_together = ['student', 'course']
+
+    def __str__(self):
+        return f"{self.student_id} - {self.course_id}: {self.average}"
+    
+#### Contadores del dashboard de administración (se mantienen con señales, ver counters.py)
+
+class SchoolCounter(models.Model):
+    name = models.CharField(max_length=30, unique=True)  # students, teachers, courses, grades
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "School Counter"
+        verbose_name_plural = "School Counters"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
     
 #### Tabla de Administradores
 
@@ -104,6 +219,44 @@ class Admin(models.Model):
     def __str__(self):
         return self.name + " " + self.last_name
 
+#### Registro de identidades (unicidad de ci, username y email entre todos los roles)
+
+class UserIdentity(models.Model):
+    USER_TYPES = [
+        ('student', 'Estudiante'),
+        ('teacher', 'Profesor'),
+        ('admin', 'Administrador'),
+    ]
+
+    ci = models.CharField(max_length=20, unique=True)
+    username = models.CharField(max_length=50, unique=True)
+    email = models.EmailField(max_length=80, unique=True)
+    user_type = models.CharField(max_length=20, choices=USER_TYPES)
+
+    class Meta:
+        verbose_name = "User Identity"
+        verbose_name_plural = "User Identities"
+
+    def __str__(self):
+        return f"{self.username} ({self.user_type})"
+
+#### Marcas de modificación de usuarios (invalidan la copia del usuario guardada en sesión)
+
+class IdentityStamp(models.Model):
+    user_type = models.CharField(max_length=20, choices=UserIdentity.USER_TYPES)
+    user_id = models.CharField(max_length=20)
+    changed_at = models.FloatField()  # time.time(), igual que user_snapshot_at en la sesión
+
+    class Meta:
+        verbose_name = "Identity Stamp"
+        verbose_name_plural = "Identity Stamps"
+        constraints = [
+            models.UniqueConstraint(fields=['user_type', 'user_id'], name='identity_stamp_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_type}:{self.user_id} ({self.changed_at})"
+
 #### Tabla de Logs del Sistema
 
 class SystemLog(models.Model):
@@ -113,16 +266,44 @@ class SystemLog(models.Model):
     action = models.CharField(max_length=20)     # LOGIN, LOGOUT, CREATE, UPDATE, DELETE, VIEW
     description = models.TextField()             # Descripción de la acción
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # Se fija al encolar el log
     
     class Meta:
         verbose_name = "System Log"
         verbose_name_plural = "System Logs"
         ordering = ['-timestamp']
+        indexes = [
+            # Con id al final sirven para la paginación por (timestamp, id)
+            models.Index(fields=['timestamp', 'id'], name='systemlog_timestamp_idx'),
+            models.Index(fields=['user_type', 'timestamp', 'id'], name='systemlog_type_ts_idx'),
+            models.Index(fields=['action', 'timestamp', 'id'], name='systemlog_action_ts_idx'),
+            models.Index(fields=['user_id', 'timestamp', 'id'], name='systemlog_user_ts_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user_name} - {self.action} - {self.timestamp}"
 
+class SystemLogArchive(models.Model):
+    """Archivo JSONL comprimido con los logs de un mes que salieron de la tabla SystemLog"""
+    month = models.DateField()                      # Primer día del mes archivado
+    file_name = models.CharField(max_length=255, unique=True)
+    rows = models.PositiveIntegerField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    sha256 = models.CharField(max_length=64)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "System Log Archive"
+        verbose_name_plural = "System Log Archives"
+        ordering = ['-month', '-first_timestamp']
+        indexes = [
+            models.Index(fields=['month'], name='systemlogarchive_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.rows} registros)"
+
 #### Modelos para Aula Virtual
 
 class Material(models.Model):
@@ -144,6 +325,9 @@ class Material(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['course', 'created_at'], name='material_course_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -157,6 +341,9 @@ class Announcement(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['course', 'created_at'], name='announce_course_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -171,6 +358,9 @@ class Assignment(models.Model):
     
     class Meta:
         ordering = ['-due_date']
+        indexes = [
+            models.Index(fields=['course', 'due_date'], name='assignment_course_due_idx'),
+        ]
     
     def __str__(self):
         return self.title
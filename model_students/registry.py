@@ -0,0 +1,82 @@
+from django.db import IntegrityError
+from django.db.models import Q
+
+from .models import UserIdentity
+
+# Orden en que se reportan los conflictos
+IDENTITY_FIELDS = ('ci', 'username', 'email')
+
+# Mensajes para usuarios duplicados (se formatean con ci, username y email)
+DUPLICATE_MESSAGES = {
+    'ci': 'Ya existe un usuario con la cédula {ci}',
+    'username': 'Ya existe un usuario con el nombre de usuario "{username}"',
+    'email': 'Ya existe un usuario con el email {email}',
+}
+
+
+class IdentityConflictError(IntegrityError):
+    """La cédula, el usuario o el email ya pertenecen a un usuario de otro rol"""
+
+
+def find_identity_conflict(ci=None, username=None, email=None, exclude_ci=None):
+    """Busca con una sola consulta si ci, username o email ya están en uso por cualquier rol.
+
+    Devuelve el nombre del primer campo repetido ('ci', 'username' o 'email')
+    o None si no hay conflicto.
+    """
+    values = {'ci': ci, 'username': username, 'email': email}
+    query = Q()
+    for field, value in values.items():
+        if value:
+            query |= Q(**{field: value})
+    if not query:
+        return None
+
+    matches = UserIdentity.objects.filter(query)
+    if exclude_ci:
+        matches = matches.exclude(ci=exclude_ci)
+
+    found = list(matches.values_list(*IDENTITY_FIELDS)[:len(IDENTITY_FIELDS)])
+    for index, field in enumerate(IDENTITY_FIELDS):
+        if values[field] and any(row[index] == values[field] for row in found):
+            return field
+    return None
+
+
+def conflict_error(conflict, user):
+    return IdentityConflictError(
+        DUPLICATE_MESSAGES[conflict].format(ci=user.ci, username=user.username, email=user.email)
+    )
+
+
+def sync_identity(user_type, user):
+    """Crea o actualiza la identidad del usuario.
+
+    Si el usuario o el email ya pertenecen a otra persona (de cualquier rol) lanza
+    IdentityConflictError con el mismo mensaje de los formularios, en lugar de
+    fallar en la restricción única.
+    """
+    conflict = find_identity_conflict(username=user.username, email=user.email, exclude_ci=user.ci)
+    if conflict:
+        raise conflict_error(conflict, user)
+    updated = UserIdentity.objects.filter(ci=user.ci, user_type=user_type).update(
+        username=user.username,
+        email=user.email,
+    )
+    if not updated:
+        # Usuario sin identidad (por ejemplo, creado con bulk_create): su cédula puede
+        # pertenecer a otro rol
+        if UserIdentity.objects.filter(ci=user.ci).exists():
+            raise conflict_error('ci', user)
+        UserIdentity.objects.create(
+            ci=user.ci,
+            username=user.username,
+            email=user.email,
+            user_type=user_type,
+        )
+
+
+def remove_identity(user_type, ci):
+    """Elimina la identidad cuando se borra el usuario"""
+    UserIdentity.objects.filter(ci=ci, user_type=user_type).delete()
+
@@ -0,0 +1,112 @@
+from django.db import connections
+from django.db.models.signals import post_save, post_delete, post_migrate, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .counters import COUNTER_NAMES, add_to_counter
+from .directory import ensure_directory_index, index_person, unindex_person
+from .models import Student, Teacher, Admin, Course, Grade, Evaluation, Punctuation, punctuation_deleted
+from .log_query import ensure_search_index
+from .registry import sync_identity, remove_identity
+from .stats import punctuation_course_id, refresh_stats
+
+USER_TYPES = {
+    Student: 'student',
+    Teacher: 'teacher',
+    Admin: 'admin',
+}
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Admin)
+def save_user_identity(sender, instance, **kwargs):
+    """Mantiene el registro de identidades al crear o editar un usuario"""
+    sync_identity(USER_TYPES[sender], instance)
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_delete, sender=Admin)
+def delete_user_identity(sender, instance, **kwargs):
+    """Quita la identidad del registro al eliminar un usuario"""
+    remove_identity(USER_TYPES[sender], instance.ci)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+def index_directory_person(sender, instance, **kwargs):
+    """Actualiza el directorio de búsqueda con los datos de la persona"""
+    index_person(USER_TYPES[sender], instance)
+
+
+@receiver(pre_delete, sender=Student)
+@receiver(pre_delete, sender=Teacher)
+def unindex_directory_person(sender, instance, **kwargs):
+    """Quita a la persona del directorio"""
+    unindex_person(USER_TYPES[sender], instance.ci)
+
+
+@receiver(post_save, sender=Punctuation)
+@receiver(punctuation_deleted, sender=Punctuation)
+def update_student_course_stats(sender, instance, **kwargs):
+    """Recalcula las estadísticas del estudiante en la materia de la nota"""
+    refresh_stats([instance.student_id], [punctuation_course_id(instance)])
+
+
+@receiver(pre_save, sender=Evaluation)
+def remember_evaluation_course(sender, instance, using, raw=False, **kwargs):
+    """Materia anterior de la evaluación, para saber si se movió a otra"""
+    if not raw:
+        instance._stats_old_course_id = instance.loaded_values(['course_id'], using).get('course_id')
+
+
+@receiver(post_save, sender=Evaluation)
+def move_evaluation_stats(sender, instance, created, raw=False, **kwargs):
+    """Al mover una evaluación a otra materia, sus notas cuentan en la nueva y dejan de contar en la anterior"""
+    old_course_id = getattr(instance, '_stats_old_course_id', None)
+    instance._stats_old_course_id = None
+    if created or raw or old_course_id in (None, instance.course_id):
+        return
+    student_ids = Punctuation.objects.filter(evaluation=instance).values_list('student_id', flat=True)
+    refresh_stats(student_ids, [old_course_id, instance.course_id])
+
+
+@receiver(pre_delete, sender=Evaluation)
+def remember_evaluation_students(sender, instance, **kwargs):
+    """Estudiantes con nota en la evaluación, antes de que sus notas se borren en cascada"""
+    instance._stats_student_ids = list(
+        Punctuation.objects.filter(evaluation=instance).values_list('student_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Evaluation)
+def refresh_deleted_evaluation_stats(sender, instance, **kwargs):
+    """Un solo recálculo por evaluación en lugar de uno por cada nota borrada"""
+    refresh_stats(getattr(instance, '_stats_student_ids', []), [instance.course_id])
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Grade)
+def count_created(sender, instance, created, raw=False, **kwargs):
+    """Suma 1 al contador del dashboard al crear un registro"""
+    if created and not raw:
+        add_to_counter(COUNTER_NAMES[sender], 1)
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Grade)
+def count_deleted(sender, instance, **kwargs):
+    """Resta 1 al contador del dashboard al eliminar un registro"""
+    add_to_counter(COUNTER_NAMES[sender], -1)
+
+
+@receiver(post_migrate)
+def create_log_search_index(sender, using, **kwargs):
+    """Crea (o repara) los índices de búsqueda de texto de los logs y del directorio después de migrate"""
+    if sender.name == 'model_students':
+        ensure_search_index(connections[using])
+        ensure_directory_index(connections[using])
@@ -0,0 +1,129 @@
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+
+from .models import Evaluation, Punctuation, Student, StudentCourseStats
+
+PASSING_SCORE = 10
+
+STATS_FIELDS = ['count', 'passed_count', 'total', 'average', 'min_score', 'max_score', 'updated_at']
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def aggregate_punctuations(punctuations):
+    """Agrupa notas por (estudiante, materia) en una sola consulta"""
+    return punctuations.values('student_id', course_id=F('evaluation__course_id')).annotate(
+        count=Count('id'),
+        passed_count=Count('id', filter=Q(score__gte=PASSING_SCORE)),
+        total=Sum('score'),
+        min_score=Min('score'),
+        max_score=Max('score'),
+    ).order_by()
+
+
+def build_stats(row, now):
+    total = Decimal(row['total']).quantize(Decimal('0.01'))
+    return StudentCourseStats(
+        student_id=row['student_id'],
+        course_id=row['course_id'],
+        count=row['count'],
+        passed_count=row['passed_count'],
+        total=total,
+        average=(total / row['count']).quantize(Decimal('0.01')),
+        min_score=row['min_score'],
+        max_score=row['max_score'],
+        updated_at=now,
+    )
+
+
+def punctuation_course_id(punctuation):
+    """Materia de una nota sin consultar si la evaluación ya está cargada"""
+    if Punctuation.evaluation.is_cached(punctuation):
+        return punctuation.evaluation.course_id
+    return Evaluation.objects.filter(id=punctuation.evaluation_id).values_list('course_id', flat=True).first()
+
+
+def refresh_stats(student_ids, course_ids):
+    """Recalcula las estadísticas de los estudiantes indicados en las materias indicadas.
+
+    Solo se leen las notas de esos pares, así que el costo no depende del
+    tamaño de la tabla. Los pares que se quedaron sin notas se eliminan.
+    """
+    student_ids = set(student_ids)
+    course_ids = {course_id for course_id in course_ids if course_id is not None}
+    if not student_ids or not course_ids:
+        return
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Lectura y escritura en la misma transacción. En PostgreSQL se bloquea a los
+        # estudiantes (en orden, para no cruzarse): un recálculo concurrente de los mismos
+        # pares espera y luego lee las notas que el primero ya confirmó. SQLite ya
+        # admite un solo escritor a la vez
+        if connection.features.has_select_for_update:
+            list(Student.objects.select_for_update().filter(ci__in=student_ids).order_by('ci').values_list('ci', flat=True))
+        rows = aggregate_punctuations(Punctuation.objects.filter(
+            student_id__in=student_ids,
+            evaluation__course_id__in=course_ids
+        ))
+        stats = [build_stats(row, now) for row in rows]
+        present = {(item.student_id, item.course_id) for item in stats}
+
+        if stats:
+            StudentCourseStats.objects.bulk_create(
+                stats,
+                update_conflicts=True,
+                unique_fields=['student', 'course'],
+                update_fields=STATS_FIELDS,
+            )
+        stale = [
+            pk for pk, student_id, course_id in StudentCourseStats.objects.filter(
+                student_id__in=student_ids, course_id__in=course_ids
+            ).values_list('id', 'student_id', 'course_id')
+            if (student_id, course_id) not in present
+        ]
+        if stale:
+            StudentCourseStats.objects.filter(id__in=stale).delete()
+
+
+def rebuild_stats():
+    """Vuelve a calcular toda la tabla desde las notas; devuelve las filas creadas"""
+    now = timezone.now()
+    created = 0
+    with transaction.atomic():
+        StudentCourseStats.objects.all().delete()
+        batch = []
+        for row in aggregate_punctuations(Punctuation.objects.all()).iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.append(build_stats(row, now))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                StudentCourseStats.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            StudentCourseStats.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+def find_stats_mismatches():
+    """Compara la tabla con un cálculo nuevo; devuelve [(estudiante, materia, guardado, esperado)]"""
+    stored = {
+        (item.student_id, item.course_id): tuple(getattr(item, field) for field in STATS_FIELDS[:-1])
+        for item in StudentCourseStats.objects.all()
+    }
+    mismatches = []
+    now = timezone.now()
+    for row in aggregate_punctuations(Punctuation.objects.all()).iterator(chunk_size=REBUILD_BATCH_SIZE):
+        item = build_stats(row, now)
+        key = (item.student_id, item.course_id)
+        expected = tuple(getattr(item, field) for field in STATS_FIELDS[:-1])
+        current = stored.pop(key, None)
+        if current != expected:
+            mismatches.append((key[0], key[1], current, expected))
+    # Filas guardadas para pares que ya no tienen notas
+    for (student_id, course_id), current in stored.items():
+        mismatches.append((student_id, course_id, current, None))
+    return mismatches
@@ -1,3 +1,387 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from django_base.cache import CACHE_BACKENDS, cache_config
+from django_base.database import POSTGRESQL_ENGINE, SQLITE_ENGINE, database_config
+from .counters import find_counter_mismatches, get_counters, reconcile_counters
+from .directory import autocomplete, find_directory_mismatches, rebuild_directory_index, search_students
+from .log_archive import archive_logs, iter_archived_logs
+from .log_query import (
+    encode_cursor, ensure_search_index, filter_logs, log_matches, page_archived_logs, page_logs, parse_log_filters
+)
+from .models import (
+    Student, Teacher, Course, Evaluation, Punctuation, StudentCourseStats, UserIdentity, SystemLog, SystemLogArchive
+)
+from .registry import IdentityConflictError, find_identity_conflict
+from .stats import find_stats_mismatches
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    base_dir = Path('/srv/colegio')
+
+    def test_sqlite_by_default(self):
+        config = database_config(self.base_dir, {})
+        self.assertEqual(config['ENGINE'], SQLITE_ENGINE)
+        self.assertEqual(config['NAME'], self.base_dir / 'db.sqlite3')
+
+    def test_sqlite_pragmas(self):
+        config = database_config(self.base_dir, {}, {'journal_mode': 'WAL', 'busy_timeout': 5000, 'cache_size': -2000})
+        self.assertEqual(
+            config['OPTIONS']['init_command'],
+            'PRAGMA journal_mode=WAL;PRAGMA busy_timeout=5000;PRAGMA cache_size=-2000'
+        )
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        with self.assertRaises(ImproperlyConfigured):
+            database_config(self.base_dir, {}, {'journal_mode': 'WAL; DROP TABLE x'})
+
+    def test_postgresql_persistent_connections(self):
+        config = database_config(self.base_dir, {
+            'DB_ENGINE': 'postgresql', 'DB_NAME': 'colegio', 'DB_USER': 'app', 'DB_CONN_MAX_AGE': '300',
+        })
+        self.assertEqual(config['ENGINE'], POSTGRESQL_ENGINE)
+        self.assertEqual(config['NAME'], 'colegio')
+        self.assertEqual(config['CONN_MAX_AGE'], 300)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', config['OPTIONS'])
+
+    def test_postgresql_pool_disables_persistent_connections(self):
+        config = database_config(self.base_dir, {
+            'DB_ENGINE': 'postgres', 'DB_POOL': 'true', 'DB_POOL_MAX_SIZE': '20',
+        })
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 20)
+
+    def test_invalid_values(self):
+        with self.assertRaises(ImproperlyConfigured):
+            database_config(self.base_dir, {'DB_ENGINE': 'oracle'})
+        with self.assertRaises(ImproperlyConfigured):
+            database_config(self.base_dir, {'DB_ENGINE': 'postgresql', 'DB_CONN_MAX_AGE': 'mucho'})
+
+
+class CacheConfigTests(SimpleTestCase):
+    base_dir = Path('/srv/colegio')
+
+    def test_backends(self):
+        self.assertEqual(cache_config(self.base_dir, {})['BACKEND'], CACHE_BACKENDS['locmem'])
+        config = cache_config(self.base_dir, {'CACHE_BACKEND': 'file', 'CACHE_TIMEOUT': '60'})
+        self.assertEqual((config['LOCATION'], config['TIMEOUT']), (self.base_dir / 'cache', 60))
+        config = cache_config(self.base_dir, {'CACHE_BACKEND': 'redis', 'CACHE_LOCATION': 'redis://cache:6379/0'})
+        self.assertEqual((config['BACKEND'], config['LOCATION']), (CACHE_BACKENDS['redis'], 'redis://cache:6379/0'))
+        with self.assertRaises(ImproperlyConfigured):
+            cache_config(self.base_dir, {'CACHE_BACKEND': 'memcached'})
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Pragmas de SQLite')
+class SQLitePragmaTests(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            # La base de pruebas está en memoria: ahí no aplican journal_mode ni mmap_size
+            for name in ('busy_timeout', 'cache_size'):
+                cursor.execute(f'PRAGMA {name}')
+                self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS[name])
+
+
+class IdentityRegistryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(
+            ci='T100', username='prof', name='Ana', last_name='Pérez', email='prof@colegio.edu', password='x'
+        )
+
+    def test_identity_registry_unique_across_roles(self):
+        self.assertTrue(UserIdentity.objects.filter(username='prof', user_type='teacher').exists())
+        self.assertEqual(find_identity_conflict(ci='S1', username='otro', email='prof@colegio.edu'), 'email')
+        self.assertIsNone(find_identity_conflict(username='prof', exclude_ci='T100'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Student.objects.create(
+                ci='S999', username='prof', name='X', last_name='Y', email='otro@colegio.edu', password='x'
+            )
+
+    def test_cross_role_email_change_gets_clear_error(self):
+        student = Student.objects.create(
+            ci='S1', username='est', name='Luis', last_name='Núñez', email='e@colegio.edu', password='x'
+        )
+        student.email = 'prof@colegio.edu'
+        with self.assertRaisesMessage(IdentityConflictError, 'Ya existe un usuario con el email prof@colegio.edu'):
+            with transaction.atomic():
+                student.save()
+        self.assertEqual(Student.objects.get(ci='S1').email, 'e@colegio.edu')
+        self.assertEqual(UserIdentity.objects.get(ci='S1').email, 'e@colegio.edu')
+
+    def test_user_missing_from_registry_gets_clear_error(self):
+        # bulk_create no pasa por el registro: el usuario queda sin identidad
+        (student,) = Student.objects.bulk_create([
+            Student(ci='T100', username='est', name='Luis', last_name='Núñez', email='e@colegio.edu', password='x')
+        ])
+        student.name = 'Luisa'
+        with self.assertRaisesMessage(IdentityConflictError, 'Ya existe un usuario con la cédula T100'), transaction.atomic():
+            student.save()
+
+    def test_backfill_reports_conflicts_instead_of_dropping_users(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        backfill = import_module('model_students.migrations.0014_backfill_identities').backfill_missing_identities
+        Student.objects.bulk_create([
+            Student(ci='S1', username='est1', name='Luis', last_name='Núñez', email='e1@colegio.edu', password='x'),
+        ])
+        backfill(apps, None)
+        self.assertTrue(UserIdentity.objects.filter(ci='S1', user_type='student').exists())
+
+        Student.objects.bulk_create([
+            Student(ci='S2', username='est2', name='Ana', last_name='Díaz', email='e2@colegio.edu', password='x'),
+            Student(ci='S3', username='prof', name='Eva', last_name='Paz', email='e3@colegio.edu', password='x'),
+        ])
+        with self.assertRaisesMessage(IntegrityError, "student S3: username 'prof' ya pertenece a teacher T100"):
+            with transaction.atomic():
+                backfill(apps, None)
+        # Nada a medias: S2 tampoco se registró
+        self.assertFalse(UserIdentity.objects.filter(ci='S2').exists())
+
+
+class CourseStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(
+            ci='T100', username='prof', name='Ana', last_name='Pérez', email='prof@colegio.edu', password='x'
+        )
+        cls.students = [
+            Student.objects.create(
+                ci=f'S10{i}', username=f'est{i}', name='Luis', last_name=f'Núñez {i}',
+                email=f'est{i}@colegio.edu', password='x', grade=1
+            )
+            for i in range(3)
+        ]
+        cls.course = Course.objects.create(name_course='Matemáticas', grade=1, teacher=cls.teacher)
+        cls.evaluation = Evaluation.objects.create(
+            course=cls.course, date=timezone.now() + timedelta(days=2), subject='Examen 1', type='Examen'
+        )
+
+    def test_signal_stats_after_delete(self):
+        punctuation = Punctuation.objects.create(evaluation=self.evaluation, student=self.students[1], score=Decimal('12'))
+        self.assertTrue(StudentCourseStats.objects.filter(student=self.students[1]).exists())
+        punctuation.delete()
+        self.assertFalse(StudentCourseStats.objects.filter(student=self.students[1]).exists())
+
+    def test_stats_refreshed_once_when_evaluation_deleted(self):
+        for student in self.students:
+            Punctuation.objects.create(evaluation=self.evaluation, student=student, score=Decimal('12'))
+        Evaluation.objects.get(id=self.evaluation.id).delete()
+        self.assertFalse(StudentCourseStats.objects.exists())
+        self.assertEqual(find_stats_mismatches(), [])
+
+    def test_stats_follow_evaluation_moved_to_another_course(self):
+        other = Course.objects.create(name_course='Física', grade=1, teacher=self.teacher)
+        Punctuation.objects.create(evaluation=self.evaluation, student=self.students[0], score=Decimal('14'))
+        self.evaluation.course = other
+        self.evaluation.save()
+        stats = StudentCourseStats.objects.get(student=self.students[0])
+        self.assertEqual((stats.course_id, stats.average), (other.id, Decimal('14.00')))
+        self.assertEqual(find_stats_mismatches(), [])
+
+    def test_course_stats_annotations(self):
+        from pages.course_stats import get_course_stats
+
+        Punctuation.objects.create(evaluation=self.evaluation, student=self.students[0], score=Decimal('10'))
+        Punctuation.objects.create(evaluation=self.evaluation, student=self.students[1], score=Decimal('15'))
+        with self.assertNumQueries(2):
+            (row,) = get_course_stats(Course.objects.filter(id=self.course.id))
+        self.assertEqual(row['students_count'], 3)
+        self.assertEqual(row['evaluations_count'], 1)
+        self.assertEqual(row['average_score'], 12.5)
+        self.assertEqual(row['next_evaluation'], self.evaluation)
+
+
+class SchoolCounterTests(TestCase):
+    def test_counters_follow_creates_and_deletes(self):
+        before = get_counters()
+        teacher = Teacher.objects.create(ci='T1', username='prof', name='Ana', last_name='Pérez', email='p@colegio.edu', password='x')
+        Course.objects.create(name_course='Historia', grade=2, teacher=teacher)
+        Student.objects.create(ci='S1', username='est', name='Luis', last_name='Núñez', email='e@colegio.edu', password='x')
+        teacher.delete()
+        with self.assertNumQueries(1):
+            counters = get_counters()
+        self.assertEqual(counters['teachers'], before['teachers'])
+        self.assertEqual(counters['courses'], before['courses'] + 1)
+        self.assertEqual(counters['students'], before['students'] + 1)
+        self.assertEqual(find_counter_mismatches(), [])
+
+    def test_reconcile_fixes_bulk_writes(self):
+        Student.objects.bulk_create([
+            Student(ci=f'S{i}', username=f'est{i}', name='Luis', last_name='Núñez', email=f'e{i}@colegio.edu', password='x')
+            for i in range(3)
+        ])
+        self.assertEqual([name for name, _, _ in find_counter_mismatches()], ['students'])
+        self.assertEqual(reconcile_counters()['students'], Student.objects.count())
+        self.assertEqual(find_counter_mismatches(), [])
+
+
+class LogArchiveTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(SYSTEM_LOG_ARCHIVE={'DIRECTORY': directory.name, 'RETENTION_DAYS': 30})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        now = timezone.now()
+        SystemLog.objects.bulk_create([
+            SystemLog(
+                user_type='student', user_id=f'S{i}', user_name='Luis Núñez', action='LOGIN' if i % 2 else 'VIEW',
+                description=f'Registro {i}', ip_address='10.0.0.1', timestamp=now - timedelta(days=100 - i) + timedelta(hours=12)
+            )
+            for i in range(100)
+        ])
+
+    def test_old_logs_move_to_monthly_files(self):
+        archives = archive_logs()
+        self.assertGreaterEqual(len(archives), 2)
+        self.assertEqual(sum(archive.rows for archive in archives), 70)
+        self.assertEqual(SystemLog.objects.count(), 30)
+        self.assertFalse(SystemLog.objects.filter(timestamp__lt=timezone.now() - timedelta(days=30)).exists())
+        self.assertEqual(archive_logs(), [])
+
+        archive = SystemLogArchive.objects.order_by('month').first()
+        archived = (log for log in iter_archived_logs(archive.month) if log_matches(log, {'action': 'LOGIN'}))
+        logs, older, newer = page_archived_logs(archived, limit=5)
+        self.assertIsNotNone(older)
+        self.assertIsNone(newer)
+        self.assertEqual(len(logs), 5)
+        self.assertTrue(all(log.action == 'LOGIN' and log.user_name == 'Luis Núñez' for log in logs))
+        self.assertEqual(logs, sorted(logs, key=lambda log: log.timestamp, reverse=True))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Índice FTS5 de SQLite')
+class DirectoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        people = [('José', 'Núñez Peña', 1), ('Josefina', 'Álvarez', 1), ('Luis', 'Josué Romero', 1), ('María', 'Núñez', 2)]
+        for i, (name, last_name, grade) in enumerate(people):
+            Student.objects.create(ci=f'V-{1000 + i}', username=f'est{i}', name=name, last_name=last_name,
+                                   email=f'e{i}@colegio.edu', password='x', grade=grade)
+        cls.teacher = Teacher.objects.create(ci='T1', username='prof', name='Inés', last_name='Muñoz',
+                                             email='p@colegio.edu', password='x')
+
+    def names(self, results):
+        return [f"{person['name']} {person['last_name']}" for person in results]
+
+    def test_accent_insensitive_prefix_search(self):
+        self.assertEqual(self.names(autocomplete('jose nun')), ['José Núñez Peña'])
+        self.assertEqual(self.names(autocomplete('INES')), ['Inés Muñoz'])
+        self.assertEqual(self.names(autocomplete('nunez', grade=2)), ['María Núñez'])
+        self.assertEqual(self.names(autocomplete('muñ', user_type='student')), [])
+        self.assertEqual(autocomplete('  '), [])
+
+    def test_results_ranked_and_filtered_by_grade(self):
+        # La palabra completa antes que los prefijos
+        self.assertEqual([s.ci for s in search_students(1, 'jose')], ['V-1000', 'V-1001'])
+        self.assertEqual({s.ci for s in search_students(1, 'jos')}, {'V-1000', 'V-1001', 'V-1002'})
+        self.assertEqual([s.ci for s in search_students(1, ci='1001')], ['V-1001'])
+        self.assertEqual([s.ci for s in search_students(1, 'luis', '1001')], [])
+        self.assertEqual(len(search_students(1)), 3)
+
+    def test_best_match_among_many_prefix_matches(self):
+        # Miles de "Mariana" antes (por rowid) que la única coincidencia exacta
+        Student.objects.bulk_create([
+            Student(ci=f'V-{5000 + i}', username=f'mariana{i}', name='Mariana', last_name=f'Pérez {i}',
+                    email=f'm{i}@colegio.edu', password='x', grade=3)
+            for i in range(3000)
+        ])
+        rebuild_directory_index()
+        Student.objects.create(ci='V-9999', username='mar', name='Mar', last_name='Díaz',
+                               email='mar@colegio.edu', password='x', grade=3)
+        results = autocomplete('mar')
+        self.assertEqual(len(results), 10)
+        self.assertEqual(self.names(results)[0], 'Mar Díaz')
+
+    def test_index_follows_signals_and_rebuild(self):
+        # Editar a una persona no toca a otra con una cédula parecida
+        Student.objects.get(ci='V-1000').save()
+        self.assertEqual(self.names(autocomplete('josefina')), ['Josefina Álvarez'])
+        student = Student.objects.get(ci='V-1001')
+        student.name = 'Ramón'
+        student.save()
+        self.assertEqual(self.names(autocomplete('ramon')), ['Ramón Álvarez'])
+        self.assertEqual(autocomplete('josefina'), [])
+        student.delete()
+        self.teacher.delete()
+        self.assertEqual(autocomplete('ramon') + autocomplete('ines'), [])
+        self.assertEqual(find_directory_mismatches(), [])
+
+        Student.objects.bulk_create([Student(ci='V-2000', username='nuevo', name='Raúl', last_name='Ibáñez',
+                                             email='n@colegio.edu', password='x')])
+        # El índice se llena desde la tabla, aunque la persona no esté en el registro de identidades
+        self.assertEqual([name for name, _, _ in find_directory_mismatches()], ['student'])
+        self.assertEqual(rebuild_directory_index(), 4)
+        self.assertEqual(self.names(autocomplete('ibanez')), ['Raúl Ibáñez'])
+
+
+class LogQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        descriptions = ['Accedió a gestión de usuarios', 'Creó evaluación de Matemáticas', 'Calificó examen de Física']
+        SystemLog.objects.bulk_create([
+            SystemLog(
+                user_type='teacher', user_id=f'T{i % 3}', user_name='Ana Pérez', action='UPDATE',
+                description=f'{descriptions[i % 3]} {i}', ip_address=f'10.0.0.{i % 2 + 1}',
+                # Varias filas con el mismo timestamp: el id desempata
+                timestamp=now - timedelta(minutes=i // 4)
+            )
+            for i in range(60)
+        ])
+
+    def search(self, **params):
+        return filter_logs(SystemLog.objects.all(), parse_log_filters(params))
+
+    def test_filters_and_accent_insensitive_search(self):
+        self.assertEqual(self.search(q='evaluacion matem').count(), 20)
+        self.assertEqual(self.search(q='GESTIÓN').count(), 20)
+        self.assertEqual(self.search(q='fisica', user_id='T2', ip_address='10.0.0.1').count(), 10)
+        self.assertEqual(self.search(date_from=timezone.localdate().isoformat()).count(), 60)
+        for log in self.search(q='fisica'):
+            self.assertTrue(log_matches(log, parse_log_filters({'q': 'fisica'})))
+
+    def test_archived_logs_match_user_name_like_the_index(self):
+        # El usuario también se busca, igual en la tabla que en los archivos
+        filters = parse_log_filters({'q': 'ana perez'})
+        self.assertEqual(self.search(q='ana perez').count(), 60)
+        self.assertTrue(all(log_matches(log, filters) for log in SystemLog.objects.all()))
+        self.assertFalse(log_matches(SystemLog(user_name='Luis Núñez', description='Ana'), filters))
+
+    def test_keyset_pages_cover_every_row_once(self):
+        expected = list(SystemLog.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        seen, after, pages = [], None, []
+        while True:
+            rows, older, newer = page_logs(SystemLog.objects.all(), after=after, limit=7)
+            seen += [log.id for log in rows]
+            pages.append((rows, newer))
+            if older is None:
+                break
+            after = older
+        self.assertEqual(seen, expected)
+
+        rows, newer = pages[2]
+        previous, older, _ = page_logs(SystemLog.objects.all(), before=newer, limit=7)
+        self.assertEqual(previous, pages[1][0])
+        self.assertEqual(older, encode_cursor(previous[-1]))
+
+    @skipUnless(connection.vendor == 'sqlite', 'Índice FTS5 de SQLite')
+    def test_search_index_repaired_after_table_rebuild(self):
+        self.assertFalse(ensure_search_index())
+        with connection.cursor() as cursor:
+            # Lo que pasa cuando Django recrea la tabla en SQLite
+            cursor.execute('DROP TRIGGER systemlog_fts_insert')
+        self.assertTrue(ensure_search_index())
+        SystemLog.objects.create(user_type='admin', user_id='A1', user_name='Admin', action='VIEW', description='Boletín nuevo')
+        self.assertEqual(self.search(q='boletin').count(), 1)
@@ -1,18 +1,38 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import HttpResponse
-from model_students.models import Student, Teacher, Course, Admin, Grade
-from utils.logger import log_user_activity
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse, JsonResponse, Http404
+from django.db import transaction, IntegrityError
+from model_students.models import Student, Teacher, Course, Grade
+from model_students.counters import get_counters
+from model_students.directory import autocomplete, search_students
+from model_students.registry import find_identity_conflict, DUPLICATE_MESSAGES, IdentityConflictError
+from model_students.log_archive import archived_months, iter_archived_logs
+from model_students.log_query import (
+    LOG_PAGE_SIZE, LogFilterError, filter_logs, filter_query_string, log_matches, page_archived_logs, page_logs,
+    parse_log_filters,
+)
+from utils.logger import get_log_policy, log_user_activity, log_buffer_stats, log_policy_stats
+from .backup import (
+    BackupError, accepted_extensions, database_info, get_backup_job, get_backup_settings,
+    restore_backup, start_backup,
+)
+from .course_stats import annotate_course_stats
+from .log_export import EXPORT_FORMATS, iter_log_export
+from .metrics import view_metrics
+from .people import students_page, teachers_page
+from .view_cache import GLOBAL_TAG, cache_stats, cached
+from .reports import build_grade_reports, iter_report_cards_zip, write_report_cards_pdf
+from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.units import inch
 from datetime import datetime
-import os
-import shutil
-from django.conf import settings
+from urllib.parse import urlencode
+import tempfile
+
+# Tamaño en memoria antes de pasar el PDF de boletines a disco
+REPORT_SPOOL_SIZE = 8 * 1024 * 1024
 
 def admin_required(view_func):
     def wrapper(request, *args, **kwargs):
@@ -25,36 +45,34 @@ def admin_required(view_func):
 
 @admin_required
 def admin_dashboard(request):
-    admin_id = request.session.get('user_id')
-    admin_data = Admin.objects.get(ci=admin_id)
+    admin_data = request.school_user
     
     log_user_activity(request, 'VIEW', 'Accedió al dashboard de administrador')
     
-    total_students = Student.objects.count()
-    total_teachers = Teacher.objects.count()
-    total_courses = Course.objects.count()
-    total_grades = Grade.objects.count()
-    
-    recent_students = Student.objects.order_by('-ci')[:5]
-    recent_teachers = Teacher.objects.order_by('-ci')[:5]
-    
     context = {
         'user_type': 'admin',
         'user_data': admin_data,
-        'total_students': total_students,
-        'total_teachers': total_teachers,
-        'total_courses': total_courses,
-        'total_grades': total_grades,
-        'recent_students': recent_students,
-        'recent_teachers': recent_teachers,
     }
+    context.update(cached('admin_dashboard', [GLOBAL_TAG], admin_dashboard_data))
     
     return render(request, 'admin/dashboard.html', context)
 
+def admin_dashboard_data():
+    """Contadores y usuarios recientes del dashboard (se guardan en caché)"""
+    # Contadores mantenidos por señales: una consulta en lugar de cuatro COUNT(*)
+    counters = get_counters()
+    return {
+        'total_students': counters['students'],
+        'total_teachers': counters['teachers'],
+        'total_courses': counters['courses'],
+        'total_grades': counters['grades'],
+        'recent_students': list(Student.objects.order_by('-created_at', '-ci')[:5]),
+        'recent_teachers': list(Teacher.objects.order_by('-created_at', '-ci')[:5]),
+    }
+
 @admin_required
 def manage_grades(request):
-    admin_id = request.session.get('user_id')
-    admin_data = Admin.objects.get(ci=admin_id)
+    admin_data = request.school_user
     
     if request.method == 'GET':
         log_user_activity(request, 'VIEW', 'Accedió a gestión de grados')
@@ -127,8 +145,7 @@ def manage_grades(request):
 
 @admin_required
 def manage_courses(request):
-    admin_id = request.session.get('user_id')
-    admin_data = Admin.objects.get(ci=admin_id)
+    admin_data = request.school_user
     
     if request.method == 'GET':
         log_user_activity(request, 'VIEW', 'Accedió a gestión de materias')
@@ -199,7 +216,7 @@ def manage_courses(request):
             except Exception as e:
                 messages.error(request, f'Error al eliminar materia: {str(e)}')
     
-    courses = Course.objects.all().select_related('teacher')
+    courses = annotate_course_stats(Course.objects.all().select_related('teacher'))
     grades = Grade.objects.all()
     teachers = Teacher.objects.all()
     
@@ -214,36 +231,112 @@ def manage_courses(request):
 @admin_required
 def system_logs(request):
     from model_students.models import SystemLog
-    admin_id = request.session.get('user_id')
-    admin_data = Admin.objects.get(ci=admin_id)
+    admin_data = request.school_user
     
     log_user_activity(request, 'VIEW', 'Accedió a logs del sistema')
     
-    # Filtros
-    user_type_filter = request.GET.get('user_type', '')
-    action_filter = request.GET.get('action', '')
-    
-    logs = SystemLog.objects.all()
+    archive_filter = request.GET.get('archive', '')
+    archive_months = archived_months()
+    try:
+        filters = parse_log_filters(request.GET)
+    except LogFilterError as e:
+        messages.error(request, str(e))
+        return redirect('system_logs')
+    after = request.GET.get('after', '')
+    before = request.GET.get('before', '')
     
-    if user_type_filter:
-        logs = logs.filter(user_type=user_type_filter)
-    if action_filter:
-        logs = logs.filter(action=action_filter)
+    try:
+        if archive_filter:
+            # Mes archivado: se lee el archivo comprimido bajo demanda
+            month = next((m for m in archive_months if m.isoformat() == archive_filter), None)
+            if month is None:
+                messages.error(request, 'El periodo archivado no existe')
+                return redirect('system_logs')
+            archived = (log for log in iter_archived_logs(month) if log_matches(log, filters))
+            logs, older_cursor, newer_cursor = page_archived_logs(archived, after, before)
+        else:
+            # Paginación por cursor (timestamp, id): cada página cuesta lo mismo, sin OFFSET
+            logs, older_cursor, newer_cursor = page_logs(filter_logs(SystemLog.objects.all(), filters), after, before)
+    except LogFilterError as e:
+        messages.error(request, str(e))
+        return redirect('system_logs')
+    except OSError as e:
+        messages.error(request, f'No se pudo leer el archivo de logs: {e}')
+        logs, older_cursor, newer_cursor = [], None, None
     
-    logs = logs.order_by('-timestamp')[:100]  # Últimos 100 logs
+    filter_params = filter_query_string(filters)
+    if archive_filter:
+        filter_params['archive'] = archive_filter
     
     return render(request, 'admin/system_logs.html', {
         'user_type': 'admin',
         'user_data': admin_data,
         'logs': logs,
-        'user_type_filter': user_type_filter,
-        'action_filter': action_filter,
+        'filters': filters,
+        'user_type_filter': filters['user_type'],
+        'action_filter': filters['action'],
+        'archive_filter': archive_filter,
+        'archive_months': archive_months,
+        'filter_params': urlencode(filter_params),
+        'older_cursor': older_cursor,
+        'newer_cursor': newer_cursor,
+        'page_size': LOG_PAGE_SIZE,
+    })
+
+@admin_required
+def export_system_logs(request):
+    """Descarga los logs que cumplen los filtros del visor, en CSV o JSONL"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        messages.error(request, 'Formato de exportación no válido')
+        return redirect('system_logs')
+    try:
+        filters = parse_log_filters(request.GET)
+    except LogFilterError as e:
+        messages.error(request, str(e))
+        return redirect('system_logs')
+    
+    archive_filter = request.GET.get('archive', '')
+    month = None
+    if archive_filter:
+        month = next((m for m in archived_months() if m.isoformat() == archive_filter), None)
+        if month is None:
+            messages.error(request, 'El periodo archivado no existe')
+            return redirect('system_logs')
+    include_archives = request.GET.get('include_archives') == '1'
+    
+    active = ', '.join(f'{name}={value}' for name, value in filter_query_string(filters).items()) or 'sin filtros'
+    log_user_activity(request, 'EXPORT', f'Exportó logs del sistema ({export_format}, {active})')
+    
+    content_type, extension = EXPORT_FORMATS[export_format]
+    label = f'archivo_{archive_filter}' if month else datetime.now().strftime('%Y%m%d_%H%M%S')
+    response = StreamingHttpResponse(iter_log_export(export_format, filters, month, include_archives), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="logs_sistema_{label}.{extension}"'
+    return response
+
+@admin_required
+def performance_metrics(request):
+    admin_data = request.school_user
+    
+    if request.method == 'POST' and request.POST.get('action') == 'reset':
+        view_metrics.reset()
+        get_log_policy().reset()
+        cache_stats.reset()
+        messages.success(request, 'Métricas reiniciadas')
+        return redirect('performance_metrics')
+    
+    return render(request, 'admin/performance.html', {
+        'user_type': 'admin',
+        'user_data': admin_data,
+        'metrics': view_metrics.summary(),
+        'log_stats': log_buffer_stats(),
+        'policy_stats': log_policy_stats(),
+        'cache_stats': cache_stats.summary(),
     })
 
 @admin_required
 def manage_users(request):
-    admin_id = request.session.get('user_id')
-    admin_data = Admin.objects.get(ci=admin_id)
+    admin_data = request.school_user
     
     if request.method == 'GET':
         log_user_activity(request, 'VIEW', 'Accedió a gestión de usuarios')
@@ -261,48 +354,44 @@ def manage_users(request):
             password = request.POST.get('password')
             
             try:
-                # Validar duplicados globales
-                if (Student.objects.filter(ci=ci).exists() or 
-                    Teacher.objects.filter(ci=ci).exists() or 
-                    Admin.objects.filter(ci=ci).exists()):
-                    messages.error(request, f'Ya existe un usuario con la cédula {ci}')
-                elif (Student.objects.filter(username=username).exists() or 
-                      Teacher.objects.filter(username=username).exists() or 
-                      Admin.objects.filter(username=username).exists()):
-                    messages.error(request, f'Ya existe un usuario con el nombre de usuario "{username}"')
-                elif (Student.objects.filter(email=email).exists() or 
-                      Teacher.objects.filter(email=email).exists() or 
-                      Admin.objects.filter(email=email).exists()):
-                    messages.error(request, f'Ya existe un usuario con el email {email}')
+                # Validar duplicados globales con una sola consulta al registro de identidades
+                conflict = find_identity_conflict(ci=ci, username=username, email=email)
+                if conflict:
+                    messages.error(request, DUPLICATE_MESSAGES[conflict].format(ci=ci, username=username, email=email))
                 else:
                     if user_type == 'student':
                         grade_id = request.POST.get('grade_id')
                         
-                        Student.objects.create(
-                            username=username,
-                            name=name,
-                            last_name=last_name,
-                            ci=ci,
-                            email=email,
-                            password=password,
-                            grade=int(grade_id) if grade_id else 1
-                        )
+                        with transaction.atomic():
+                            Student.objects.create(
+                                username=username,
+                                name=name,
+                                last_name=last_name,
+                                ci=ci,
+                                email=email,
+                                password=password,
+                                grade=int(grade_id) if grade_id else 1
+                            )
                         log_user_activity(request, 'CREATE', f'Creó estudiante: {name} {last_name}')
                         messages.success(request, f'Estudiante "{name} {last_name}" creado exitosamente')
                     
                     elif user_type == 'teacher':
-                        Teacher.objects.create(
-                            username=username,
-                            name=name,
-                            last_name=last_name,
-                            ci=ci,
-                            email=email,
-                            password=password
-                        )
+                        with transaction.atomic():
+                            Teacher.objects.create(
+                                username=username,
+                                name=name,
+                                last_name=last_name,
+                                ci=ci,
+                                email=email,
+                                password=password
+                            )
                         
                         log_user_activity(request, 'CREATE', f'Creó profesor: {name} {last_name}')
                         messages.success(request, f'Profesor "{name} {last_name}" creado exitosamente')
                 
+            except IntegrityError:
+                conflict = find_identity_conflict(ci=ci, username=username, email=email) or 'ci'
+                messages.error(request, DUPLICATE_MESSAGES[conflict].format(ci=ci, username=username, email=email))
             except Exception as e:
                 messages.error(request, f'Error al crear usuario: {str(e)}')
         
@@ -315,18 +404,10 @@ def manage_users(request):
             
             try:
                 # Validar duplicados excluyendo el usuario actual
-                username_exists = (Student.objects.filter(username=username).exclude(ci=user_id).exists() or 
-                                 Teacher.objects.filter(username=username).exclude(ci=user_id).exists() or 
-                                 Admin.objects.filter(username=username).exclude(ci=user_id).exists())
+                conflict = find_identity_conflict(username=username, email=email, exclude_ci=user_id)
                 
-                email_exists = (Student.objects.filter(email=email).exclude(ci=user_id).exists() or 
-                              Teacher.objects.filter(email=email).exclude(ci=user_id).exists() or 
-                              Admin.objects.filter(email=email).exclude(ci=user_id).exists())
-                
-                if username_exists:
-                    messages.error(request, f'Ya existe un usuario con el nombre de usuario "{username}"')
-                elif email_exists:
-                    messages.error(request, f'Ya existe un usuario con el email {email}')
+                if conflict:
+                    messages.error(request, DUPLICATE_MESSAGES[conflict].format(ci=user_id, username=username, email=email))
                 else:
                     if user_type == 'student':
                         student = Student.objects.get(ci=user_id)
@@ -337,7 +418,8 @@ def manage_users(request):
                         student.email = email
                         if request.POST.get('grade_id'):
                             student.grade = int(request.POST.get('grade_id'))
-                        student.save()
+                        with transaction.atomic():
+                            student.save()
                         
                         log_user_activity(request, 'UPDATE', f'Actualizó estudiante: {old_name} → {name} {last_name}')
                         
@@ -348,11 +430,17 @@ def manage_users(request):
                         teacher.name = name
                         teacher.last_name = last_name
                         teacher.email = email
-                        teacher.save()
+                        with transaction.atomic():
+                            teacher.save()
                         
                         log_user_activity(request, 'UPDATE', f'Actualizó profesor: {old_name} → {name} {last_name}')
                         
                     messages.success(request, 'Usuario actualizado exitosamente')
+            except IdentityConflictError as e:
+                messages.error(request, str(e))
+            except IntegrityError:
+                conflict = find_identity_conflict(username=username, email=email, exclude_ci=user_id) or 'username'
+                messages.error(request, DUPLICATE_MESSAGES[conflict].format(ci=user_id, username=username, email=email))
             except Exception as e:
                 messages.error(request, f'Error al actualizar usuario: {str(e)}')
         
@@ -377,8 +465,11 @@ def manage_users(request):
             except Exception as e:
                 messages.error(request, f'Error al eliminar usuario: {str(e)}')
     
-    students = Student.objects.all()
-    teachers = Teacher.objects.all()
+    # Listados paginados con búsqueda en el servidor: la página no crece con la cantidad de usuarios
+    student_q = request.GET.get('student_q', '').strip()
+    teacher_q = request.GET.get('teacher_q', '').strip()
+    students = students_page(student_q, request.GET.get('student_page'))
+    teachers = teachers_page(teacher_q, request.GET.get('teacher_page'))
     grades = Grade.objects.all()
     
     return render(request, 'admin/manage_users.html', {
@@ -386,28 +477,23 @@ def manage_users(request):
         'user_data': admin_data,
         'students': students,
         'teachers': teachers,
+        'student_q': student_q,
+        'teacher_q': teacher_q,
+        'active_tab': 'teachers' if request.GET.get('tab') == 'teachers' else 'students',
         'grades': grades
     })
 
 @admin_required
 def course_students(request, course_id):
-    admin_id = request.session.get('user_id')
-    admin_data = Admin.objects.get(ci=admin_id)
+    admin_data = request.school_user
     
     try:
         course = Course.objects.get(id=course_id)
-        students = Student.objects.filter(grade=course.grade)
         
-        # Filtros
+        # Filtros (índice de texto del directorio, ordenado por relevancia)
         search_name = request.GET.get('search_name', '')
         search_ci = request.GET.get('search_ci', '')
-        
-        if search_name:
-            students = students.filter(name__icontains=search_name) | students.filter(last_name__icontains=search_name)
-        if search_ci:
-            students = students.filter(ci__icontains=search_ci)
-            
-        students = students.order_by('name', 'last_name')
+        students = search_students(course.grade, search_name, search_ci)
         
         log_user_activity(request, 'VIEW', f'Consultó estudiantes de la materia: {course.name_course}')
         
@@ -426,22 +512,25 @@ def course_students(request, course_id):
         messages.error(request, 'La materia no existe')
         return redirect('manage_courses')
 
+@admin_required
+def directory_search(request):
+    """Sugerencias de estudiantes y profesores para el autocompletado (JSON)"""
+    user_type = request.GET.get('type')
+    if user_type not in ('student', 'teacher'):
+        user_type = None
+    grade = request.GET.get('grade')
+    grade = int(grade) if grade and grade.isdigit() else None
+    return JsonResponse({'results': autocomplete(request.GET.get('q', ''), user_type, grade)})
+
 @admin_required
 def course_students_pdf(request, course_id):
     try:
         course = Course.objects.get(id=course_id)
-        students = Student.objects.filter(grade=course.grade)
         
         # Aplicar filtros
         search_name = request.GET.get('search_name', '')
         search_ci = request.GET.get('search_ci', '')
-        
-        if search_name:
-            students = students.filter(name__icontains=search_name) | students.filter(last_name__icontains=search_name)
-        if search_ci:
-            students = students.filter(ci__icontains=search_ci)
-            
-        students = students.order_by('name', 'last_name')
+        students = search_students(course.grade, search_name, search_ci)
         
         # Crear PDF
         response = HttpResponse(content_type='application/pdf')
@@ -482,7 +571,7 @@ def course_students_pdf(request, course_id):
         elements.append(Spacer(1, 20))
         
         # Total de estudiantes
-        total = Paragraph(f"<b>Total de estudiantes: {students.count()}</b>", styles['Normal'])
+        total = Paragraph(f"<b>Total de estudiantes: {len(students)}</b>", styles['Normal'])
         elements.append(total)
         
         doc.build(elements)
@@ -496,8 +585,7 @@ def course_students_pdf(request, course_id):
 
 @admin_required
 def maintenance(request):
-    admin_id = request.session.get('user_id')
-    admin_data = Admin.objects.get(ci=admin_id)
+    admin_data = request.school_user
     
     if request.method == 'GET':
         log_user_activity(request, 'VIEW', 'Accedió a mantenimiento del sistema')
@@ -511,22 +599,13 @@ def maintenance(request):
                 messages.error(request, 'Debe especificar la ruta de respaldo')
             else:
                 try:
-                    # Verificar que la ruta existe
-                    if not os.path.exists(backup_path):
-                        messages.error(request, 'La ruta especificada no existe')
-                    else:
-                        # Crear nombre del archivo de respaldo
-                        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                        backup_filename = f'backup_aula_virtual_{timestamp}.db'
-                        backup_full_path = os.path.join(backup_path, backup_filename)
-                        
-                        # Copiar la base de datos
-                        db_path = os.path.join(settings.BASE_DIR, 'db.sqlite3')
-                        shutil.copy2(db_path, backup_full_path)
-                        
-                        log_user_activity(request, 'BACKUP', f'Respaldó base de datos en: {backup_full_path}')
-                        messages.success(request, f'Respaldo creado exitosamente: {backup_filename}')
-                        
+                    # El respaldo corre en segundo plano; la página consulta su avance
+                    job = start_backup(backup_path)
+                    log_user_activity(request, 'BACKUP', f'Inició respaldo de base de datos en: {backup_path}')
+                    messages.success(request, 'Respaldo iniciado. Puede seguir usando el sistema mientras se crea.')
+                    return redirect(f"{request.path}?job={job.id}")
+                except BackupError as e:
+                    messages.error(request, str(e))
                 except Exception as e:
                     messages.error(request, f'Error al crear respaldo: {str(e)}')
         
@@ -536,40 +615,78 @@ def maintenance(request):
                 messages.error(request, 'Debe seleccionar un archivo de respaldo')
             else:
                 try:
-                    # Verificar extensión del archivo
-                    if not restore_file.name.endswith('.db'):
-                        messages.error(request, 'El archivo debe tener extensión .db')
-                    else:
-                        # Crear respaldo de seguridad antes de restaurar
-                        db_path = os.path.join(settings.BASE_DIR, 'db.sqlite3')
-                        backup_current = os.path.join(settings.BASE_DIR, f'db_backup_before_restore_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db')
-                        shutil.copy2(db_path, backup_current)
-                        
-                        # Restaurar base de datos
-                        with open(db_path, 'wb+') as destination:
-                            for chunk in restore_file.chunks():
-                                destination.write(chunk)
-                        
-                        log_user_activity(request, 'RESTORE', f'Restauró base de datos desde: {restore_file.name}')
-                        messages.success(request, 'Base de datos restaurada exitosamente. Reinicie el servidor.')
-                        
+                    restore_backup(restore_file)
+                    # La sesión actual no existe en la base restaurada: se guarda con una clave nueva
+                    request.session.cycle_key()
+                    log_user_activity(request, 'RESTORE', f'Restauró base de datos desde: {restore_file.name}')
+                    messages.success(request, 'Base de datos restaurada y verificada exitosamente.')
+                    return redirect('maintenance')
+                except BackupError as e:
+                    messages.error(request, str(e))
                 except Exception as e:
                     messages.error(request, f'Error al restaurar: {str(e)}')
     
     # Obtener información de la base de datos actual
-    db_path = os.path.join(settings.BASE_DIR, 'db.sqlite3')
-    db_size = 0
-    db_modified = None
-    
-    if os.path.exists(db_path):
-        db_size = os.path.getsize(db_path)
-        db_modified = datetime.fromtimestamp(os.path.getmtime(db_path))
+    db_info = database_info()
+    try:
+        restore_extensions = ','.join(accepted_extensions())
+    except BackupError:
+        restore_extensions = ''
     
     context = {
         'user_type': 'admin',
         'user_data': admin_data,
-        'db_size': db_size,
-        'db_modified': db_modified,
+        'db_engine': db_info['engine'],
+        'db_size': db_info['size'],
+        'db_modified': db_info['modified'],
+        'backup_extension': restore_extensions,
+        'backup_compression': get_backup_settings()['COMPRESSION'],
+        'backup_job': get_backup_job(request.GET.get('job', '')),
     }
     
-    return render(request, 'admin/maintenance.html', context)
\ No newline at end of file
+    return render(request, 'admin/maintenance.html', context)
+
+@admin_required
+def backup_status(request, job_id):
+    """Avance de un respaldo en segundo plano (JSON para la página de mantenimiento)"""
+    job = get_backup_job(job_id)
+    if job is None:
+        raise Http404('Respaldo no encontrado')
+    return JsonResponse(job.as_dict())
+
+@admin_required
+def export_report_cards(request):
+    """Exporta los boletines de un grado (o del grado de una materia) en un ZIP o un solo PDF"""
+    grade = request.GET.get('grade')
+    course_id = request.GET.get('course')
+    export_format = request.GET.get('format', 'zip')
+    
+    try:
+        if course_id:
+            course = Course.objects.get(id=course_id)
+            grade = course.grade
+            label = f'{course.name_course}_grado_{grade}'
+        else:
+            grade = int(grade)
+            label = f'grado_{grade}'
+    except (Course.DoesNotExist, TypeError, ValueError):
+        messages.error(request, 'Debe indicar un grado o una materia válida')
+        return redirect('manage_grades')
+    
+    reports = build_grade_reports(grade)
+    if not reports:
+        messages.error(request, f'No hay estudiantes en el grado {grade}')
+        return redirect('manage_grades')
+    
+    log_user_activity(request, 'EXPORT', f'Exportó {len(reports)} boletines del grado {grade} ({export_format})')
+    
+    if export_format == 'pdf':
+        # reportlab arma el PDF completo al guardar: se escribe en un archivo temporal y se envía por partes
+        output = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_SIZE)
+        write_report_cards_pdf(reports, output)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=f'boletines_{label}.pdf', content_type='application/pdf')
+    
+    response = StreamingHttpResponse(iter_report_cards_zip(reports), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="boletines_{label}.zip"'
+    return response
@@ -0,0 +1,519 @@
+import glob
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.migrations.loader import MigrationLoader
+from django.utils import timezone
+
+from .view_cache import clear_view_cache
+
+# Extensión de los respaldos de cada motor
+BACKUP_EXTENSIONS = {
+    'sqlite': '.db',
+    'postgresql': '.dump',
+}
+
+# Extensión que se agrega según la compresión
+COMPRESSION_EXTENSIONS = {
+    'none': '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+# Configuración por defecto (se puede sobreescribir con DATABASE_BACKUP en settings.py)
+DEFAULT_BACKUP_SETTINGS = {
+    'COMPRESSION': 'gzip',      # none, gzip o zstd (requiere zstandard)
+    'PAGES_PER_STEP': 1024,     # Páginas de SQLite copiadas por paso
+    'KEEP_SAFETY_COPIES': 3,    # Copias db_backup_before_restore_* que se conservan
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+SQLITE_HEADER = b'SQLite format 3\x00'
+
+
+class BackupError(Exception):
+    """No se pudo respaldar o restaurar la base de datos"""
+
+
+def get_backup_settings():
+    """Combina la configuración por defecto con DATABASE_BACKUP"""
+    config = dict(DEFAULT_BACKUP_SETTINGS)
+    config.update(getattr(settings, 'DATABASE_BACKUP', {}))
+    if config['COMPRESSION'] not in COMPRESSION_EXTENSIONS:
+        raise BackupError(f"Compresión inválida: {config['COMPRESSION']}")
+    return config
+
+
+def backup_extension(compression='none'):
+    try:
+        return BACKUP_EXTENSIONS[connection.vendor] + COMPRESSION_EXTENSIONS[compression]
+    except KeyError:
+        raise BackupError(f'Respaldos no disponibles para el motor {connection.vendor}')
+
+
+def accepted_extensions():
+    """Extensiones que acepta la restauración (con o sin compresión)"""
+    base = backup_extension()
+    return [base + suffix for suffix in COMPRESSION_EXTENSIONS.values()]
+
+
+def sqlite_path():
+    return str(connection.settings_dict['NAME'])
+
+
+def pg_command(program, *args):
+    """Comando de PostgreSQL con los datos de conexión en variables de entorno (la clave no queda en ps)"""
+    executable = shutil.which(program)
+    if executable is None:
+        raise BackupError(f'{program} no está instalado en el servidor')
+
+    db = connection.settings_dict
+    env = dict(os.environ)
+    env.update({
+        'PGDATABASE': db['NAME'],
+        'PGUSER': db['USER'] or '',
+        'PGPASSWORD': db['PASSWORD'] or '',
+        'PGHOST': db['HOST'] or '',
+        'PGPORT': str(db['PORT'] or ''),
+    })
+    return [executable, *args], env
+
+
+def run_pg_command(program, *args):
+    command, env = pg_command(program, *args)
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise BackupError(f'{program} falló: {result.stderr.strip()}')
+
+
+def database_info():
+    """Motor, tamaño y última modificación (si el motor la expone) de la base actual"""
+    info = {'engine': connection.vendor, 'size': 0, 'modified': None}
+    if connection.vendor == 'sqlite':
+        path = sqlite_path()
+        if os.path.exists(path):
+            info['size'] = os.path.getsize(path)
+            info['modified'] = datetime.fromtimestamp(os.path.getmtime(path))
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_database_size(current_database())')
+            info['size'] = cursor.fetchone()[0]
+    return info
+
+
+class HashingWriter:
+    """Archivo de salida que calcula el SHA-256 de lo que se escribe"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+
+def compressor(output, compression):
+    """Envuelve output con el compresor indicado"""
+    if compression == 'gzip':
+        # mtime=0: el mismo contenido produce el mismo archivo (y el mismo hash)
+        return gzip.GzipFile(fileobj=output, mode='wb', compresslevel=6, mtime=0)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise BackupError('Para comprimir con zstd instale zstandard o use gzip')
+        return zstandard.ZstdCompressor(level=3).stream_writer(output, closefd=False)
+    return None
+
+
+def snapshot_sqlite(destination, pages_per_step, progress=None):
+    """Copia consistente de la base SQLite con la API de respaldo, sin bloquear a los demás.
+
+    La transacción de lectura abierta en el origen fija una instantánea: con WAL
+    las escrituras siguen funcionando y la copia no se reinicia si hay cambios.
+    """
+    path = sqlite_path()
+    # uri=True para la base en memoria compartida de las pruebas (file:memorydb_...)
+    source = sqlite3.connect(path, timeout=30, isolation_level=None, uri=path.startswith('file:'))
+    target = sqlite3.connect(destination)
+    try:
+        source.execute('BEGIN')
+        source.execute('SELECT count(*) FROM sqlite_master').fetchone()
+
+        def report(status, remaining, total):
+            if progress and total:
+                progress((total - remaining) / total)
+
+        source.backup(target, pages=pages_per_step, progress=report)
+        source.execute('COMMIT')
+    finally:
+        target.close()
+        source.close()
+
+
+def snapshot_postgresql(destination):
+    run_pg_command('pg_dump', '--format=custom', '--no-owner', f'--file={destination}')
+
+
+def write_backup(destination, compression='none', progress=None):
+    """Escribe un respaldo completo de la base actual en destination.
+
+    Primero se toma una instantánea en un archivo temporal del mismo directorio,
+    luego se comprime y se calcula el SHA-256 en una sola pasada hacia
+    destination.part. El archivo final aparece con os.replace, así nunca queda un
+    respaldo a medias con el nombre definitivo. Devuelve {'sha256', 'size'}.
+    """
+    config = get_backup_settings()
+    progress = progress or (lambda phase, fraction: None)
+    directory = os.path.dirname(os.path.abspath(destination))
+    fd, snapshot = tempfile.mkstemp(prefix='.snapshot_', suffix='.part', dir=directory)
+    os.close(fd)
+    partial = destination + '.part'
+    try:
+        if connection.vendor == 'sqlite':
+            snapshot_sqlite(snapshot, config['PAGES_PER_STEP'], lambda fraction: progress('copy', fraction))
+        elif connection.vendor == 'postgresql':
+            snapshot_postgresql(snapshot)
+        else:
+            raise BackupError(f'Respaldos no disponibles para el motor {connection.vendor}')
+        progress('copy', 1.0)
+
+        total = os.path.getsize(snapshot) or 1
+        done = 0
+        with open(snapshot, 'rb') as src, open(partial, 'wb') as raw:
+            output = HashingWriter(raw)
+            stream = compressor(output, compression)
+            writer = stream or output
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                done += len(chunk)
+                progress('compress', done / total)
+            if stream is not None:
+                stream.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(partial, destination)
+    finally:
+        for path in (snapshot, partial):
+            if os.path.exists(path):
+                os.remove(path)
+
+    digest = output.sha256.hexdigest()
+    # Mismo formato que sha256sum, para verificar con "sha256sum -c"
+    with open(destination + '.sha256', 'w', encoding='utf-8') as f:
+        f.write(f'{digest}  {os.path.basename(destination)}\n')
+    return {'sha256': digest, 'size': output.size}
+
+
+def backup_file_path(directory, prefix, compression):
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(directory, f'{prefix}_{timestamp}{backup_extension(compression)}')
+
+
+def create_backup(directory, prefix='backup_aula_virtual', compression=None, progress=None):
+    """Crea un respaldo con fecha en el directorio indicado y devuelve su ruta"""
+    if not os.path.isdir(directory):
+        raise BackupError('La ruta especificada no existe')
+
+    compression = compression or get_backup_settings()['COMPRESSION']
+    path = backup_file_path(directory, prefix, compression)
+    write_backup(path, compression, progress)
+    return path
+
+
+def rotate_backups(directory, prefix, keep):
+    """Borra los respaldos más antiguos con ese prefijo y deja los `keep` más recientes"""
+    if keep is None:
+        return []
+    # El nombre lleva la fecha (AAAAMMDD_HHMMSS), así que el orden alfabético es cronológico
+    paths = sorted(
+        path for path in glob.glob(os.path.join(glob.escape(str(directory)), f'{prefix}_*'))
+        if not path.endswith(('.sha256', '.part'))
+    )
+    removed = paths[:-keep] if keep > 0 else paths
+    for path in removed:
+        for stale in (path, path + '.sha256'):
+            if os.path.exists(stale):
+                os.remove(stale)
+    return removed
+
+
+class BackupJob:
+    """Respaldo que corre en un hilo en segundo plano; la vista consulta su avance"""
+
+    def __init__(self, directory, compression):
+        self.id = uuid.uuid4().hex
+        self.directory = directory
+        self.compression = compression
+        self.status = 'pending'   # pending, running, done, error
+        self.phase = 'copy'       # copy, compress
+        self.progress = 0.0
+        self.path = None
+        self.sha256 = None
+        self.size = 0
+        self.error = None
+        self.started_at = timezone.now()
+        self.finished_at = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f'backup-{self.id[:8]}', daemon=True)
+        self._thread.start()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self.status in ('pending', 'running')
+
+    def _progress(self, phase, fraction):
+        self.phase = phase
+        # La copia es el 80 % del trabajo y la compresión el 20 % restante
+        self.progress = round(80 * fraction if phase == 'copy' else 80 + 20 * fraction, 1)
+
+    def _run(self):
+        self.status = 'running'
+        try:
+            path = backup_file_path(self.directory, 'backup_aula_virtual', self.compression)
+            result = write_backup(path, self.compression, self._progress)
+            self.path, self.sha256, self.size = path, result['sha256'], result['size']
+            self.progress = 100.0
+            self.status = 'done'
+        except Exception as e:
+            self.error = str(e)
+            self.status = 'error'
+        finally:
+            self.finished_at = timezone.now()
+            connection.close()
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'phase': self.phase,
+            'progress': self.progress,
+            'file': os.path.basename(self.path) if self.path else None,
+            'sha256': self.sha256,
+            'size': self.size,
+            'error': self.error,
+        }
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def start_backup(directory, compression=None):
+    """Inicia un respaldo en segundo plano y devuelve el BackupJob.
+
+    Los trabajos se guardan en memoria del proceso, igual que las métricas de vistas.
+    """
+    if not os.path.isdir(directory):
+        raise BackupError('La ruta especificada no existe')
+    compression = compression or get_backup_settings()['COMPRESSION']
+    backup_extension(compression)
+
+    with _jobs_lock:
+        if any(job.running for job in _jobs.values()):
+            raise BackupError('Ya hay un respaldo en curso')
+        job = BackupJob(directory, compression)
+        _jobs[job.id] = job
+    job.start()
+    return job
+
+
+def get_backup_job(job_id):
+    return _jobs.get(job_id)
+
+
+def iter_backup_chunks(fileobj, name):
+    """Bloques de un respaldo (subido o en disco), descomprimidos si vienen en gzip o zstd"""
+    if name.endswith(COMPRESSION_EXTENSIONS['gzip']):
+        fileobj.seek(0)
+        stream = gzip.GzipFile(fileobj=fileobj, mode='rb')
+    elif name.endswith(COMPRESSION_EXTENSIONS['zstd']):
+        try:
+            import zstandard
+        except ImportError:
+            raise BackupError('Para restaurar respaldos zstd instale zstandard')
+        fileobj.seek(0)
+        stream = zstandard.ZstdDecompressor().stream_reader(fileobj)
+    elif hasattr(fileobj, 'chunks'):
+        yield from fileobj.chunks()
+        return
+    else:
+        stream = fileobj
+
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    except (OSError, EOFError) as e:
+        raise BackupError(f'El archivo comprimido está dañado: {e}')
+
+
+def stage_backup(fileobj, name, directory):
+    """Escribe el respaldo descomprimido en un archivo temporal, por bloques (memoria constante)"""
+    fd, path = tempfile.mkstemp(prefix='.restore_', suffix=BACKUP_EXTENSIONS[connection.vendor], dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as staged:
+            for chunk in iter_backup_chunks(fileobj, name):
+                staged.write(chunk)
+            staged.flush()
+            os.fsync(staged.fileno())
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def check_migrations(applied):
+    """Compara las migraciones del respaldo con las del código; devuelve las pendientes"""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    known = set(loader.disk_migrations)
+    project_apps = {app for app, name in known}
+    applied = {migration for migration in applied if migration[0] in project_apps}
+
+    if not any(app == 'model_students' for app, name in applied):
+        raise BackupError('El archivo no es un respaldo de este sistema')
+    newer = sorted(applied - known)
+    if newer:
+        names = ', '.join(f'{app}.{name}' for app, name in newer[:3])
+        raise BackupError(f'El respaldo es de una versión más nueva del sistema (migraciones desconocidas: {names})')
+    return sorted(known - applied)
+
+
+def check_sqlite_backup(path):
+    """PRAGMA integrity_check y compatibilidad de migraciones; devuelve las migraciones pendientes"""
+    with open(path, 'rb') as f:
+        if f.read(len(SQLITE_HEADER)) != SQLITE_HEADER:
+            raise BackupError('El archivo no es una base de datos SQLite')
+
+    db = sqlite3.connect(path)
+    try:
+        # Sin WAL el archivo temporal es autocontenido (no deja -wal ni -shm)
+        db.execute('PRAGMA journal_mode=DELETE')
+        problems = [row[0] for row in db.execute('PRAGMA integrity_check(10)')]
+        if problems != ['ok']:
+            raise BackupError(f"El respaldo está dañado: {'; '.join(problems)}")
+        applied = db.execute('SELECT app, name FROM django_migrations').fetchall()
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f'El respaldo está dañado o no es de este sistema: {e}')
+    finally:
+        db.close()
+    return check_migrations(applied)
+
+
+def load_sqlite_file(path):
+    """Copia path sobre la base en uso con la API de respaldo de SQLite.
+
+    La copia es una sola transacción de escritura: las demás conexiones (de este u
+    otros procesos) esperan busy_timeout y luego ven la base nueva completa, o la
+    anterior si algo falla. No hace falta reiniciar el servidor.
+    """
+    if connection.is_in_memory_db():
+        raise BackupError('No se puede restaurar una base de datos en memoria')
+
+    connections.close_all()
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(sqlite_path(), timeout=30)
+    try:
+        source.backup(target)
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f'No se pudo reemplazar la base de datos: {e}')
+    finally:
+        target.close()
+        source.close()
+        connections.close_all()
+
+
+def apply_migrations():
+    call_command('migrate', interactive=False, verbosity=0)
+
+
+def replace_sqlite(fileobj, name):
+    """Valida el respaldo en un archivo temporal y lo copia sobre la base en uso.
+
+    Devuelve las migraciones pendientes del respaldo.
+    """
+    directory = os.path.dirname(os.path.abspath(sqlite_path()))
+    staged = stage_backup(fileobj, name, directory)
+    try:
+        pending = check_sqlite_backup(staged)
+        load_sqlite_file(staged)
+    finally:
+        os.remove(staged)
+    return pending
+
+
+def restore_sqlite(fileobj, name, safety_copy):
+    pending = replace_sqlite(fileobj, name)
+    if pending:
+        # Respaldo de una versión anterior: se actualiza el esquema; si falla se vuelve a la copia
+        try:
+            apply_migrations()
+        except Exception as e:
+            with open(safety_copy, 'rb') as f:
+                replace_sqlite(f, safety_copy)
+            raise BackupError(f'No se pudieron aplicar las migraciones del respaldo; se restauró la base anterior ({e})')
+
+
+def restore_postgresql(fileobj, name):
+    with tempfile.TemporaryDirectory() as directory:
+        staged = stage_backup(fileobj, name, directory)
+        # pg_restore --list lee todo el índice del archivo: falla si está dañado o no es un volcado
+        run_pg_command('pg_restore', '--list', staged)
+        connections.close_all()
+        run_pg_command(
+            'pg_restore', '--clean', '--if-exists', '--no-owner', '--single-transaction',
+            f"--dbname={connection.settings_dict['NAME']}", staged
+        )
+    connections.close_all()
+    apply_migrations()
+
+
+def restore_backup(uploaded_file):
+    """Reemplaza la base actual con un respaldo subido; antes guarda una copia en BASE_DIR.
+
+    El respaldo se valida antes de tocar la base en uso. Devuelve la ruta de la copia
+    de seguridad.
+    """
+    extensions = accepted_extensions()
+    if not uploaded_file.name.endswith(tuple(extensions)):
+        raise BackupError(f"El archivo debe tener extensión {', '.join(extensions)}")
+
+    safety_copy = create_backup(settings.BASE_DIR, prefix='db_backup_before_restore')
+    rotate_backups(settings.BASE_DIR, 'db_backup_before_restore', get_backup_settings()['KEEP_SAFETY_COPIES'])
+
+    if connection.vendor == 'sqlite':
+        restore_sqlite(uploaded_file, uploaded_file.name, safety_copy)
+    else:
+        restore_postgresql(uploaded_file, uploaded_file.name)
+    # Los datos en caché corresponden a la base anterior
+    clear_view_cache()
+    return safety_copy
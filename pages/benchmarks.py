@@ -0,0 +1,229 @@
+import platform
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from model_students.models import Admin, Course, Evaluation, Punctuation, Student, Teacher
+from .backup import BackupJob, _jobs, _jobs_lock
+from .metrics import RequestMetrics, percentile
+
+# Casos por nombre de URL: (rol, parámetros de la URL, query string).
+# Los parámetros se toman de los datos de ejemplo elegidos en pick_samples().
+CASES = {
+    'home': [(None, (), '')],
+    'register': [(None, (), '')],
+    'reset_password': [(None, (), '')],
+    'dashboard': [('student', (), ''), ('teacher', (), '')],
+    'classroom': [('student', (), ''), ('teacher', (), '')],
+    'manage_evaluations': [('teacher', (), '')],
+    'create_evaluation': [('teacher', (), '')],
+    'grade_evaluation': [('teacher', ('eval_id',), '')],
+    'import_grades': [('teacher', ('eval_id',), '')],
+    'export_grades': [('teacher', (), '?evaluation={eval_id}'), ('admin', (), '?course={course_id}')],
+    'profile': [('student', (), ''), ('teacher', (), '')],
+    'edit_profile': [('student', (), '')],
+    'my_subjects': [('student', (), '')],
+    'subject_detail': [('student', ('subject_name',), '')],
+    'teacher_subjects': [('teacher', (), '')],
+    'student_reports': [('teacher', (), ''), ('admin', (), '')],
+    'generate_student_report': [('teacher', ('student_ci',), ''), ('teacher', ('student_ci',), '?pdf=1')],
+    'update_evaluations': [('teacher', (), '')],
+    'virtual_classroom': [('student', ('course_id',), ''), ('teacher', ('course_id',), '')],
+    'admin_dashboard': [('admin', (), '')],
+    'manage_grades': [('admin', (), '')],
+    'manage_courses': [('admin', (), '')],
+    'manage_users': [('admin', (), '')],
+    'system_logs': [('admin', (), '')],
+    'performance_metrics': [('admin', (), '')],
+    'course_students': [('admin', ('course_id',), '')],
+    'course_students_pdf': [('admin', ('course_id',), '')],
+    'maintenance': [('admin', (), '')],
+    'export_report_cards': [('admin', (), '?course={course_id}&format=zip')],
+    'export_system_logs': [('admin', (), '?action=LOGIN&date_from={today}')],
+    'directory_search': [('admin', (), '?q={name_prefix}'), ('admin', (), '?q={name_prefix}&type=student&grade={grade}')],
+    'backup_status': [('admin', ('backup_job_id',), '')],
+}
+
+# URLs que modifican datos o cierran la sesión con un GET
+SKIPPED = {
+    'delete_evaluation': 'elimina la evaluación con un GET',
+    'logout': 'cierra la sesión del cliente',
+}
+
+
+class BenchmarkError(Exception):
+    """No hay datos suficientes para ejecutar las pruebas"""
+
+
+def pick_samples():
+    """Elige una materia con evaluaciones, su profesor, un estudiante del grado y un administrador"""
+    evaluation = Evaluation.objects.filter(course__teacher__isnull=False).select_related(
+        'course', 'course__teacher'
+    ).order_by('course_id', 'id').first()
+    if evaluation is None:
+        raise BenchmarkError('No hay materias con profesor y evaluaciones; ejecute create_initial_data.py --benchmark')
+
+    course = evaluation.course
+    student = Student.objects.filter(grade=course.grade).order_by('ci').first()
+    admin = Admin.objects.order_by('ci').first()
+    if student is None or admin is None:
+        raise BenchmarkError('Se necesita al menos un estudiante en el grado de la materia y un administrador')
+
+    return {
+        'users': {'student': student, 'teacher': course.teacher, 'admin': admin},
+        'params': {
+            'eval_id': evaluation.id,
+            'course_id': course.id,
+            'subject_name': course.name_course,
+            'student_ci': student.ci,
+            'grade': course.grade,
+            # Lo que se escribe en el autocompletado: las primeras letras de un nombre
+            'name_prefix': student.name[:3],
+            'today': timezone.localdate().isoformat(),
+            'backup_job_id': finished_backup_job().id,
+        },
+    }
+
+
+def finished_backup_job():
+    """Respaldo ya terminado para medir la consulta de avance sin respaldar nada"""
+    job = BackupJob(settings.BASE_DIR, 'none')
+    # Id fijo: la URL del caso debe ser la misma entre corridas para --compare
+    job.id = 'benchmark'
+    job.status, job.progress, job.finished_at = 'done', 100.0, timezone.now()
+    with _jobs_lock:
+        _jobs[job.id] = job
+    return job
+
+
+def dataset_summary():
+    return {
+        'students': Student.objects.count(),
+        'teachers': Teacher.objects.count(),
+        'courses': Course.objects.count(),
+        'evaluations': Evaluation.objects.count(),
+        'punctuations': Punctuation.objects.count(),
+    }
+
+
+def login(user_type, user):
+    client = Client()
+    response = client.post(reverse('home'), {
+        'username': user.username, 'password': user.password, 'user_type': user_type
+    })
+    if response.status_code != 302:
+        raise BenchmarkError(f'No se pudo iniciar sesión como {user_type} ({user.username})')
+    return client
+
+
+def iter_cases(url_names, params):
+    """Genera (nombre, rol, url) para cada caso; los nombres sin caso se devuelven con url None"""
+    for name in url_names:
+        if name in SKIPPED:
+            continue
+        if name not in CASES:
+            yield name, None, None
+            continue
+        for role, args, query in CASES[name]:
+            url = reverse(name, args=[params[arg] for arg in args]) + query.format(**params)
+            yield name, role, url
+
+
+def measure(client, url, repeat):
+    """Ejecuta el GET repeat veces y devuelve tiempos (ms), consultas y tiempo en base de datos"""
+    walls, queries, db_times = [], [], []
+    status = size = None
+    for _ in range(repeat):
+        metrics = RequestMetrics()
+        start = time.perf_counter()
+        with connection.execute_wrapper(metrics):
+            response = client.get(url)
+            # Las respuestas en streaming se consumen completas para medirlas
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+        walls.append((time.perf_counter() - start) * 1000)
+        queries.append(metrics.queries)
+        db_times.append(metrics.db_time * 1000)
+        status, size = response.status_code, len(content)
+        response.close()
+
+    return {
+        'status': status,
+        'bytes': size,
+        'queries': max(queries),
+        'db_ms': round(percentile(db_times, 50), 2),
+        'min_ms': round(min(walls), 2),
+        'p50_ms': round(percentile(walls, 50), 2),
+        'p95_ms': round(percentile(walls, 95), 2),
+        'max_ms': round(max(walls), 2),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(url_names, repeat=5, warmup=1):
+    """Recorre las URLs indicadas con el cliente de pruebas y devuelve los resultados"""
+    samples = pick_samples()
+    clients = {None: Client()}
+    for user_type, user in samples['users'].items():
+        clients[user_type] = login(user_type, user)
+
+    results = []
+    for name, role, url in iter_cases(url_names, samples['params']):
+        if url is None:
+            results.append({'name': name, 'role': None, 'url': None, 'status': None, 'error': 'sin caso de prueba'})
+            continue
+        client = clients[role]
+        for _ in range(warmup):
+            client.get(url)
+        row = {'name': name, 'role': role, 'url': url}
+        row.update(measure(client, url, repeat))
+        results.append(row)
+
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': repeat,
+        },
+        'dataset': dataset_summary(),
+        'skipped': SKIPPED,
+        'results': results,
+    }
+
+
+def compare_results(previous, current, threshold=0.2):
+    """Casos que empeoraron: más consultas o p50 más lento que el umbral (20% por defecto)"""
+    def key(row):
+        return row['name'], row['role'], row['url']
+
+    before = {key(row): row for row in previous['results'] if row.get('url')}
+    regressions = []
+    for row in current['results']:
+        old = before.get(key(row))
+        if old is None or not row.get('url'):
+            continue
+        slower = old['p50_ms'] and row['p50_ms'] > old['p50_ms'] * (1 + threshold)
+        if row['queries'] > old['queries'] or slower:
+            regressions.append({
+                'name': row['name'], 'role': row['role'], 'url': row['url'],
+                'queries': (old['queries'], row['queries']),
+                'p50_ms': (old['p50_ms'], row['p50_ms']),
+            })
+    return regressions
@@ -0,0 +1,178 @@
+"""Registro central de invalidación de la caché de vistas (view_cache).
+
+Cada modelo registrado tiene una regla que, a partir del objeto modificado (y de
+los valores anteriores de los campos que cambian la relación, como el grado o el
+profesor), devuelve las etiquetas afectadas. Los receptores de signals.py aplican
+las reglas; dentro de una transacción las etiquetas se juntan (un lote por
+savepoint) y se invalidan al confirmar con transaction.on_commit. Si la transacción
+se revierte no se invalida nada.
+
+Los modelos registrados con deleted_with no tienen receptor de borrado: se borran
+en cascada con su padre (una evaluación o una materia), cuya regla ya invalida sus
+etiquetas, y así Django los borra con un solo DELETE sin cargar cada fila.
+
+Las escrituras que no disparan señales (bulk_create, update) deben llamar a
+schedule_invalidation con las etiquetas que correspondan.
+"""
+from django.db import connections, transaction
+
+from model_students.models import (
+    Student, Teacher, Course, Grade, Evaluation, Punctuation, Material, Announcement, Assignment
+)
+from .view_cache import GLOBAL_TAG, course_tag, grade_tag, invalidate, user_tag
+
+# Modelo -> (campos cuyo valor anterior se necesita, regla)
+INVALIDATION_RULES = {}
+
+# Modelos que se borran con su padre (ver deleted_with)
+DELETED_WITH_PARENT = set()
+
+
+def invalidation_rule(model, tracked=(), deleted_with=None):
+    """Registra la regla que calcula las etiquetas afectadas por un cambio en model.
+
+    tracked: campos de model.TRACKED_FIELDS cuyo valor anterior recibe la regla.
+    deleted_with: nombre del padre cuya regla cubre el borrado (sin receptor de borrado).
+    """
+    def register(rule):
+        INVALIDATION_RULES[model] = (tuple(tracked), rule)
+        if deleted_with:
+            DELETED_WITH_PARENT.add(model)
+        return rule
+    return register
+
+
+class PendingInvalidations:
+    """Etiquetas acumuladas en una transacción; se invalidan al confirmarla"""
+
+    def __init__(self, savepoints):
+        self.savepoints = savepoints
+        self.tags = set()
+
+    def __call__(self):
+        invalidate(*sorted(self.tags))
+
+
+def schedule_invalidation(tags, using='default'):
+    """Invalida las etiquetas al confirmar la transacción actual (o ya, si no hay una)"""
+    tags = set(tags)
+    if not tags:
+        return
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        invalidate(*sorted(tags))
+        return
+
+    # Un lote por savepoint: si el savepoint (o la transacción) donde se registró se
+    # revirtió, la función ya no está en la lista de on_commit y se registra otra
+    savepoints = tuple(sid for sid in connection.savepoint_ids if sid)
+    pending = getattr(connection, 'pending_cache_invalidations', None)
+    if (pending is None or pending.savepoints != savepoints
+            or not any(entry[1] is pending for entry in connection.run_on_commit)):
+        pending = PendingInvalidations(savepoints)
+        connection.pending_cache_invalidations = pending
+        transaction.on_commit(pending, using=using)
+    pending.tags.update(tags)
+
+
+def remember_tracked_values(instance, using='default'):
+    """Guarda en el objeto los valores anteriores de los campos seguidos (antes de guardar).
+
+    Salen de los valores leídos de la base (TracksLoadedValues); solo se consulta si
+    el objeto no se cargó de la base.
+    """
+    tracked, _ = INVALIDATION_RULES[type(instance)]
+    instance._cache_old_values = instance.loaded_values(tracked, using) if tracked else {}
+
+
+def tags_for_change(instance):
+    """Etiquetas afectadas por guardar o eliminar instance.
+
+    Las reglas reciben los valores anteriores de los campos seguidos, o {} si el
+    objeto se está creando o eliminando.
+    """
+    _, rule = INVALIDATION_RULES[type(instance)]
+    old = getattr(instance, '_cache_old_values', {})
+    instance._cache_old_values = {}
+    return set(rule(instance, old))
+
+
+def teachers_of_grades(grades):
+    """Etiquetas de los profesores con materias en esos grados"""
+    teachers = Course.objects.filter(grade__in=set(grades)).exclude(teacher=None).values_list('teacher_id', flat=True)
+    return [user_tag('teacher', teacher_id) for teacher_id in set(teachers)]
+
+
+def course_audience(course_ids):
+    """Grados y profesores de unas materias (una sola consulta)"""
+    rows = Course.objects.filter(id__in=set(course_ids)).values_list('grade', 'teacher_id')
+    tags = []
+    for grade, teacher_id in rows:
+        tags.append(grade_tag(grade))
+        if teacher_id:
+            tags.append(user_tag('teacher', teacher_id))
+    return tags
+
+
+@invalidation_rule(Student, tracked=['grade'])
+def student_tags(student, old):
+    # Su propio dashboard y los contadores del administrador; al crearlo, borrarlo o
+    # cambiarlo de grado, también el total de estudiantes de los profesores del grado
+    tags = [user_tag('student', student.ci), GLOBAL_TAG]
+    if not old or old['grade'] != student.grade:
+        tags += teachers_of_grades({student.grade, old.get('grade', student.grade)})
+    return tags
+
+
+@invalidation_rule(Teacher)
+def teacher_tags(teacher, old):
+    # El nombre del profesor aparece en las materias y aulas de los grados donde enseña
+    grades = Course.objects.filter(teacher=teacher).values_list('grade', flat=True)
+    return [user_tag('teacher', teacher.ci), GLOBAL_TAG, *(grade_tag(grade) for grade in set(grades))]
+
+
+@invalidation_rule(Course, tracked=['grade', 'teacher_id'])
+def course_tags(course, old):
+    # Las materias y aulas de los estudiantes del grado y el dashboard y aulas del profesor
+    tags = [course_tag(course.id), GLOBAL_TAG]
+    for grade in {course.grade, old.get('grade', course.grade)}:
+        tags.append(grade_tag(grade))
+    for teacher_id in {course.teacher_id, old.get('teacher_id', course.teacher_id)}:
+        if teacher_id:
+            tags.append(user_tag('teacher', teacher_id))
+    return tags
+
+
+@invalidation_rule(Grade)
+def grade_tags(grade, old):
+    return [GLOBAL_TAG]
+
+
+@invalidation_rule(Evaluation, tracked=['course_id'])
+def evaluation_tags(evaluation, old):
+    # Próximas evaluaciones del grado y evaluaciones del profesor
+    course_ids = {evaluation.course_id, old.get('course_id', evaluation.course_id)}
+    return [*(course_tag(course_id) for course_id in course_ids), *course_audience(course_ids)]
+
+
+@invalidation_rule(Punctuation, deleted_with='evaluation')
+def punctuation_tags(punctuation, old):
+    # Notas, aprobadas y promedios del estudiante (al borrar la evaluación se invalida
+    # el grado de la materia, que incluye las vistas de todos sus estudiantes)
+    return [user_tag('student', punctuation.student_id)]
+
+
+@invalidation_rule(Material, deleted_with='course')
+@invalidation_rule(Announcement, deleted_with='course')
+def classroom_content_tags(item, old):
+    # Contadores de materiales y anuncios en las aulas del profesor
+    teacher_id = Course.objects.filter(id=item.course_id).values_list('teacher_id', flat=True).first()
+    tags = [course_tag(item.course_id)]
+    if teacher_id:
+        tags.append(user_tag('teacher', teacher_id))
+    return tags
+
+
+@invalidation_rule(Assignment, deleted_with='course')
+def assignment_tags(assignment, old):
+    return [course_tag(assignment.course_id)]
@@ -0,0 +1,51 @@
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from model_students.models import Evaluation, Student, StudentCourseStats
+
+
+def annotate_course_stats(courses):
+    """Agrega a un queryset de materias sus estadísticas con subconsultas (una sola consulta).
+
+    Cada materia queda con students_count, evaluations_count, average_score
+    (promedio de todas sus notas, según StudentCourseStats) y next_evaluation_id.
+    """
+    students = Student.objects.filter(grade=OuterRef('grade')).order_by().values('grade').annotate(
+        total=Count('ci')
+    ).values('total')
+    evaluations = Evaluation.objects.filter(course=OuterRef('pk')).order_by().values('course').annotate(
+        total=Count('id')
+    ).values('total')
+    average = StudentCourseStats.objects.filter(course=OuterRef('pk')).order_by().values('course').annotate(
+        average=Cast(Sum('total'), FloatField()) / Sum('count')
+    ).values('average')
+    next_evaluation = Evaluation.objects.filter(
+        course=OuterRef('pk'),
+        date__gt=timezone.now()
+    ).order_by('date').values('id')[:1]
+
+    return courses.annotate(
+        students_count=Coalesce(Subquery(students, output_field=IntegerField()), 0),
+        evaluations_count=Coalesce(Subquery(evaluations, output_field=IntegerField()), 0),
+        average_score=Coalesce(Subquery(average, output_field=FloatField()), 0.0),
+        next_evaluation_id=Subquery(next_evaluation),
+    )
+
+
+def get_course_stats(courses):
+    """Estadísticas de varias materias con dos consultas, sin importar cuántas sean"""
+    courses = list(annotate_course_stats(courses))
+    next_evaluations = Evaluation.objects.in_bulk(
+        [course.next_evaluation_id for course in courses if course.next_evaluation_id]
+    )
+    return [
+        {
+            'course': course,
+            'students_count': course.students_count,
+            'evaluations_count': course.evaluations_count,
+            'average_score': round(course.average_score, 2),
+            'next_evaluation': next_evaluations.get(course.next_evaluation_id),
+        }
+        for course in courses
+    ]
@@ -0,0 +1,172 @@
+import csv
+import io
+import itertools
+
+from django.db.models import OuterRef, Subquery
+
+from model_students.models import Student, Punctuation
+from .grading import validate_scores, save_scores
+
+CI_COLUMNS = ('ci', 'cedula', 'cédula')
+SCORE_COLUMNS = ('score', 'nota')
+EVALUATION_COLUMN = 'evaluation_id'
+
+# Columnas de la planilla de una evaluación (se puede volver a importar)
+EVALUATION_HEADER = ['ci', 'last_name', 'name', 'score']
+
+# Columnas de la planilla de varias materias o de todo el colegio
+GRADEBOOK_HEADER = ['ci', 'last_name', 'name', 'grade', 'course', 'evaluation_id', 'evaluation', 'type', 'date', 'score']
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class GradebookImportError(Exception):
+    """Archivo de notas que no se puede leer"""
+
+
+def _clean_cell(value):
+    """Normaliza una celda (Excel guarda las cédulas como números)"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def xlsx_supported():
+    """Indica si openpyxl está instalado (dependencia opcional para importar XLSX)"""
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_csv_rows(uploaded_file):
+    """Lee un CSV fila por fila sin cargarlo completo (detecta ',' o ';')"""
+    text = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+    try:
+        first_line = text.readline()
+        delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+        for row in csv.reader(itertools.chain([first_line], text), delimiter=delimiter):
+            yield [_clean_cell(cell) for cell in row]
+    except UnicodeDecodeError:
+        raise GradebookImportError('El archivo CSV debe estar codificado en UTF-8')
+    finally:
+        text.detach()
+
+
+def iter_xlsx_rows(uploaded_file):
+    """Lee la primera hoja de un XLSX en modo de solo lectura (requiere openpyxl)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise GradebookImportError('Para importar archivos XLSX instale openpyxl o use CSV')
+
+    try:
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    except Exception as e:
+        raise GradebookImportError(f'No se pudo leer el archivo XLSX: {e}')
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield [_clean_cell(cell) for cell in row]
+    finally:
+        workbook.close()
+
+
+def iter_file_rows(uploaded_file):
+    name = uploaded_file.name.lower()
+    if name.endswith('.csv'):
+        return iter_csv_rows(uploaded_file)
+    if name.endswith('.xlsx'):
+        return iter_xlsx_rows(uploaded_file)
+    if xlsx_supported():
+        raise GradebookImportError('El archivo debe tener extensión .csv o .xlsx')
+    raise GradebookImportError('El archivo debe tener extensión .csv')
+
+
+def iter_score_rows(rows, evaluation_id):
+    """Convierte filas en pares (ci, nota).
+
+    Si la primera fila es un encabezado se usan las columnas ci/score (o
+    cedula/nota); si no, la primera columna es la cédula y la segunda la nota.
+    Las filas de otra evaluación (columna evaluation_id) se ignoran.
+    """
+    ci_index, score_index, evaluation_index = 0, 1, None
+    first_row = True
+    for line, row in enumerate(rows, 1):
+        if not any(row):
+            continue
+
+        if first_row:
+            first_row = False
+            lowered = [cell.lower() for cell in row]
+            if any(cell in CI_COLUMNS for cell in lowered):
+                ci_index = next(i for i, cell in enumerate(lowered) if cell in CI_COLUMNS)
+                score_index = next((i for i, cell in enumerate(lowered) if cell in SCORE_COLUMNS), None)
+                if score_index is None:
+                    raise GradebookImportError('El encabezado debe tener una columna "score" o "nota"')
+                if EVALUATION_COLUMN in lowered:
+                    evaluation_index = lowered.index(EVALUATION_COLUMN)
+                continue
+
+        # Una fila más corta que el encabezado es un archivo mal formado (la nota vacía sí se acepta)
+        required = ci_index if evaluation_index is None else max(ci_index, evaluation_index)
+        if len(row) <= required:
+            raise GradebookImportError(f'La fila {line} tiene {len(row)} columnas y se esperaban al menos {required + 1}')
+
+        if evaluation_index is not None and row[evaluation_index] != str(evaluation_id):
+            continue
+
+        score = row[score_index] if len(row) > score_index else ''
+        yield row[ci_index], score
+
+
+def import_gradebook(evaluation, uploaded_file):
+    """Importa las notas de un archivo para una evaluación.
+
+    Devuelve (insertados, actualizados, errores); si hay errores no se guarda nada.
+    """
+    valid_cis = Student.objects.filter(grade=evaluation.course.grade).values_list('ci', flat=True)
+    rows = iter_score_rows(iter_file_rows(uploaded_file), evaluation.id)
+    scores, errors = validate_scores(rows, valid_cis)
+    if errors:
+        return [], [], errors
+    inserted, updated = save_scores(evaluation, scores)
+    return inserted, updated, []
+
+
+class _Echo:
+    """Pseudo archivo para que csv.writer devuelva cada línea en lugar de guardarla"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_evaluation_gradebook(evaluation):
+    """Planilla de una evaluación: todos los estudiantes del grado con su nota (o vacía)"""
+    score = Punctuation.objects.filter(evaluation=evaluation, student=OuterRef('pk')).values('score')[:1]
+    rows = Student.objects.filter(grade=evaluation.course.grade).annotate(
+        score=Subquery(score)
+    ).order_by('last_name', 'name').values_list('ci', 'last_name', 'name', 'score')
+    return iter_csv(EVALUATION_HEADER, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+
+
+def iter_gradebook(punctuations):
+    """Planilla de varias evaluaciones, leída por partes con iterator()"""
+    rows = punctuations.order_by(
+        'evaluation__course__grade', 'evaluation__course__name_course', 'evaluation__date',
+        'student__last_name', 'student__name'
+    ).values_list(
+        'student_id', 'student__last_name', 'student__name', 'evaluation__course__grade',
+        'evaluation__course__name_course', 'evaluation_id', 'evaluation__subject',
+        'evaluation__type', 'evaluation__date', 'score'
+    )
+    return iter_csv(GRADEBOOK_HEADER, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE))
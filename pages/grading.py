@@ -0,0 +1,73 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from model_students.models import Punctuation
+from model_students.stats import refresh_stats
+
+from .cache_invalidation import schedule_invalidation
+from .view_cache import user_tag
+
+MIN_SCORE = Decimal('0')
+MAX_SCORE = Decimal('20')
+
+
+def parse_score(value):
+    """Convierte una nota escrita por el profesor a Decimal (acepta coma decimal)"""
+    try:
+        score = Decimal(str(value).strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f'"{value}" no es una nota válida')
+    if not score.is_finite() or score < MIN_SCORE or score > MAX_SCORE:
+        raise ValueError(f'La nota {value} debe estar entre {MIN_SCORE} y {MAX_SCORE}')
+    return score.quantize(Decimal('0.01'))
+
+
+def validate_scores(raw_scores, valid_cis):
+    """Valida todas las notas antes de escribir.
+
+    raw_scores es un iterable de (ci, valor). Devuelve ({ci: Decimal}, errores);
+    los valores vacíos se ignoran.
+    """
+    valid_cis = set(valid_cis)
+    scores = {}
+    errors = []
+    for ci, value in raw_scores:
+        if value is None or str(value).strip() == '':
+            continue
+        if ci not in valid_cis:
+            errors.append(f'El estudiante {ci} no pertenece al grado de la evaluación')
+            continue
+        try:
+            scores[ci] = parse_score(value)
+        except ValueError as e:
+            errors.append(f'{ci}: {e}')
+    return scores, errors
+
+
+def save_scores(evaluation, scores):
+    """Inserta o actualiza todas las notas de una evaluación en una sola transacción.
+
+    Devuelve (insertados, actualizados) como listas de cédulas.
+    """
+    if not scores:
+        return [], []
+
+    with transaction.atomic():
+        existing = set(
+            Punctuation.objects.filter(evaluation=evaluation, student_id__in=scores)
+            .values_list('student_id', flat=True)
+        )
+        Punctuation.objects.bulk_create(
+            [Punctuation(evaluation=evaluation, student_id=ci, score=score) for ci, score in scores.items()],
+            update_conflicts=True,
+            unique_fields=['evaluation', 'student'],
+            update_fields=['score'],
+        )
+        # bulk_create no dispara señales: actualizar las estadísticas y la caché aquí
+        refresh_stats(scores.keys(), [evaluation.course_id])
+        schedule_invalidation(user_tag('student', ci) for ci in scores)
+
+    inserted = [ci for ci in scores if ci not in existing]
+    updated = [ci for ci in scores if ci in existing]
+    return inserted, updated
@@ -0,0 +1,109 @@
+import time
+
+from django.db import IntegrityError, transaction
+
+from model_students.models import Student, Teacher, Admin, IdentityStamp
+
+USER_MODELS = {
+    'student': Student,
+    'teacher': Teacher,
+    'admin': Admin,
+}
+
+UNKNOWN_USER_NAME = 'Usuario desconocido'
+
+
+def touch_identity(user_type, user_id):
+    """Marca como obsoletas las copias en sesión de este usuario.
+
+    La marca se guarda en la base de datos para que la vean todos los procesos
+    del servidor (la caché por defecto es local a cada proceso).
+    """
+    changed_at = time.time()
+    updated = IdentityStamp.objects.filter(user_type=user_type, user_id=user_id).update(changed_at=changed_at)
+    if not updated:
+        try:
+            with transaction.atomic():
+                IdentityStamp.objects.create(user_type=user_type, user_id=user_id, changed_at=changed_at)
+        except IntegrityError:
+            # Otro proceso la creó al mismo tiempo
+            IdentityStamp.objects.filter(user_type=user_type, user_id=user_id).update(changed_at=changed_at)
+
+
+def remember_user(request, user_type, user):
+    """Guarda en la sesión el rol y el nombre del usuario (al iniciar sesión o editar perfil)"""
+    request.session['user_type'] = user_type
+    request.session['user_id'] = user.ci
+    request.session['user_name'] = f'{user.name} {user.last_name}'
+    request.session['user_snapshot_at'] = time.time()
+    request._school_user = user
+
+
+class SchoolUserMissing(Exception):
+    """El usuario de la sesión fue eliminado; la sesión ya se cerró"""
+
+
+def get_school_user(request):
+    """Devuelve el Student/Teacher/Admin de la sesión, consultándolo una sola vez por request.
+
+    La fila leída es la versión actual: si el nombre cambió se actualiza la copia
+    en sesión, y si el usuario ya no existe se cierra la sesión y se lanza
+    SchoolUserMissing (el middleware redirige al inicio).
+    """
+    if getattr(request, '_school_user_missing', False):
+        raise SchoolUserMissing
+    if hasattr(request, '_school_user'):
+        return request._school_user
+
+    user_type = request.session.get('user_type')
+    user_id = request.session.get('user_id')
+    model = USER_MODELS.get(user_type)
+
+    user = None
+    if model is not None and user_id:
+        user = model.objects.filter(ci=user_id).first()
+        if user is None:
+            request.session.flush()
+            request._school_user_missing = True
+            raise SchoolUserMissing
+        if request.session.get('user_name') != f'{user.name} {user.last_name}':
+            remember_user(request, user_type, user)
+
+    request._school_user = user
+    return user
+
+
+def get_user_name(request):
+    """Nombre para logs: el del usuario ya leído en este request o la copia de la sesión.
+
+    Solo si ninguno de los dos está disponible (o la copia quedó obsoleta) se consulta al usuario.
+    """
+    user = getattr(request, '_school_user', None)
+    if user is not None:
+        return f'{user.name} {user.last_name}'
+
+    user_name = request.session.get('user_name')
+    if user_name and not is_snapshot_stale(request):
+        return user_name
+
+    try:
+        user = get_school_user(request)
+    except SchoolUserMissing:
+        return user_name or UNKNOWN_USER_NAME
+    if user is None:
+        return UNKNOWN_USER_NAME
+
+    remember_user(request, request.session.get('user_type'), user)
+    return request.session['user_name']
+
+
+def is_snapshot_stale(request):
+    """Indica si el usuario fue modificado o eliminado después de guardar la copia en sesión"""
+    user_type = request.session.get('user_type')
+    user_id = request.session.get('user_id')
+    if not user_type or not user_id or 'user_name' not in request.session:
+        return False
+
+    return IdentityStamp.objects.filter(
+        user_type=user_type, user_id=str(user_id), changed_at__gt=request.session.get('user_snapshot_at', 0)
+    ).exists()
@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from model_students.models import Course
+from pages.reports import build_grade_reports, iter_report_cards_zip, write_report_cards_pdf
+
+
+class Command(BaseCommand):
+    help = 'Exporta los boletines de todos los estudiantes de un grado (o de una materia) en un ZIP o un solo PDF'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grade', type=int, help='Grado de los estudiantes')
+        parser.add_argument('--course', type=int, help='ID de la materia (usa el grado de la materia)')
+        parser.add_argument('--format', choices=['zip', 'pdf'], default='zip')
+        parser.add_argument('--output', help='Archivo de salida (por defecto boletines_grado_N.zip/pdf)')
+        parser.add_argument('--workers', type=int, help='Procesos para renderizar (por defecto REPORT_CARD_WORKERS)')
+
+    def handle(self, *args, **options):
+        grade = options['grade']
+        if options['course']:
+            try:
+                grade = Course.objects.get(id=options['course']).grade
+            except Course.DoesNotExist:
+                raise CommandError(f"La materia {options['course']} no existe")
+        if grade is None:
+            raise CommandError('Debe indicar --grade o --course')
+
+        reports = build_grade_reports(grade)
+        if not reports:
+            raise CommandError(f'No hay estudiantes en el grado {grade}')
+
+        output = options['output'] or f"boletines_grado_{grade}.{options['format']}"
+        with open(output, 'wb') as destination:
+            if options['format'] == 'pdf':
+                write_report_cards_pdf(reports, destination)
+            else:
+                for chunk in iter_report_cards_zip(reports, options['workers']):
+                    destination.write(chunk)
+
+        size = os.path.getsize(output)
+        self.stdout.write(self.style.SUCCESS(f'{len(reports)} boletines exportados en {output} ({size} bytes)'))
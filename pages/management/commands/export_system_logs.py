@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from model_students.log_archive import archived_months
+from model_students.log_query import LogFilterError, parse_log_filters
+from pages.log_export import EXPORT_FORMATS, iter_log_export
+
+
+class Command(BaseCommand):
+    help = 'Exporta los logs del sistema en CSV o JSONL con los mismos filtros del visor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help='Archivo de salida (por defecto la salida estándar)')
+        parser.add_argument('--user-type', dest='user_type')
+        parser.add_argument('--action')
+        parser.add_argument('--user-id', dest='user_id')
+        parser.add_argument('--ip', dest='ip_address')
+        parser.add_argument('--from', dest='date_from', help='Fecha AAAA-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Fecha AAAA-MM-DD')
+        parser.add_argument('--search', dest='q', help='Texto a buscar en la descripción')
+        parser.add_argument('--archive', help='Exportar solo un mes archivado (AAAA-MM-01)')
+        parser.add_argument('--include-archives', action='store_true', help='Incluir los meses archivados')
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_log_filters(options)
+        except LogFilterError as e:
+            raise CommandError(str(e))
+
+        month = None
+        if options['archive']:
+            month = next((m for m in archived_months() if m.isoformat() == options['archive']), None)
+            if month is None:
+                raise CommandError(f"El periodo archivado {options['archive']} no existe")
+
+        lines = iter_log_export(options['format'], filters, month, options['include_archives'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        count = 0
+        with open(options['output'], 'w', encoding='utf-8', newline='') as destination:
+            for line in lines:
+                destination.write(line)
+                count += 1
+        if options['format'] == 'csv':
+            count -= 1
+        self.stdout.write(self.style.SUCCESS(f"{count} logs exportados en {options['output']}"))
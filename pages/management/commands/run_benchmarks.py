@@ -0,0 +1,97 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from pages import urls
+from pages.benchmarks import BenchmarkError, compare_results, run_benchmarks
+from utils.logger import flush_logs
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo y las consultas de cada URL de pages/urls.py y guarda los resultados en JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generate', action='store_true',
+                            help='Crear una base de datos temporal con datos sintéticos (no toca la base configurada)')
+        parser.add_argument('--grades', type=int, default=6)
+        parser.add_argument('--teachers', type=int, default=30)
+        parser.add_argument('--courses-per-grade', type=int, default=8)
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--evaluations-per-course', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=5, help='Mediciones por URL')
+        parser.add_argument('--warmup', type=int, default=1, help='Requests previos sin medir')
+        parser.add_argument('--only', nargs='+', metavar='URL_NAME', help='Medir solo estas URLs')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--compare', metavar='JSON', help='Resultados anteriores para detectar regresiones')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Aumento de p50 tolerado (0.2 = 20%%)')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        url_names = [pattern.name for pattern in urls.urlpatterns if pattern.name]
+        if options['only']:
+            unknown = set(options['only']) - set(url_names)
+            if unknown:
+                raise CommandError(f"URLs desconocidas: {', '.join(sorted(unknown))}")
+            url_names = [name for name in url_names if name in options['only']]
+
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as f:
+                    previous = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer {options['compare']}: {e}")
+
+        setup_test_environment()
+        old_name = None
+        try:
+            if options['generate']:
+                from create_initial_data import create_benchmark_data
+
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                self.stdout.write('Generando datos sintéticos...')
+                create_benchmark_data(
+                    grades=options['grades'],
+                    teachers=options['teachers'],
+                    courses_per_grade=options['courses_per_grade'],
+                    students=options['students'],
+                    evaluations_per_course=options['evaluations_per_course'],
+                    seed=options['seed'],
+                    verbose=options['verbosity'] > 1,
+                )
+            results = run_benchmarks(url_names, repeat=options['repeat'], warmup=options['warmup'])
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+        finally:
+            flush_logs()
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+        self.stdout.write(f"{'URL':<45}{'rol':<9}{'estado':>7}{'consultas':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for row in results['results']:
+            if row['url'] is None:
+                self.stdout.write(self.style.WARNING(f"{row['name']:<45}{'':<9}{'sin caso de prueba':>37}"))
+                continue
+            line = (f"{row['url']:<45}{row['role'] or '-':<9}{row['status']:>7}{row['queries']:>10}"
+                    f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}")
+            self.stdout.write(self.style.ERROR(line) if row['status'] >= 400 else line)
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['output']}"))
+
+        if previous is not None:
+            regressions = compare_results(previous, results, options['threshold'])
+            for row in regressions:
+                self.stdout.write(self.style.WARNING(
+                    f"Regresión en {row['url']} ({row['role']}): consultas {row['queries'][0]} -> {row['queries'][1]}, "
+                    f"p50 {row['p50_ms'][0]:.1f} -> {row['p50_ms'][1]:.1f} ms"
+                ))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a ' + options['compare']))
+            elif options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regresiones detectadas')
@@ -0,0 +1,183 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from django_base.database import sqlite_init_command
+from pages.metrics import percentile
+
+# Configuración anterior (valores por defecto de SQLite y Django) frente a la actual
+MODES = {
+    'default': {
+        'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+        'begin': 'BEGIN',
+    },
+    'tuned': {
+        'pragmas': None,  # settings.SQLITE_PRAGMAS
+        'begin': 'BEGIN IMMEDIATE',
+    },
+}
+
+READ_QUERIES = [
+    'SELECT p.score, e.subject, e.date FROM model_students_punctuation p '
+    'JOIN model_students_evaluation e ON e.id = p.evaluation_id WHERE p.student_id = ? ORDER BY e.date DESC',
+    'SELECT id, user_name, action, timestamp FROM model_students_systemlog ORDER BY timestamp DESC LIMIT 100',
+]
+
+
+class Worker(threading.Thread):
+    def __init__(self, path, mode, stop, samples, role):
+        super().__init__(daemon=True)
+        self.path = path
+        self.mode = mode
+        self.stop = stop
+        self.samples = samples
+        self.role = role
+        self.latencies = []
+        self.errors = 0
+
+    def connect(self):
+        # timeout=5 es el valor por defecto del módulo sqlite3 que usa Django
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        pragmas = self.mode['pragmas'] or settings.SQLITE_PRAGMAS
+        for command in sqlite_init_command(pragmas).split(';'):
+            conn.execute(command)
+        return conn
+
+    def run(self):
+        conn = self.connect()
+        rng = random.Random(threading.get_ident())
+        try:
+            while not self.stop.is_set():
+                start = time.perf_counter()
+                try:
+                    if self.role == 'writer':
+                        self.write(conn, rng)
+                    else:
+                        self.read(conn, rng)
+                except sqlite3.OperationalError:
+                    # "database is locked" / "database is busy"
+                    self.errors += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    continue
+                self.latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            conn.close()
+
+    def read(self, conn, rng):
+        student_id = rng.choice(self.samples)[1] if self.samples else ''
+        conn.execute(READ_QUERIES[0], [student_id]).fetchall()
+        conn.execute(READ_QUERIES[1]).fetchall()
+
+    def write(self, conn, rng):
+        # Lo que hace una calificación: leer la nota, actualizarla y registrar el log
+        conn.execute(self.mode['begin'])
+        if self.samples:
+            evaluation_id, student_id = rng.choice(self.samples)
+            conn.execute(
+                'SELECT score FROM model_students_punctuation WHERE evaluation_id = ? AND student_id = ?',
+                [evaluation_id, student_id]
+            ).fetchone()
+            conn.execute(
+                'UPDATE model_students_punctuation SET score = ? WHERE evaluation_id = ? AND student_id = ?',
+                [round(rng.uniform(0, 20), 2), evaluation_id, student_id]
+            )
+        conn.execute(
+            'INSERT INTO model_students_systemlog (user_type, user_id, user_name, action, description, ip_address, timestamp) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            ['teacher', 'STRESS', 'Prueba de carga', 'UPDATE', 'Prueba de concurrencia', '127.0.0.1',
+             timezone.now().isoformat(sep=' ')]
+        )
+        conn.execute('COMMIT')
+
+
+class Command(BaseCommand):
+    help = 'Mide lecturas y escrituras concurrentes sobre una copia de la base SQLite, con y sin los pragmas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', help='Archivo SQLite a copiar (por defecto el configurado)')
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0, help='Segundos por modo')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--output', help='Guardar los resultados en JSON')
+
+    def handle(self, *args, **options):
+        source = options['database'] or str(connection.settings_dict['NAME'])
+        if connection.vendor != 'sqlite' and not options['database']:
+            raise CommandError('La base configurada no es SQLite; indique --database')
+        if not os.path.isfile(source):
+            raise CommandError(f'No existe el archivo {source}')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options['modes']:
+                # Copia nueva por modo: journal_mode queda guardado en el archivo
+                path = os.path.join(directory, f'{name}.sqlite3')
+                self.copy_database(source, path)
+                results[name] = self.run_mode(path, MODES[name], options)
+
+        self.stdout.write(f"{'modo':<10}{'lecturas/s':>12}{'escrituras/s':>14}{'p95 lect ms':>13}{'p95 esc ms':>12}{'bloqueos':>10}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<10}{row['reads_per_second']:>12.1f}{row['writes_per_second']:>14.1f}"
+                f"{row['read_p95_ms']:>13.1f}{row['write_p95_ms']:>12.1f}{row['lock_errors']:>10}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['output']}"))
+
+    def copy_database(self, source, destination):
+        # API de respaldo de SQLite: copia consistente aunque la base esté en uso o en WAL
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(destination)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+
+    def run_mode(self, path, mode, options):
+        conn = sqlite3.connect(path)
+        try:
+            samples = conn.execute(
+                'SELECT evaluation_id, student_id FROM model_students_punctuation ORDER BY random() LIMIT 1000'
+            ).fetchall()
+        finally:
+            conn.close()
+
+        stop = threading.Event()
+        workers = (
+            [Worker(path, mode, stop, samples, 'reader') for _ in range(options['readers'])] +
+            [Worker(path, mode, stop, samples, 'writer') for _ in range(options['writers'])]
+        )
+        for worker in workers:
+            worker.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+        reads = [value for worker in workers if worker.role == 'reader' for value in worker.latencies]
+        writes = [value for worker in workers if worker.role == 'writer' for value in worker.latencies]
+        return {
+            'readers': options['readers'],
+            'writers': options['writers'],
+            'duration': options['duration'],
+            'reads_per_second': len(reads) / options['duration'],
+            'writes_per_second': len(writes) / options['duration'],
+            'read_p95_ms': percentile(reads, 95),
+            'write_p95_ms': percentile(writes, 95),
+            'lock_errors': sum(worker.errors for worker in workers),
+        }
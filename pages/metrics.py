@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger('pages.metrics')
+
+# Configuración por defecto (se puede sobreescribir con VIEW_METRICS en settings.py)
+DEFAULT_METRICS_SETTINGS = {
+    'ENABLED': True,
+    'WINDOW': 500,                 # Muestras guardadas por vista
+    'DEFAULT_QUERY_BUDGET': None,  # Máximo de consultas por request (None = sin límite)
+    'QUERY_BUDGETS': {},           # Límites por nombre de URL
+}
+
+_current_request = ContextVar('request_metrics', default=None)
+
+
+def get_metrics_settings():
+    config = dict(DEFAULT_METRICS_SETTINGS)
+    config.update(getattr(settings, 'VIEW_METRICS', {}))
+    return config
+
+
+def get_query_budget(view_name, config=None):
+    config = config or get_metrics_settings()
+    return config['QUERY_BUDGETS'].get(view_name, config['DEFAULT_QUERY_BUDGET'])
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano de una lista de números"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class RequestMetrics:
+    """Mediciones de un request; también sirve como connection.execute_wrapper"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def start_request_metrics():
+    metrics = RequestMetrics()
+    return metrics, _current_request.set(metrics)
+
+
+def finish_request_metrics(token):
+    _current_request.reset(token)
+
+
+def record_template_render(seconds):
+    """Suma el tiempo de render de una plantilla al request actual"""
+    metrics = _current_request.get()
+    if metrics is not None:
+        metrics.template_time += seconds
+
+
+class ViewMetrics:
+    """Últimas N mediciones por vista, con percentiles calculados al consultar"""
+
+    FIELDS = ('wall', 'queries', 'db_time', 'template_time')
+
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._over_budget = {}
+        self._lock = threading.Lock()
+
+    def record(self, view_name, wall, queries, db_time, template_time, over_budget=False):
+        with self._lock:
+            samples = self._samples.get(view_name)
+            if samples is None:
+                samples = self._samples[view_name] = deque(maxlen=self.window)
+            samples.append((wall, queries, db_time, template_time))
+            self._counts[view_name] = self._counts.get(view_name, 0) + 1
+            if over_budget:
+                self._over_budget[view_name] = self._over_budget.get(view_name, 0) + 1
+
+    def summary(self):
+        """Estadísticas por vista (tiempos en milisegundos)"""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+            over_budget = dict(self._over_budget)
+
+        config = get_metrics_settings()
+        rows = []
+        for view_name, samples in sorted(snapshot.items()):
+            columns = dict(zip(self.FIELDS, zip(*samples)))
+            row = {
+                'view': view_name,
+                'count': counts.get(view_name, 0),
+                'over_budget': over_budget.get(view_name, 0),
+                'query_budget': get_query_budget(view_name, config),
+                'queries_max': max(columns['queries']),
+            }
+            for field in self.FIELDS:
+                scale = 1 if field == 'queries' else 1000
+                for pct in (50, 95, 99):
+                    row[f'{field}_p{pct}'] = percentile(columns[field], pct) * scale
+            rows.append(row)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._over_budget.clear()
+
+
+view_metrics = ViewMetrics(get_metrics_settings()['WINDOW'])
+
+
+def record_request(view_name, wall, metrics):
+    """Guarda las mediciones del request y avisa si superó el presupuesto de consultas"""
+    budget = get_query_budget(view_name)
+    over_budget = budget is not None and metrics.queries > budget
+    if over_budget:
+        logger.warning(
+            'La vista %s ejecutó %d consultas (presupuesto: %d, %.1f ms en base de datos)',
+            view_name, metrics.queries, budget, metrics.db_time * 1000
+        )
+    view_metrics.record(view_name, wall, metrics.queries, metrics.db_time, metrics.template_time, over_budget)
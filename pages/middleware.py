@@ -0,0 +1,55 @@
+import time
+
+from django.db import connection
+from django.shortcuts import redirect
+from django.utils.functional import SimpleLazyObject
+
+from .identity import SchoolUserMissing, get_school_user
+from .metrics import get_metrics_settings, start_request_metrics, finish_request_metrics, record_request
+
+
+class SchoolUserMiddleware:
+    """Agrega request.school_user (Student, Teacher o Admin) resuelto de forma perezosa.
+
+    El nombre y el rol viven en la sesión desde el inicio de sesión. No se consulta
+    nada hasta que la vista lee school_user (la fila actual, que también refresca
+    el nombre) o se registra un log (ver get_user_name). Si el usuario ya no
+    existe se cierra la sesión y se vuelve al inicio.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.school_user = SimpleLazyObject(lambda: get_school_user(request))
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, SchoolUserMissing):
+            return redirect('home')
+        return None
+
+
+class QueryMetricsMiddleware:
+    """Mide consultas SQL, tiempo en base de datos, render de plantillas y tiempo total por vista"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_metrics_settings()['ENABLED']:
+            return self.get_response(request)
+
+        metrics, token = start_request_metrics()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            finish_request_metrics(token)
+        wall = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name:
+            record_request(match.url_name, wall, metrics)
+        return response
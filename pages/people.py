@@ -0,0 +1,35 @@
+"""Listados paginados y con búsqueda de estudiantes y profesores (gestión de usuarios)"""
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
+
+from model_students.models import Student, Teacher
+
+USERS_PAGE_SIZE = 25
+
+SEARCH_FIELDS = ['name', 'last_name', 'ci', 'username', 'email']
+
+
+def search_people(queryset, text):
+    """Cada palabra debe aparecer en alguno de los campos: "ana perez" encuentra a Ana Pérez"""
+    for word in text.split():
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__icontains': word})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def people_page(queryset, text, page_number):
+    """Una página del listado (siempre USERS_PAGE_SIZE filas como máximo)"""
+    if text:
+        queryset = search_people(queryset, text)
+    return Paginator(queryset.order_by('last_name', 'name', 'ci'), USERS_PAGE_SIZE).get_page(page_number)
+
+
+def students_page(text='', page_number=1):
+    return people_page(Student.objects.all(), text, page_number)
+
+
+def teachers_page(text='', page_number=1):
+    # Materias anotadas en la misma consulta, en lugar de teacher.course_set.count por fila
+    return people_page(Teacher.objects.annotate(courses_count=Count('course')), text, page_number)
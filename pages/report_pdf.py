@@ -0,0 +1,134 @@
+"""Dibujo de boletines en PDF.
+
+Este módulo solo depende de reportlab para que los procesos del pool de
+exportación por lotes puedan importarlo sin inicializar Django.
+"""
+import io
+from datetime import datetime
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.colors import HexColor, black, white
+
+
+def draw_report_card(p, report):
+    """Dibuja el boletín en la página actual del canvas a partir de StudentReport.pdf_data()"""
+    width, height = letter
+
+    primary_color = HexColor('#667eea')
+    secondary_color = HexColor('#764ba2')
+
+    # Header background
+    p.setFillColor(primary_color)
+    p.rect(0, height - 120, width, 120, fill=1, stroke=0)
+
+    # Logo placeholder (circle)
+    p.setFillColor(white)
+    p.circle(80, height - 60, 30, fill=1, stroke=0)
+    p.setFillColor(primary_color)
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(75, height - 65, "T")
+
+    # Institution info
+    p.setFillColor(white)
+    p.setFont("Helvetica-Bold", 24)
+    p.drawString(130, height - 45, "ThinkIt Academy")
+    p.setFont("Helvetica", 12)
+    p.drawString(130, height - 65, "Sistema de Gestion Academica")
+    p.drawString(130, height - 80, "Excelencia en Educacion")
+
+    # Document title
+    p.setFillColor(black)
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(width/2 - 100, height - 150, "BOLETIN DE CALIFICACIONES")
+
+    # Student info box
+    p.setStrokeColor(primary_color)
+    p.setLineWidth(2)
+    p.rect(50, height - 250, width - 100, 80, fill=0, stroke=1)
+
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(70, height - 185, "INFORMACION DEL ESTUDIANTE")
+
+    p.setFont("Helvetica", 11)
+    p.drawString(70, height - 205, f"Nombre: {report['name']} {report['last_name']}")
+    p.drawString(70, height - 220, f"Cedula: {report['ci']}")
+    p.drawString(300, height - 205, f"Grado: {report['grade']}")
+    p.drawString(300, height - 220, f"Fecha: {datetime.now().strftime('%d/%m/%Y')}")
+    p.drawString(300, height - 235, f"Promedio: {report['overall_average']:.2f}")
+
+    # Table header
+    y = height - 290
+    p.setFillColor(primary_color)
+    p.rect(50, y - 20, width - 100, 25, fill=1, stroke=0)
+
+    p.setFillColor(white)
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(70, y - 12, "MATERIA")
+    p.drawString(250, y - 12, "PROMEDIO")
+    p.drawString(350, y - 12, "ESTADO")
+    p.drawString(450, y - 12, "OBSERVACION")
+
+    # Table content
+    p.setFillColor(black)
+    p.setFont("Helvetica", 10)
+    y -= 35
+    row_count = 0
+
+    for data in report['rows']:
+        if data['average'] > 0:
+            # Alternate row colors
+            if row_count % 2 == 0:
+                p.setFillColor(HexColor('#f8f9fa'))
+                p.rect(50, y - 15, width - 100, 20, fill=1, stroke=0)
+
+            p.setFillColor(black)
+            p.drawString(70, y - 5, str(data['course_name']))
+            p.drawString(260, y - 5, f"{data['average']:.2f}")
+
+            # Color-coded status
+            if data['average'] >= 10:
+                p.setFillColor(HexColor('#28a745'))
+            else:
+                p.setFillColor(HexColor('#dc3545'))
+            p.drawString(360, y - 5, str(data['status']))
+
+            # Observation
+            p.setFillColor(black)
+            obs = "Excelente" if data['average'] >= 15 else "Bueno" if data['average'] >= 12 else "Regular" if data['average'] >= 10 else "Deficiente"
+            p.drawString(460, y - 5, obs)
+
+            y -= 20
+            row_count += 1
+
+    # Footer
+    p.setFillColor(primary_color)
+    p.rect(0, 0, width, 50, fill=1, stroke=0)
+    p.setFillColor(white)
+    p.setFont("Helvetica", 8)
+    p.drawString(width/2 - 120, 25, "ThinkIt Academy - Sistema de Gestion Academica")
+    p.drawString(width/2 - 140, 15, "www.thinkit.edu | contacto@thinkit.edu | Tel: (555) 123-4567")
+
+    p.showPage()
+
+
+def render_report_card(report, output):
+    """Escribe un boletín (dict de pdf_data) sobre output"""
+    p = canvas.Canvas(output, pagesize=letter)
+    draw_report_card(p, report)
+    p.save()
+
+
+def render_report_card_bytes(report):
+    """Devuelve el PDF de un boletín como bytes (se ejecuta en los procesos del pool)"""
+    buffer = io.BytesIO()
+    render_report_card(report, buffer)
+    return buffer.getvalue()
+
+
+def render_report_cards(reports, output):
+    """Escribe varios boletines, uno por página, en un solo PDF"""
+    p = canvas.Canvas(output, pagesize=letter)
+    for report in reports:
+        draw_report_card(p, report)
+    p.save()
@@ -0,0 +1,178 @@
+import multiprocessing
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from model_students.models import Student, Course, Punctuation, StudentCourseStats
+from model_students.stats import PASSING_SCORE
+from .report_pdf import render_report_card, render_report_card_bytes, render_report_cards
+
+
+class StudentReport:
+    """Boletín de un estudiante: materias del grado con sus notas y promedios"""
+
+    def __init__(self, student, rows, overall_average):
+        self.student = student
+        self.rows = rows
+        self.overall_average = overall_average
+
+    def pdf_data(self):
+        """Datos simples (sin modelos) que necesita el dibujo del PDF"""
+        return {
+            'name': self.student.name,
+            'last_name': self.student.last_name,
+            'ci': self.student.ci,
+            'grade': self.student.grade,
+            'overall_average': self.overall_average,
+            'rows': [
+                {
+                    'course_name': row['course'].name_course,
+                    'average': row['average'],
+                    'status': row['status'],
+                }
+                for row in self.rows
+            ],
+        }
+
+    def filename(self):
+        return f'boletin_{self.student.ci}_{self.student.name}_{self.student.last_name}.pdf'
+
+
+def build_report_rows(courses, averages, punctuations=()):
+    """Arma las filas del boletín; averages es {course_id: promedio} leído de StudentCourseStats"""
+    by_course = {}
+    for punctuation in punctuations:
+        by_course.setdefault(punctuation.evaluation.course_id, []).append(punctuation)
+
+    rows = []
+    total_score = 0
+    total_count = 0
+    for course in courses:
+        course_average = averages.get(course.id)
+        average = float(course_average) if course_average is not None else 0
+        if course_average is not None:
+            total_score += average
+            total_count += 1
+
+        rows.append({
+            'course': course,
+            'punctuations': by_course.get(course.id, []),
+            'average': average,
+            'status': 'Aprobado' if average >= PASSING_SCORE else 'Reprobado'
+        })
+
+    overall_average = total_score / total_count if total_count > 0 else 0
+    return rows, overall_average
+
+
+def build_student_report(student):
+    """Construye el boletín con dos consultas: materias (con profesor y promedio precalculado) y notas"""
+    # Promedio por materia tomado de la tabla de estadísticas
+    average = StudentCourseStats.objects.filter(student=student, course=OuterRef('pk')).values('average')[:1]
+    courses = Course.objects.filter(grade=student.grade).select_related('teacher').annotate(
+        student_average=Subquery(average)
+    ).order_by('id')
+    averages = {course.id: course.student_average for course in courses}
+
+    # Todas las notas del estudiante en una sola consulta
+    punctuations = Punctuation.objects.filter(
+        student=student,
+        evaluation__course__grade=student.grade
+    ).select_related('evaluation')
+
+    rows, overall_average = build_report_rows(courses, averages, punctuations)
+    return StudentReport(student, rows, overall_average)
+
+
+def build_grade_reports(grade):
+    """Boletines de todos los estudiantes de un grado con tres consultas en total"""
+    students = Student.objects.filter(grade=grade).order_by('last_name', 'name', 'ci')
+    courses = list(Course.objects.filter(grade=grade).select_related('teacher').order_by('id'))
+
+    # Promedio de cada estudiante en cada materia, precalculado en StudentCourseStats
+    averages = {}
+    stats = StudentCourseStats.objects.filter(
+        student__grade=grade,
+        course__grade=grade
+    ).values_list('student_id', 'course_id', 'average')
+    for student_id, course_id, average in stats:
+        averages.setdefault(student_id, {})[course_id] = average
+
+    reports = []
+    for student in students:
+        rows, overall_average = build_report_rows(courses, averages.get(student.ci, {}))
+        reports.append(StudentReport(student, rows, overall_average))
+    return reports
+
+
+def get_report_workers():
+    """Procesos para renderizar boletines (REPORT_CARD_WORKERS, 0 = sin pool)"""
+    return getattr(settings, 'REPORT_CARD_WORKERS', multiprocessing.cpu_count())
+
+
+def iter_rendered_reports(reports, workers=None):
+    """Renderiza los boletines en un ProcessPoolExecutor y los entrega en orden.
+
+    Solo se mantiene una ventana acotada de trabajos en vuelo, así que la
+    memoria no crece con la cantidad de estudiantes.
+    """
+    workers = get_report_workers() if workers is None else workers
+    if workers <= 1:
+        for report in reports:
+            yield report, render_report_card_bytes(report.pdf_data())
+        return
+
+    # "spawn" evita heredar conexiones a la base de datos y el estado de los hilos del servidor
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = deque()
+        for report in reports:
+            pending.append((report, executor.submit(render_report_card_bytes, report.pdf_data())))
+            if len(pending) >= workers * 4:
+                report, future = pending.popleft()
+                yield report, future.result()
+        while pending:
+            report, future = pending.popleft()
+            yield report, future.result()
+
+
+class _StreamBuffer:
+    """Archivo de solo escritura que acumula bytes hasta que se leen con pop()"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_report_cards_zip(reports, workers=None):
+    """Genera un ZIP con un PDF por estudiante, entregando los bytes a medida que se producen"""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for report, pdf in iter_rendered_reports(reports, workers):
+            archive.writestr(report.filename(), pdf)
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+def write_report_cards_pdf(reports, output):
+    """Escribe todos los boletines en un solo PDF (una página por estudiante)"""
+    render_report_cards((report.pdf_data() for report in reports), output)
+
+
+def render_report_pdf(report, output):
+    """Escribe el boletín en PDF sobre output (archivo o HttpResponse)"""
+    render_report_card(report.pdf_data(), output)
@@ -0,0 +1,52 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from model_students.models import Student, Teacher, Admin, Punctuation, punctuation_deleted
+from .cache_invalidation import (
+    DELETED_WITH_PARENT, INVALIDATION_RULES, remember_tracked_values, schedule_invalidation, tags_for_change
+)
+from .identity import touch_identity
+
+USER_TYPES = {
+    Student: 'student',
+    Teacher: 'teacher',
+    Admin: 'admin',
+}
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Admin)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_delete, sender=Admin)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    """Invalida el nombre guardado en las sesiones al editar o eliminar un usuario"""
+    touch_identity(USER_TYPES[sender], instance.ci)
+
+
+def remember_cached_fields(sender, instance, using, raw=False, **kwargs):
+    """Valores anteriores de los campos que cambian qué datos en caché dependen del objeto"""
+    if not raw:
+        remember_tracked_values(instance, using)
+
+
+def invalidate_saved(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        schedule_invalidation(tags_for_change(instance), using)
+
+
+def invalidate_deleted(sender, instance, using, **kwargs):
+    # Antes de borrar: después, SET_NULL y CASCADE ya cambiaron las relaciones
+    schedule_invalidation(tags_for_change(instance), using)
+
+
+for model in INVALIDATION_RULES:
+    pre_save.connect(remember_cached_fields, sender=model, dispatch_uid=f'cache_fields_{model.__name__}')
+    post_save.connect(invalidate_saved, sender=model, dispatch_uid=f'cache_saved_{model.__name__}')
+    # Un receptor de borrado obliga a Django a cargar cada fila de las cascadas
+    if model not in DELETED_WITH_PARENT:
+        pre_delete.connect(invalidate_deleted, sender=model, dispatch_uid=f'cache_deleted_{model.__name__}')
+
+# Borrado directo de una nota (fuera de la cascada de su evaluación)
+punctuation_deleted.connect(invalidate_deleted, sender=Punctuation, dispatch_uid='cache_deleted_Punctuation')
@@ -1,3 +1,925 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from model_students.models import (
+    Student, Teacher, Course, Evaluation, Punctuation, StudentCourseStats, SystemLog,
+    Material, Announcement, Assignment
+)
+from .course_stats import annotate_course_stats
+
+
+class SchoolUserSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(ci='T1', username='prof', name='Ana', last_name='Pérez', email='p@colegio.edu', password='x')
+
+    def setUp(self):
+        session = self.client.session
+        session['user_type'] = 'teacher'
+        session['user_id'] = self.teacher.ci
+        session['user_name'] = 'Ana Pérez'
+        session['user_snapshot_at'] = time.time()
+        session.save()
+
+    def test_user_resolved_once_per_request(self):
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        teacher_queries = [q['sql'] for q in queries if 'FROM "model_students_teacher"' in q['sql']]
+        self.assertEqual(len(teacher_queries), 1)
+        # El usuario ya leído da el nombre del log: no hace falta revisar la marca de modificación
+        self.assertFalse([q['sql'] for q in queries if 'model_students_identitystamp' in q['sql']])
+
+    def test_profile_edit_with_another_users_email(self):
+        Student.objects.create(ci='S1', username='est', name='Luis', last_name='Núñez', email='e@colegio.edu', password='x')
+        response = self.client.post('/edit-profile/', {'name': 'Ana', 'last_name': 'Pérez', 'email': 'e@colegio.edu'})
+        self.assertContains(response, 'Ya existe un usuario con el email e@colegio.edu')
+        # Se muestran los datos guardados, no los rechazados
+        self.assertEqual(response.context['user_data'].email, 'p@colegio.edu')
+        self.assertEqual(Teacher.objects.get(ci='T1').email, 'p@colegio.edu')
+
+    def test_snapshot_invalidated_after_edit_and_delete(self):
+        from django.core.cache import cache
+        from model_students.models import IdentityStamp
+
+        self.teacher.name = 'Beatriz'
+        self.teacher.save()
+        # La marca está en la base de datos: otro proceso (con su propia caché) también la ve
+        cache.clear()
+        self.assertTrue(IdentityStamp.objects.filter(user_type='teacher', user_id='T1').exists())
+        self.client.get('/dashboard/')
+        self.assertEqual(self.client.session['user_name'], 'Beatriz Pérez')
+
+        # Un request que solo registra un log revisa la marca en lugar de leer al usuario
+        from django.test import RequestFactory
+        from .identity import get_user_name
+
+        request = RequestFactory().get('/')
+        request.session = {'user_type': 'teacher', 'user_id': 'T1', 'user_name': 'Beatriz Pérez', 'user_snapshot_at': time.time()}
+        with self.assertNumQueries(1):
+            self.assertEqual(get_user_name(request), 'Beatriz Pérez')
+        request.session['user_name'] = 'Ana Pérez'
+        request.session['user_snapshot_at'] = 0
+        with self.assertNumQueries(2):
+            self.assertEqual(get_user_name(request), 'Beatriz Pérez')
+
+        self.teacher.delete()
+        cache.clear()
+        response = self.client.get('/dashboard/')
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertNotIn('user_type', self.client.session)
+
+
+class SaveScoresTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [
+            Student.objects.create(
+                ci=f'S10{i}', username=f'est{i}', name='Luis', last_name=f'Núñez {i}',
+                email=f'est{i}@colegio.edu', password='x', grade=1
+            )
+            for i in range(3)
+        ]
+        cls.course = Course.objects.create(name_course='Matemáticas', grade=1)
+        cls.evaluation = Evaluation.objects.create(
+            course=cls.course, date=timezone.now() + timedelta(days=2), subject='Examen 1', type='Examen'
+        )
+
+    def test_validation_collects_every_error(self):
+        from .grading import validate_scores
+
+        scores, errors = validate_scores(
+            [('S100', '15,5'), ('S101', '21'), ('S102', 'abc'), ('S999', '10'), ('S100', ' ')],
+            [student.ci for student in self.students]
+        )
+        self.assertEqual(scores, {'S100': Decimal('15.50')})
+        self.assertEqual(len(errors), 3)
+        self.assertIn('S999 no pertenece', errors[2])
+
+    def test_bulk_upsert_and_stats(self):
+        from model_students.stats import find_stats_mismatches
+        from .grading import save_scores
+
+        first = {student.ci: Decimal('8.50') for student in self.students}
+        inserted, updated = save_scores(self.evaluation, first)
+        self.assertEqual((len(inserted), len(updated)), (3, 0))
+
+        second = {self.students[0].ci: Decimal('19.25')}
+        inserted, updated = save_scores(self.evaluation, second)
+        self.assertEqual((inserted, updated), ([], [self.students[0].ci]))
+        self.assertEqual(Punctuation.objects.get(student=self.students[0]).score, Decimal('19.25'))
+
+        stats = StudentCourseStats.objects.get(student=self.students[0], course=self.course)
+        self.assertEqual((stats.count, stats.passed_count, stats.average), (1, 1, Decimal('19.25')))
+        self.assertEqual(find_stats_mismatches(), [])
+
+
+class GradebookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(ci='T1', username='prof', name='Ana', last_name='Pérez', email='p@colegio.edu', password='x')
+        for i in range(3):
+            Student.objects.create(ci=f'S{i}', username=f'est{i}', name='Luis', last_name=f'Núñez {i}',
+                                   email=f'e{i}@colegio.edu', password='x', grade=1)
+        cls.course = Course.objects.create(name_course='Historia', grade=1, teacher=cls.teacher)
+        cls.evaluation = Evaluation.objects.create(course=cls.course, date=timezone.now(), subject='Examen', type='Examen')
+
+    def setUp(self):
+        session = self.client.session
+        session.update({'user_type': 'teacher', 'user_id': 'T1', 'user_name': 'Ana Pérez', 'user_snapshot_at': time.time()})
+        session.save()
+
+    def upload(self, name, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        response = self.client.post(f'/import-grades/{self.evaluation.id}/',
+                                    {'grades_file': SimpleUploadedFile(name, content.encode('utf-8'))}, follow=True)
+        return [str(message) for message in response.context['messages']]
+
+    def test_export_and_reimport_csv(self):
+        from .gradebook import iter_evaluation_gradebook
+
+        Punctuation.objects.create(evaluation=self.evaluation, student_id='S2', score=Decimal('9.99'))
+        lines = list(iter_evaluation_gradebook(self.evaluation))
+        self.assertEqual(len(lines), 4)
+        self.assertIn('9.99', ''.join(lines))
+
+        messages = self.upload('notas.csv', 'cedula;nota\nS0;15,5\nS1;\nS2;12\n')
+        self.assertEqual(messages, ['Notas importadas: 1 nuevas, 1 actualizadas'])
+        self.assertEqual(Punctuation.objects.get(student_id='S0').score, Decimal('15.50'))
+
+    def test_ragged_rows_are_a_form_error(self):
+        header = 'ci,evaluation_id,score\n'
+        messages = self.upload('notas.csv', header + f'S0,{self.evaluation.id},15\nS1\n')
+        self.assertEqual(messages, ['La fila 3 tiene 1 columnas y se esperaban al menos 2'])
+        self.assertFalse(Punctuation.objects.exists())
+
+    def test_xlsx_hidden_without_openpyxl(self):
+        from unittest import mock
+
+        with mock.patch.dict('sys.modules', {'openpyxl': None}):
+            response = self.client.get(f'/grade-evaluation/{self.evaluation.id}/')
+            self.assertContains(response, 'accept=".csv"')
+            self.assertNotContains(response, '.xlsx')
+            messages = self.upload('notas.xlsx', 'no importa')
+        self.assertEqual(messages, ['Para importar archivos XLSX instale openpyxl o use CSV'])
+
+
+class QueryMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(ci='T1', username='prof', name='Ana', last_name='Pérez', email='p@colegio.edu', password='x')
+
+    def setUp(self):
+        from .metrics import view_metrics
+
+        view_metrics.reset()
+        self.addCleanup(view_metrics.reset)
+        session = self.client.session
+        session.update({'user_type': 'teacher', 'user_id': 'T1', 'user_name': 'Ana Pérez', 'user_snapshot_at': time.time()})
+        session.save()
+
+    def test_percentile(self):
+        from .metrics import percentile
+
+        values = list(range(1, 101))
+        self.assertEqual((percentile(values, 50), percentile(values, 95), percentile(values, 99)), (50, 95, 99))
+        self.assertEqual(percentile([], 50), 0)
+
+    def test_requests_recorded_per_view(self):
+        from .metrics import RequestMetrics, view_metrics
+
+        # Contador independiente alrededor del middleware
+        counter = RequestMetrics()
+        with connection.execute_wrapper(counter):
+            self.client.get('/dashboard/')
+        self.client.get('/dashboard/')
+        (row,) = view_metrics.summary()
+        self.assertEqual((row['view'], row['count'], row['over_budget']), ('dashboard', 2, 0))
+        self.assertEqual(row['queries_max'], counter.queries)
+        self.assertGreater(row['template_time_p50'], 0)
+        self.assertGreaterEqual(row['wall_p99'], row['db_time_p99'])
+
+    def test_query_budget_warning(self):
+        from .metrics import view_metrics
+
+        with override_settings(VIEW_METRICS={'QUERY_BUDGETS': {'dashboard': 1}}):
+            with self.assertLogs('pages.metrics', 'WARNING') as logs:
+                self.client.get('/dashboard/')
+            (row,) = view_metrics.summary()
+        self.assertIn('La vista dashboard ejecutó', logs.output[0])
+        self.assertEqual((row['over_budget'], row['query_budget']), (1, 1))
+
+
+class StudentReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(ci='T1', username='prof', name='Ana', last_name='Pérez', email='p@colegio.edu', password='x')
+        cls.student = Student.objects.create(ci='S1', username='est1', name='Luis', last_name='Núñez', email='e1@colegio.edu', password='x', grade=1)
+        Student.objects.create(ci='S2', username='est2', name='María', last_name='Díaz', email='e2@colegio.edu', password='x', grade=1)
+        cls.courses = [Course.objects.create(name_course=f'Materia {i}', grade=1, teacher=cls.teacher) for i in range(4)]
+        Course.objects.create(name_course='Otra', grade=2, teacher=cls.teacher)
+        for course, score in zip(cls.courses, [8, 12, 16]):
+            evaluation = Evaluation.objects.create(course=course, date=timezone.now(), subject='Examen', type='Examen')
+            Punctuation.objects.create(evaluation=evaluation, student=cls.student, score=score)
+
+    def test_student_report_with_grouped_queries(self):
+        from .reports import build_student_report
+
+        # Materias con promedio y notas: dos consultas sin importar cuántas materias haya
+        with self.assertNumQueries(2):
+            report = build_student_report(self.student)
+        self.assertEqual([row['average'] for row in report.rows], [8, 12, 16, 0])
+        self.assertEqual([row['status'] for row in report.rows], ['Reprobado', 'Aprobado', 'Aprobado', 'Reprobado'])
+        self.assertEqual([len(row['punctuations']) for row in report.rows], [1, 1, 1, 0])
+        # La materia sin notas no cuenta en el promedio general
+        self.assertEqual(report.overall_average, 12)
+
+    def test_grade_reports_and_report_view(self):
+        from .reports import build_grade_reports
+
+        with self.assertNumQueries(3):
+            reports = build_grade_reports(1)
+        self.assertEqual([report.student.ci for report in reports], ['S2', 'S1'])
+        self.assertEqual((reports[0].overall_average, reports[1].overall_average), (0, 12))
+
+        session = self.client.session
+        session.update({'user_type': 'teacher', 'user_id': 'T1', 'user_name': 'Ana Pérez', 'user_snapshot_at': time.time()})
+        session.save()
+        response = self.client.get('/student-report/S1/')
+        self.assertEqual(response.context['overall_average'], 12)
+        response = self.client.get('/student-report/S1/', {'pdf': 1})
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+
+class ReportCardExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from model_students.models import Admin
+
+        cls.admin = Admin.objects.create(ci='A1', username='admin', name='Rosa', last_name='Díaz', email='a@colegio.edu', password='x')
+        cls.course = Course.objects.create(name_course='Historia', grade=1)
+        for i in range(3):
+            Student.objects.create(ci=f'S{i}', username=f'est{i}', name='Luis', last_name=f'Núñez {i}',
+                                   email=f'e{i}@colegio.edu', password='x', grade=1)
+
+    def setUp(self):
+        session = self.client.session
+        session.update({'user_type': 'admin', 'user_id': self.admin.pk, 'user_name': 'Rosa Díaz', 'user_snapshot_at': time.time()})
+        session.save()
+
+    def test_pool_keeps_student_order(self):
+        from .reports import build_grade_reports, iter_report_cards_zip
+
+        reports = build_grade_reports(1)
+        with zipfile.ZipFile(io.BytesIO(b''.join(iter_report_cards_zip(reports, workers=2)))) as archive:
+            names = archive.namelist()
+            self.assertTrue(all(archive.read(name).startswith(b'%PDF') for name in names))
+        self.assertEqual(names, [report.filename() for report in reports])
+        self.assertEqual(len(names), 3)
+
+    @override_settings(REPORT_CARD_WORKERS=0)
+    def test_zip_and_merged_pdf_downloads(self):
+        response = self.client.get('/report-cards/', {'course': self.course.id, 'format': 'zip'})
+        self.assertTrue(response.streaming)
+        self.assertIn('boletines_Historia_grado_1.zip', response['Content-Disposition'])
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(len(archive.namelist()), 3)
+
+        response = self.client.get('/report-cards/', {'grade': 1, 'format': 'pdf'})
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        # Una página por estudiante en el mismo archivo
+        self.assertEqual(content.count(b'/Type /Page\n') + content.count(b'/Type /Page\r'), 3)
+
+        response = self.client.get('/report-cards/', {'grade': 5})
+        self.assertRedirects(response, '/manage-grades/', fetch_redirect_response=False)
+
+
+class BenchmarkCasesTests(SimpleTestCase):
+    def test_every_url_has_a_case(self):
+        from . import urls
+        from .benchmarks import CASES, SKIPPED
+
+        names = {pattern.name for pattern in urls.urlpatterns if pattern.name}
+        self.assertEqual(sorted(names - set(CASES) - set(SKIPPED)), [])
+
+
+SEARCH_INDEX = re.compile(r'SEARCH \S+ USING (?:COVERING )?INDEX (\S+)')
+# Índices que Django crea para las claves foráneas y unique_together (el sufijo es un
+# hash fijo del nombre de la tabla y las columnas)
+COURSE_TEACHER_IDX = 'model_students_course_teacher_id_c621b847'
+EVALUATION_COURSE_IDX = 'model_students_evaluation_course_id_0535dba4'
+PUNCTUATION_STUDENT_IDX = 'model_students_punctuation_student_id_82d3cce4'
+PUNCTUATION_EVALUATION_IDX = 'model_students_punctuation_evaluation_id_bd6275ff'
+PUNCTUATION_EVALUATION_STUDENT_IDX = 'model_students_punctuation_evaluation_id_student_id_982c61b7_uniq'
+STATS_STUDENT_IDX = 'model_students_studentcoursestats_student_id_d86ab9f3'
+STATS_COURSE_IDX = 'model_students_studentcoursestats_course_id_e449cb0b'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es específico de SQLite')
+class QueryPlanTests(TestCase):
+    """Las consultas principales de las vistas deben usar índices, no recorrer tablas completas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from create_initial_data import create_benchmark_data
+
+        create_benchmark_data(students=300, teachers=10, evaluations_per_course=4, verbose=False)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        cls.student = Student.objects.order_by('ci').first()
+        cls.teacher = Teacher.objects.order_by('ci').first()
+        cls.course = Course.objects.filter(teacher=cls.teacher).order_by('id').first()
+        cls.evaluation = Evaluation.objects.filter(course=cls.course).order_by('id').first()
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertSearchesIndexes(self, queryset, *indexes):
+        """Ningún paso del plan recorre una tabla (SCAN, aunque sea "USING INDEX": eso recorre
+        el índice completo) y cada índice esperado se usa en una búsqueda (SEARCH)"""
+        plan = self.query_plan(queryset)
+        message = f'\n{queryset.query}\nPlan: {plan}'
+        self.assertEqual([step for step in plan if step.startswith('SCAN')], [], 'Recorrido completo en:' + message)
+        searched = {match[1] for match in map(SEARCH_INDEX.match, plan) if match}
+        for index in indexes:
+            self.assertIn(index, searched, f'No se busca por {index} en:' + message)
+
+    def assertLimitedIndexScan(self, queryset, index):
+        """Sin filtros, la primera página recorre el índice ya ordenado y se detiene en el LIMIT"""
+        self.assertIsNotNone(queryset.query.high_mark, 'El recorrido del índice debe tener LIMIT')
+        table = queryset.model._meta.db_table
+        self.assertEqual(self.query_plan(queryset), [f'SCAN {table} USING INDEX {index}'])
+
+    def test_login_lookups(self):
+        for model in (Student, Teacher):
+            self.assertSearchesIndexes(
+                model.objects.filter(username='bs000001', password='bench123'),
+                f'sqlite_autoindex_{model._meta.db_table}_1',
+            )
+
+    def test_student_views(self):
+        student = self.student
+        now = timezone.now()
+        self.assertSearchesIndexes(Course.objects.filter(grade=student.grade), 'course_grade_name_idx')
+        self.assertSearchesIndexes(
+            Course.objects.filter(name_course='Matemáticas', grade=student.grade), 'course_grade_name_idx'
+        )
+        self.assertSearchesIndexes(
+            Punctuation.objects.filter(student=student).select_related('evaluation').order_by('-evaluation__date'),
+            PUNCTUATION_STUDENT_IDX,
+        )
+        self.assertSearchesIndexes(
+            Evaluation.objects.filter(course__grade=student.grade, date__gt=now).order_by('date')[:5],
+            'course_grade_name_idx', 'evaluation_course_date_idx',
+        )
+        self.assertSearchesIndexes(StudentCourseStats.objects.filter(student=student), STATS_STUDENT_IDX)
+        self.assertSearchesIndexes(
+            Punctuation.objects.filter(student=student, evaluation__course=self.course).order_by('evaluation__date'),
+            'evaluation_course_date_idx', PUNCTUATION_EVALUATION_STUDENT_IDX,
+        )
+
+    def test_teacher_views(self):
+        teacher = self.teacher
+        self.assertSearchesIndexes(
+            Evaluation.objects.filter(course__teacher=teacher).order_by('-date'),
+            COURSE_TEACHER_IDX, EVALUATION_COURSE_IDX,
+        )
+        self.assertSearchesIndexes(
+            annotate_course_stats(Course.objects.filter(teacher=teacher)),
+            COURSE_TEACHER_IDX, 'student_grade_name_idx', 'evaluation_course_date_idx', STATS_COURSE_IDX,
+        )
+        self.assertSearchesIndexes(Punctuation.objects.filter(evaluation=self.evaluation), PUNCTUATION_EVALUATION_IDX)
+        self.assertSearchesIndexes(
+            Student.objects.filter(grade=self.course.grade).order_by('last_name', 'name'), 'student_grade_name_idx'
+        )
+        course_grades = set(Course.objects.filter(teacher=teacher).values_list('grade', flat=True))
+        self.assertSearchesIndexes(Course.objects.filter(teacher=teacher).values('grade'), COURSE_TEACHER_IDX)
+        self.assertSearchesIndexes(Student.objects.filter(grade__in=course_grades), 'student_grade_name_idx')
+
+    def test_report_queries(self):
+        grade = self.student.grade
+        self.assertSearchesIndexes(
+            StudentCourseStats.objects.filter(student__grade=grade, course__grade=grade),
+            'student_grade_name_idx', STATS_STUDENT_IDX,
+        )
+        self.assertSearchesIndexes(
+            Punctuation.objects.filter(student=self.student, evaluation__course__grade=grade).select_related('evaluation'),
+            PUNCTUATION_STUDENT_IDX,
+        )
+
+    def test_virtual_classroom(self):
+        course = self.course
+        self.assertSearchesIndexes(Material.objects.filter(course=course)[:10], 'material_course_created_idx')
+        self.assertSearchesIndexes(Announcement.objects.filter(course=course)[:5], 'announce_course_created_idx')
+        self.assertSearchesIndexes(Assignment.objects.filter(course=course)[:5], 'assignment_course_due_idx')
+        self.assertSearchesIndexes(
+            Evaluation.objects.filter(course=course).order_by('-date')[:5], 'evaluation_course_date_idx'
+        )
+
+    def test_system_logs(self):
+        from model_students.log_query import LOG_PAGE_SIZE
+
+        now = timezone.now()
+        filter_indexes = (
+            ({}, 'systemlog_timestamp_idx'),
+            ({'user_type': 'teacher'}, 'systemlog_type_ts_idx'),
+            ({'action': 'LOGIN'}, 'systemlog_action_ts_idx'),
+            ({'user_id': self.student.ci}, 'systemlog_user_ts_idx'),
+        )
+        for filters, index in filter_indexes:
+            logs = SystemLog.objects.filter(**filters).order_by('-timestamp', '-id')
+            if filters:
+                self.assertSearchesIndexes(logs[:LOG_PAGE_SIZE + 1], index)
+            else:
+                self.assertLimitedIndexScan(logs[:LOG_PAGE_SIZE + 1], index)
+            # Página siguiente por cursor (timestamp, id)
+            self.assertSearchesIndexes(
+                logs.filter(timestamp__lte=now).exclude(timestamp=now, id__gte=1000)[:LOG_PAGE_SIZE + 1], index
+            )
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Respaldo con la API de SQLite')
+class BackupTests(TransactionTestCase):
+    """Sin transacción abierta: el respaldo lee la base desde otra conexión"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        Teacher.objects.create(ci='T1', username='prof', name='Ana', last_name='Pérez', email='a@colegio.edu', password='x')
+
+    def test_background_backup_is_compressed_and_hashed(self):
+        from .backup import start_backup
+
+        job = start_backup(self.directory.name, compression='gzip')
+        job.join(30)
+        self.assertEqual(job.status, 'done', job.error)
+        self.assertEqual(job.progress, 100.0)
+        self.assertTrue(job.path.endswith('.db.gz'))
+
+        with open(job.path, 'rb') as f:
+            self.assertEqual(hashlib.sha256(f.read()).hexdigest(), job.sha256)
+        with open(job.path + '.sha256', encoding='utf-8') as f:
+            self.assertEqual(f.read().split(), [job.sha256, os.path.basename(job.path)])
+
+        restored = os.path.join(self.directory.name, 'restored.db')
+        with gzip.open(job.path) as src, open(restored, 'wb') as dst:
+            dst.write(src.read())
+        db = sqlite3.connect(restored)
+        try:
+            self.assertEqual(db.execute('PRAGMA integrity_check').fetchone(), ('ok',))
+            self.assertEqual(db.execute('SELECT username FROM model_students_teacher').fetchall(), [('prof',)])
+        finally:
+            db.close()
+
+    def test_rotate_safety_copies(self):
+        from .backup import rotate_backups
+
+        for day in range(1, 6):
+            path = os.path.join(self.directory.name, f'db_backup_before_restore_2026010{day}_120000.db.gz')
+            for name in (path, path + '.sha256'):
+                open(name, 'w').close()
+        removed = rotate_backups(self.directory.name, 'db_backup_before_restore', keep=3)
+        self.assertEqual([os.path.basename(path)[25:33] for path in removed], ['20260101', '20260102'])
+        self.assertEqual(len(os.listdir(self.directory.name)), 6)
+
+    def test_restore_validation(self):
+        from .backup import BackupError, check_sqlite_backup, write_backup
+
+        path = os.path.join(self.directory.name, 'respaldo.db')
+        write_backup(path)
+        self.assertEqual(check_sqlite_backup(path), [])
+
+        db = sqlite3.connect(path)
+        db.execute("DELETE FROM django_migrations WHERE app = 'model_students' AND name = '0009_hot_path_indexes'")
+        db.commit()
+        db.close()
+        self.assertEqual(check_sqlite_backup(path), [('model_students', '0009_hot_path_indexes')])
+
+        db = sqlite3.connect(path)
+        db.execute("INSERT INTO django_migrations (app, name, applied) VALUES ('model_students', '9999_futura', '2030-01-01')")
+        db.commit()
+        db.close()
+        with self.assertRaisesMessage(BackupError, 'versión más nueva'):
+            check_sqlite_backup(path)
+
+        with open(path, 'r+b') as f:
+            f.write(b'no es sqlite')
+        with self.assertRaisesMessage(BackupError, 'no es una base de datos SQLite'):
+            check_sqlite_backup(path)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Compara con el archivo SQLite real')
+class LogBufferTests(TransactionTestCase):
+    """Sin transacción abierta: el hilo del buffer escribe desde otra conexión"""
+
+    def test_test_runner_disables_buffer(self):
+        from utils.logger import get_buffer_settings
+
+        self.assertFalse(get_buffer_settings()['ENABLED'])
+
+    def test_buffered_logs_land_in_test_database(self):
+        from django.conf import settings
+        from django.test import RequestFactory, override_settings
+        from django_base.database import database_config
+        from utils.logger import log_buffer_stats, log_user_activity, stop_log_buffer
+
+        marker = f'Prueba del buffer {time.time_ns()}'
+        request = RequestFactory().get('/')
+        request.session = {'user_type': 'admin', 'user_id': 'A1', 'user_name': 'Rosa Díaz'}
+        with override_settings(SYSTEM_LOG_BUFFER={'ENABLED': True, 'FLUSH_INTERVAL': 60}):
+            stop_log_buffer()
+            for i in range(3):
+                log_user_activity(request, 'UPDATE', f'{marker} {i}')
+            self.assertEqual(log_buffer_stats()['queued'], 3)
+            # Lo mismo que hace el ejecutor de pruebas antes de borrar la base
+            stop_log_buffer()
+        self.assertEqual(log_buffer_stats()['queued'], 0)
+        self.assertEqual(SystemLog.objects.filter(description__startswith=marker).count(), 3)
+
+        real_db = database_config(settings.BASE_DIR, os.environ)['NAME']
+        self.assertNotEqual(str(real_db), str(connection.settings_dict['NAME']))
+        if os.path.exists(real_db):
+            db = sqlite3.connect(f'file:{real_db}?mode=ro', uri=True)
+            try:
+                count = db.execute(
+                    'SELECT COUNT(*) FROM model_students_systemlog WHERE description LIKE ?', [marker + '%']
+                ).fetchone()[0]
+            finally:
+                db.close()
+            self.assertEqual(count, 0)
+
+
+class LogExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from model_students.models import Admin
+
+        cls.admin = Admin.objects.create(ci='A1', username='admin', name='Rosa', last_name='Díaz', email='a@colegio.edu', password='x')
+        now = timezone.now()
+        SystemLog.objects.bulk_create([
+            SystemLog(
+                user_type='teacher', user_id=f'T{i % 2}', user_name='Ana Pérez', action='UPDATE' if i % 3 else 'LOGIN',
+                description=f'Calificó evaluación, "parcial" {i}', ip_address='10.0.0.1', timestamp=now - timedelta(minutes=i)
+            )
+            for i in range(30)
+        ])
+
+    def setUp(self):
+        session = self.client.session
+        session['user_type'] = 'admin'
+        session['user_id'] = self.admin.pk
+        session.save()
+
+    def test_streamed_csv_matches_viewer_filters(self):
+        response = self.client.get('/system-logs/export/', {'format': 'csv', 'user_id': 'T1', 'action': 'UPDATE'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(rows[0][:3], ['id', 'timestamp', 'user_type'])
+        expected = SystemLog.objects.filter(user_id='T1', action='UPDATE').order_by('timestamp', 'id')
+        self.assertEqual([int(row[0]) for row in rows[1:]], list(expected.values_list('id', flat=True)))
+        self.assertEqual(rows[1][6], expected.first().description)
+
+    def test_jsonl_and_command(self):
+        response = self.client.get('/system-logs/export/', {'format': 'jsonl', 'q': 'parcial 7', 'user_type': 'teacher'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual({record['description'] for record in records}, {'Calificó evaluación, "parcial" 7'})
+
+        output = io.StringIO()
+        call_command('export_system_logs', format='jsonl', action='LOGIN', stdout=output)
+        self.assertEqual(len(output.getvalue().splitlines()), 10)
+
+        response = self.client.get('/system-logs/export/', {'format': 'xml'})
+        self.assertRedirects(response, '/system-logs/', fetch_redirect_response=False)
+
+
+class LogPolicyTests(SimpleTestCase):
+    def test_policy_skips_low_value_events(self):
+        from utils.logger import LogPolicy
+
+        draws = iter([0.05, 0.5, 0.95])
+        policy = LogPolicy(
+            disabled_actions=['LOGOUT'], always_log=['DELETE'], sample_rates={'home': 0.1},
+            dedupe_actions=['VIEW'], dedupe_window=300, rng=lambda: next(draws)
+        )
+        user = ('student', 'S1')
+        self.assertEqual(policy.decide('VIEW', user, 'Accedió a página de inicio', 'home'), 'logged')
+        self.assertEqual(policy.decide('VIEW', user, 'Accedió a página de inicio', 'home'), 'sampled')
+        self.assertEqual(policy.decide('VIEW', user, 'Visualizó calificaciones', 'student_grades'), 'logged')
+        self.assertEqual(policy.decide('VIEW', user, 'Visualizó calificaciones', 'student_grades'), 'duplicate')
+        self.assertEqual(policy.decide('VIEW', ('student', 'S2'), 'Visualizó calificaciones', 'student_grades'), 'logged')
+        self.assertEqual(policy.decide('LOGOUT', user, 'Cerró sesión'), 'disabled')
+        for _ in range(2):
+            self.assertEqual(policy.decide('DELETE', user, 'Eliminó material'), 'logged')
+
+        stats = policy.stats()
+        self.assertEqual((stats['logged'], stats['skipped']), (5, 3))
+        self.assertEqual(stats['saved_percent'], 37.5)
+        self.assertEqual(stats['by_action']['VIEW']['duplicate'], 1)
+
+
+class ViewCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(ci='T1', username='prof', name='Ana', last_name='Pérez', email='p@colegio.edu', password='x')
+        cls.student = Student.objects.create(ci='S1', username='est', name='Luis', last_name='Núñez', email='e@colegio.edu', password='x', grade=1)
+        cls.course = Course.objects.create(name_course='Matemáticas', grade=1, teacher=cls.teacher)
+        cls.evaluation = Evaluation.objects.create(course=cls.course, date=timezone.now() + timedelta(days=3), subject='Examen 1', type='Examen')
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        session = self.client.session
+        session['user_type'] = 'student'
+        session['user_id'] = self.student.ci
+        session['user_name'] = 'Luis Núñez'
+        session.save()
+
+    def test_tagged_values_are_rebuilt_after_invalidation(self):
+        from .view_cache import cached, invalidate, grade_tag, user_tag
+
+        calls = []
+        def build():
+            calls.append(1)
+            return len(calls)
+
+        tags = [user_tag('student', 'S1'), grade_tag(1)]
+        self.assertEqual(cached('prueba', tags, build), 1)
+        self.assertEqual(cached('prueba', tags, build), 1)
+        invalidate(grade_tag(1))
+        self.assertEqual(cached('prueba', tags, build), 2)
+        self.assertEqual(cached('prueba', [user_tag('student', 'S2'), grade_tag(1)], build), 3)
+
+    def test_dashboard_cached_until_a_related_write(self):
+        from .grading import save_scores
+
+        self.client.get('/dashboard/')
+        with self.assertNumQueries(2):
+            # Solo sesión y usuario: los datos del dashboard salen de la caché
+            response = self.client.get('/dashboard/')
+        self.assertEqual(response.context['approved_evaluations'], 0)
+
+        # Las invalidaciones se aplican al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            save_scores(self.evaluation, {self.student.ci: 15})
+        self.assertEqual(self.client.get('/dashboard/').context['approved_evaluations'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Evaluation.objects.create(course=self.course, date=timezone.now() + timedelta(days=1), subject='Quiz', type='Quiz')
+        upcoming = self.client.get('/dashboard/').context['upcoming_evaluations']
+        self.assertEqual([evaluation.subject for evaluation in upcoming], ['Quiz', 'Examen 1'])
+
+    def test_invalidations_coalesced_per_transaction(self):
+        from unittest import mock
+        from django.db import transaction
+        from .view_cache import grade_tag, user_tag
+
+        with mock.patch('pages.cache_invalidation.invalidate') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    for i in range(3):
+                        Evaluation.objects.create(course=self.course, date=timezone.now(), subject=f'Quiz {i}', type='Quiz')
+                    self.course.grade = 2
+                    self.course.save()
+            self.assertEqual(len(callbacks), 1)
+            (tags,) = [set(call.args) for call in invalidate.call_args_list]
+            self.assertTrue({grade_tag(1), grade_tag(2), user_tag('teacher', 'T1')} <= tags)
+
+            invalidate.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        Punctuation.objects.create(evaluation=self.evaluation, student=self.student, score=8)
+                        raise IntegrityError
+                except IntegrityError:
+                    pass
+            invalidate.assert_not_called()
+
+            # Al borrar un profesor sus materias quedan sin profesor: las etiquetas se calculan antes
+            with self.captureOnCommitCallbacks(execute=True):
+                self.teacher.delete()
+            self.assertIn(grade_tag(2), invalidate.call_args.args)
+
+    def test_saves_and_cascades_without_extra_queries(self):
+        from unittest import mock
+        from django.test.utils import CaptureQueriesContext
+        from .view_cache import grade_tag
+
+        # Los valores anteriores salen de la fila ya leída: solo el UPDATE
+        course = Course.objects.get(id=self.course.id)
+        course.grade = 2
+        with mock.patch('pages.cache_invalidation.invalidate') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+                course.save()
+        self.assertTrue({grade_tag(1), grade_tag(2)} <= set(invalidate.call_args.args))
+
+        # Las notas y materiales se borran con un solo DELETE, sin cargarlos
+        Punctuation.objects.create(evaluation=self.evaluation, student=self.student, score=15)
+        Material.objects.create(course=course, title='Guía', material_type='link', url='https://colegio.edu', created_by=self.teacher)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            course.delete()
+        loaded = [
+            query['sql'] for query in queries
+            if query['sql'].startswith(('SELECT "model_students_punctuation"."id"', 'SELECT "model_students_material"."id"'))
+        ]
+        self.assertEqual(loaded, [])
+        self.assertFalse(StudentCourseStats.objects.filter(student=self.student).exists())
+
+
+class FakeRedisError(Exception):
+    pass
+
+
+class FakeRedisPool:
+    """Servidor Redis en memoria: un diccionario por URL, compartido entre clientes"""
+    servers = {}
+
+    def __init__(self, url):
+        self.data = self.servers.setdefault(url, {})
+
+    @classmethod
+    def from_url(cls, url, **options):
+        return cls(url)
+
+
+class FakeRedis:
+    """Los comandos que usa RedisCache, con la codificación de redis-py (todo se guarda como bytes)"""
+
+    def __init__(self, connection_pool):
+        self.data = connection_pool.data
+
+    @staticmethod
+    def encode(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = self.encode(value)
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def incr(self, key, amount=1):
+        # Como INCR de Redis: solo sobre valores guardados como entero
+        try:
+            value = int(self.data.get(key, b'0')) + amount
+        except ValueError:
+            raise FakeRedisError('value is not an integer or out of range')
+        self.data[key] = self.encode(value)
+        return value
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def flushdb(self):
+        self.data.clear()
+        return True
+
+
+def fake_redis_module():
+    import types
+
+    module = types.ModuleType('redis')
+    module.Redis = FakeRedis
+    module.ConnectionPool = FakeRedisPool
+    module.connection = types.SimpleNamespace(DefaultParser=object)
+    return module
+
+
+class RedisViewCacheTests(SimpleTestCase):
+    """La caché de vistas con CACHE_BACKEND=redis, contra un servidor falso en memoria"""
+    location = 'redis://cache-falso:6379/1'
+
+    def setUp(self):
+        import sys
+        from unittest import mock
+        from django_base.cache import cache_config
+
+        FakeRedisPool.servers.clear()
+        patcher = mock.patch.dict(sys.modules, {'redis': fake_redis_module()})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.config = cache_config(None, {'CACHE_BACKEND': 'redis', 'CACHE_LOCATION': self.location})
+        self.enterContext(override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}, 'redis': self.config},
+            VIEW_CACHE={'ALIAS': 'redis'},
+        ))
+
+    def test_tag_versions_bumped_through_redis(self):
+        from django.core.cache.backends.redis import RedisCache
+        from .view_cache import cached, grade_tag, invalidate, user_tag, version_key
+
+        calls = []
+        def build():
+            calls.append(1)
+            return len(calls)
+
+        tags = [user_tag('student', 'S1'), grade_tag(1)]
+        self.assertEqual(cached('prueba', tags, build), 1)
+        self.assertEqual(cached('prueba', tags, build), 1)
+
+        # Las versiones se guardan como enteros, así que INCR funciona en el servidor
+        stored = FakeRedisPool.servers[self.location]
+        version = stored[f'colegio:1:{version_key(grade_tag(1))}']
+        self.assertTrue(version.isdigit())
+
+        invalidate(grade_tag(1))
+        self.assertEqual(cached('prueba', tags, build), 2)
+        self.assertEqual(int(stored[f'colegio:1:{version_key(grade_tag(1))}']), int(version) + 1)
+
+        # Otro proceso (otra instancia del backend) invalida y este lo ve en la siguiente lectura
+        other = RedisCache(self.config['LOCATION'], self.config)
+        other.incr(version_key(user_tag('student', 'S1')))
+        self.assertEqual(cached('prueba', tags, build), 3)
+
+        # Invalidar una etiqueta sin versión no falla ni la crea
+        invalidate(grade_tag(9))
+        self.assertNotIn(f'colegio:1:{version_key(grade_tag(9))}', stored)
+
+
+class ManageUsersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from model_students.models import Admin
+
+        cls.admin = Admin.objects.create(ci='A1', username='admin', name='Rosa', last_name='Díaz', email='a@colegio.edu', password='x')
+        teachers = Teacher.objects.bulk_create([
+            Teacher(ci=f'T{i:02}', username=f'prof{i}', name='Ana', last_name=f'Pérez {i:02}', email=f'p{i}@colegio.edu', password='x')
+            for i in range(30)
+        ])
+        Course.objects.bulk_create([Course(name_course=f'Materia {i}', grade=1, teacher=teachers[i % 3]) for i in range(7)])
+        Student.objects.bulk_create([
+            Student(ci=f'S{i:03}', username=f'est{i}', name='Luis' if i % 2 else 'María', last_name=f'Núñez {i:03}',
+                    email=f'e{i}@colegio.edu', password='x', grade=1)
+            for i in range(60)
+        ])
+
+    def setUp(self):
+        session = self.client.session
+        session['user_type'] = 'admin'
+        session['user_id'] = self.admin.pk
+        session['user_name'] = 'Rosa Díaz'
+        session.save()
+
+    def test_pages_have_constant_size_and_annotated_course_counts(self):
+        from .people import USERS_PAGE_SIZE
+
+        # Sesión, marca de modificación, usuario, log, grados y conteo + página de cada listado,
+        # sin importar cuántos usuarios haya
+        with self.assertNumQueries(12):
+            response = self.client.get('/manage-users/', {'tab': 'teachers', 'teacher_page': 2})
+        students, teachers = response.context['students'], response.context['teachers']
+        self.assertEqual((len(students), students.paginator.count), (USERS_PAGE_SIZE, 60))
+        self.assertEqual((teachers.number, len(teachers)), (2, 5))
+        first = self.client.get('/manage-users/').context['teachers'][0]
+        self.assertEqual((first.ci, first.courses_count), ('T00', 3))
+
+    def test_search_over_every_field(self):
+        def search(text):
+            return [student.ci for student in self.client.get('/manage-users/', {'student_q': text}).context['students']]
+
+        def count(text):
+            return self.client.get('/manage-users/', {'student_q': text}).context['students'].paginator.count
+
+        self.assertEqual(search('nuñez 007'), [])
+        self.assertEqual(search('núñez 007'), ['S007'])
+        self.assertEqual(search('est12'), ['S012'])
+        self.assertEqual(search('e45@colegio'), ['S045'])
+        self.assertEqual(count('maría'), 30)
@@ -12,6 +12,8 @@ urlpatterns = [
     path('create-evaluation/', views.create_evaluation, name='create_evaluation'),
     path('grade-evaluation/<int:eval_id>/', views.grade_evaluation, name='grade_evaluation'),
     path('delete-evaluation/<int:eval_id>/', views.delete_evaluation, name='delete_evaluation'),
+    path('import-grades/<int:eval_id>/', views.import_grades, name='import_grades'),
+    path('export-grades/', views.export_grades, name='export_grades'),
     path('profile/', views.profile, name='profile'),
     path('edit-profile/', views.edit_profile, name='edit_profile'),
     path('my-subjects/', views.my_subjects, name='my_subjects'),
@@ -29,7 +31,12 @@ urlpatterns = [
     path('manage-courses/', admin_views.manage_courses, name='manage_courses'),
     path('manage-users/', admin_views.manage_users, name='manage_users'),
     path('system-logs/', admin_views.system_logs, name='system_logs'),
+    path('system-logs/export/', admin_views.export_system_logs, name='export_system_logs'),
+    path('performance/', admin_views.performance_metrics, name='performance_metrics'),
+    path('directory/search/', admin_views.directory_search, name='directory_search'),
     path('course-students/<int:course_id>/', admin_views.course_students, name='course_students'),
     path('course-students-pdf/<int:course_id>/', admin_views.course_students_pdf, name='course_students_pdf'),
     path('maintenance/', admin_views.maintenance, name='maintenance'),
+    path('maintenance/backup/<str:job_id>/', admin_views.backup_status, name='backup_status'),
+    path('report-cards/', admin_views.export_report_cards, name='export_report_cards'),
 ]
\ No newline at end of file
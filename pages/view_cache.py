@@ -0,0 +1,125 @@
+"""Caché de datos de las vistas más consultadas (dashboards, materias, aulas).
+
+Cada valor se guarda bajo una clave que incluye la versión de sus etiquetas
+(usuario, materia, grado...). Invalidar una etiqueta incrementa su versión: las
+claves viejas dejan de usarse y expiran solas por TTL, sin tener que buscarlas.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Configuración por defecto (se puede sobreescribir con VIEW_CACHE en settings.py)
+DEFAULT_VIEW_CACHE_SETTINGS = {
+    'ENABLED': True,
+    'ALIAS': 'default',       # Caché de CACHES a usar
+    'TIMEOUT': 300,           # TTL en segundos
+    'TIMEOUTS': {},           # TTL por nombre de valor: {'dashboard': 60}
+}
+
+GLOBAL_TAG = 'global'
+
+_MISSING = object()
+
+
+def get_view_cache_settings():
+    config = dict(DEFAULT_VIEW_CACHE_SETTINGS)
+    config.update(getattr(settings, 'VIEW_CACHE', {}))
+    return config
+
+
+def user_tag(user_type, user_id):
+    return f'user:{user_type}:{user_id}'
+
+
+def course_tag(course_id):
+    return f'course:{course_id}'
+
+
+def grade_tag(grade):
+    return f'grade:{grade}'
+
+
+def version_key(tag):
+    return f'cache_version:{tag}'
+
+
+class CacheStats:
+    """Aciertos y fallos por nombre de valor"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def count(self, name, hit):
+        with self._lock:
+            counts = self._counts.setdefault(name, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def summary(self):
+        with self._lock:
+            return {name: dict(counts) for name, counts in sorted(self._counts.items())}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+cache_stats = CacheStats()
+
+
+def get_cache():
+    return caches[get_view_cache_settings()['ALIAS']]
+
+
+def tag_versions(cache, tags):
+    """Versión actual de cada etiqueta (una sola consulta a la caché si ya existen)"""
+    keys = [version_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Versión inicial distinta en cada creación: si la caché descarta la versión,
+            # las claves anteriores no vuelven a ser válidas
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def cached(name, tags, build, timeout=None):
+    """Devuelve el valor guardado para name y tags, o lo calcula con build() y lo guarda.
+
+    El valor debe poder serializarse (listas, diccionarios o modelos ya cargados,
+    no querysets sin evaluar).
+    """
+    config = get_view_cache_settings()
+    if not config['ENABLED']:
+        return build()
+
+    cache = get_cache()
+    versions = tag_versions(cache, tags)
+    key = f'view:{name}:' + ':'.join(f'{tag}={version}' for tag, version in zip(tags, versions))
+    value = cache.get(key, _MISSING)
+    cache_stats.count(name, value is not _MISSING)
+    if value is _MISSING:
+        value = build()
+        if timeout is None:
+            timeout = config['TIMEOUTS'].get(name, config['TIMEOUT'])
+        cache.set(key, value, timeout)
+    return value
+
+
+def invalidate(*tags):
+    """Deja obsoletos todos los valores guardados con alguna de estas etiquetas"""
+    cache = get_cache()
+    for tag in tags:
+        try:
+            cache.incr(version_key(tag))
+        except ValueError:
+            # La etiqueta no tiene versión: no hay valores guardados con ella
+            pass
+
+
+def clear_view_cache():
+    """Vacía la caché completa (por ejemplo, después de restaurar la base de datos)"""
+    get_cache().clear()
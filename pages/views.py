@@ -1,8 +1,17 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.db import models
-from model_students.models import Student, Teacher, Evaluation, Course, Punctuation, Admin, Material, Announcement, Assignment
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import models, transaction, IntegrityError
+from django.db.models import Count, Sum
+from model_students.models import Student, Teacher, Evaluation, Course, Punctuation, Admin, Material, Announcement, Assignment, StudentCourseStats
 from utils.logger import log_user_activity
+from model_students.registry import find_identity_conflict, DUPLICATE_MESSAGES, IdentityConflictError
+from .identity import remember_user
+from .view_cache import cached, grade_tag, user_tag
+from .reports import build_student_report, render_report_pdf
+from .grading import validate_scores, save_scores
+from .course_stats import annotate_course_stats, get_course_stats
+from .gradebook import import_gradebook, iter_evaluation_gradebook, iter_gradebook, xlsx_supported, GradebookImportError
 
 def home(request):
     if request.method == 'GET':
@@ -16,8 +25,7 @@ def home(request):
         if user_type == 'student':
             try:
                 student = Student.objects.get(username=username, password=password)
-                request.session['user_type'] = 'student'
-                request.session['user_id'] = student.ci
+                remember_user(request, 'student', student)
                 return redirect('dashboard')
             except Student.DoesNotExist:
                 messages.error(request, 'Credenciales de estudiante incorrectas')
@@ -25,8 +33,7 @@ def home(request):
         elif user_type == 'teacher':
             try:
                 teacher = Teacher.objects.get(username=username, password=password)
-                request.session['user_type'] = 'teacher'
-                request.session['user_id'] = teacher.ci
+                remember_user(request, 'teacher', teacher)
                 return redirect('dashboard')
             except Teacher.DoesNotExist:
                 messages.error(request, 'Credenciales de profesor incorrectas')
@@ -34,8 +41,7 @@ def home(request):
         elif user_type == 'admin':
             try:
                 admin = Admin.objects.get(username=username, password=password)
-                request.session['user_type'] = 'admin'
-                request.session['user_id'] = admin.ci
+                remember_user(request, 'admin', admin)
                 return redirect('admin_dashboard')
             except Admin.DoesNotExist:
                 messages.error(request, 'Credenciales de administrador incorrectas')
@@ -63,42 +69,40 @@ def register(request):
         # Determinar tipo de usuario automáticamente por email
         is_teacher = email.endswith('@profesor.edu') or email.endswith('@teacher.edu') or 'profesor' in email.lower()
         
-        # Validar duplicados
-        if (Student.objects.filter(ci=ci).exists() or 
-            Teacher.objects.filter(ci=ci).exists() or 
-            Admin.objects.filter(ci=ci).exists()):
-            messages.error(request, f'Ya existe un usuario con la cédula {ci}')
-        elif (Student.objects.filter(username=username).exists() or 
-              Teacher.objects.filter(username=username).exists() or 
-              Admin.objects.filter(username=username).exists()):
-            messages.error(request, f'Ya existe un usuario con el nombre de usuario "{username}"')
-        elif (Student.objects.filter(email=email).exists() or 
-              Teacher.objects.filter(email=email).exists() or 
-              Admin.objects.filter(email=email).exists()):
-            messages.error(request, f'Ya existe un usuario con el email {email}')
+        # Validar duplicados en los tres roles con una sola consulta
+        conflict = find_identity_conflict(ci=ci, username=username, email=email)
+        if conflict:
+            messages.error(request, DUPLICATE_MESSAGES[conflict].format(ci=ci, username=username, email=email))
         else:
             try:
+                # El registro de identidades rechaza duplicados aunque dos registros pasen la validación a la vez
+                with transaction.atomic():
+                    if is_teacher:
+                        Teacher.objects.create(
+                            username=username,
+                            name=username,
+                            last_name='',
+                            ci=ci,
+                            email=email,
+                            password=password
+                        )
+                    else:
+                        Student.objects.create(
+                            username=username,
+                            name=username,
+                            last_name='',
+                            ci=ci,
+                            email=email,
+                            password=password
+                        )
                 if is_teacher:
-                    Teacher.objects.create(
-                        username=username,
-                        name=username,
-                        last_name='',
-                        ci=ci,
-                        email=email,
-                        password=password
-                    )
                     messages.success(request, 'Profesor registrado exitosamente')
                 else:
-                    Student.objects.create(
-                        username=username,
-                        name=username,
-                        last_name='',
-                        ci=ci,
-                        email=email,
-                        password=password
-                    )
                     messages.success(request, 'Estudiante registrado exitosamente')
                 return redirect('home')
+            except IntegrityError:
+                conflict = find_identity_conflict(ci=ci, username=username, email=email) or 'ci'
+                messages.error(request, DUPLICATE_MESSAGES[conflict].format(ci=ci, username=username, email=email))
             except Exception as e:
                 messages.error(request, f'Error al registrar usuario: {str(e)}')
     
@@ -117,51 +121,60 @@ def dashboard(request):
     if user_type == 'admin':
         return redirect('admin_dashboard')
     
+    user_data = request.school_user
+    if user_type == 'student':
+        data = cached('dashboard', [user_tag('student', user_data.ci), grade_tag(user_data.grade)],
+                      lambda: student_dashboard_data(user_data))
+    else:
+        data = cached('dashboard', [user_tag('teacher', user_data.ci)], lambda: teacher_dashboard_data(user_data))
+    
+    context = {
+        'user_type': user_type,
+        'user_data': user_data,
+    }
+    context.update(data)
+    return render(request, 'dashboard.html', context)
+
+def student_dashboard_data(student):
+    """Datos del dashboard del estudiante (se guardan en caché)"""
     from django.utils import timezone
     
-    if user_type == 'student':
-        user_data = Student.objects.get(ci=user_id)
+    return {
         # Solo puntuaciones del estudiante logueado
-        evaluations = Punctuation.objects.filter(student=user_data).select_related('evaluation').order_by('-evaluation__date')
-        # Calcular evaluaciones aprobadas (score >= 10)
-        approved_evaluations = evaluations.filter(score__gte=10).count()
+        'evaluations': list(Punctuation.objects.filter(student=student).select_related('evaluation').order_by('-evaluation__date')),
+        # Evaluaciones aprobadas (score >= 10) según las estadísticas precalculadas
+        'approved_evaluations': StudentCourseStats.objects.filter(student=student).aggregate(
+            total=Sum('passed_count')
+        )['total'] or 0,
         # Contar materias del grado del estudiante
-        courses_count = Course.objects.filter(grade=user_data.grade).count()
+        'courses_count': Course.objects.filter(grade=student.grade).count(),
         # Próximas evaluaciones (futuras) del grado del estudiante
-        upcoming_evaluations = Evaluation.objects.filter(
-            course__grade=user_data.grade,
+        'upcoming_evaluations': list(Evaluation.objects.filter(
+            course__grade=student.grade,
             date__gt=timezone.now()
-        ).order_by('date')[:5]
-    else:
-        user_data = Teacher.objects.get(ci=user_id)
+        ).select_related('course').order_by('date')[:5]),
+    }
+
+def teacher_dashboard_data(teacher):
+    """Datos del dashboard del profesor (se guardan en caché)"""
+    from django.utils import timezone
+    
+    # Contar materias asignadas al profesor
+    course_grades = list(Course.objects.filter(teacher=teacher).values_list('grade', flat=True))
+    return {
         # Solo evaluaciones de cursos asignados al profesor
-        evaluations = Evaluation.objects.filter(course__teacher=user_data).order_by('-date')
-        approved_evaluations = 0
-        # Contar materias asignadas al profesor
-        courses_count = Course.objects.filter(teacher=user_data).count()
-        # Calcular total de estudiantes únicos en los grados de las materias del profesor
-        teacher_courses = Course.objects.filter(teacher=user_data)
-        total_students = Student.objects.filter(grade__in=teacher_courses.values('grade')).distinct().count()
+        'evaluations': list(Evaluation.objects.filter(course__teacher=teacher).order_by('-date')),
+        'approved_evaluations': 0,
+        'courses_count': len(course_grades),
+        # Calcular total de estudiantes en los grados de las materias del profesor
+        # (lista de grados literal para que SQLite use el índice de Student.grade)
+        'total_students': Student.objects.filter(grade__in=set(course_grades)).count(),
         # Próximas evaluaciones del profesor
-        upcoming_evaluations = Evaluation.objects.filter(
-            course__teacher=user_data,
+        'upcoming_evaluations': list(Evaluation.objects.filter(
+            course__teacher=teacher,
             date__gt=timezone.now()
-        ).order_by('date')[:5]
-    
-    context = {
-        'user_type': user_type,
-        'user_data': user_data,
-        'evaluations': evaluations,
-        'approved_evaluations': approved_evaluations,
-        'courses_count': courses_count,
-        'upcoming_evaluations': upcoming_evaluations
+        ).select_related('course').order_by('date')[:5]),
     }
-    
-    # Agregar total_students solo para profesores
-    if user_type == 'teacher':
-        context['total_students'] = total_students
-    
-    return render(request, 'dashboard.html', context)
 
 def update_evaluations(request):
     user_type = request.session.get('user_type')
@@ -191,8 +204,10 @@ def classroom(request):
     user_id = request.session.get('user_id')
     
     if user_type == 'student':
-        user_data = Student.objects.get(ci=user_id)
-        courses = Course.objects.filter(grade=user_data.grade)
+        user_data = request.school_user
+        courses = cached('classroom', [grade_tag(user_data.grade)], lambda: list(
+            Course.objects.filter(grade=user_data.grade).select_related('teacher')
+        ))
         log_user_activity(request, 'VIEW', 'Accedió a aulas virtuales')
         
         return render(request, 'classroom.html', {
@@ -201,8 +216,14 @@ def classroom(request):
             'courses': courses
         })
     else:
-        teacher = Teacher.objects.get(ci=user_id)
-        courses = Course.objects.filter(teacher=teacher)
+        teacher = request.school_user
+        # Contadores anotados en lugar de course.materials.count por materia
+        courses = cached('classroom', [user_tag('teacher', teacher.ci)], lambda: list(
+            Course.objects.filter(teacher=teacher).annotate(
+                materials_count=Count('materials', distinct=True),
+                announcements_count=Count('announcements', distinct=True),
+            )
+        ))
         
         return render(request, 'classroom.html', {
             'user_type': user_type,
@@ -217,7 +238,7 @@ def manage_evaluations(request):
         messages.error(request, 'No tienes permisos para acceder a esta página')
         return redirect('home')
     
-    teacher = Teacher.objects.get(ci=user_id)
+    teacher = request.school_user
     courses = Course.objects.filter(teacher=teacher)
     evaluations = Evaluation.objects.filter(course__teacher=teacher).order_by('-date')
     
@@ -239,7 +260,7 @@ def create_evaluation(request):
     
     if request.method == 'POST':
         try:
-            teacher = Teacher.objects.get(ci=user_id)
+            teacher = request.school_user
             course_id = request.POST['course_id']
             course = Course.objects.get(id=course_id, teacher=teacher)
             
@@ -265,7 +286,7 @@ def delete_evaluation(request, eval_id):
         return redirect('home')
     
     try:
-        teacher = Teacher.objects.get(ci=user_id)
+        teacher = request.school_user
         evaluation = Evaluation.objects.get(id=eval_id, course__teacher=teacher)
         evaluation.delete()
         messages.success(request, 'Evaluación eliminada exitosamente')
@@ -281,10 +302,7 @@ def profile(request):
     if not user_type or not user_id:
         return redirect('home')
     
-    if user_type == 'student':
-        user_data = Student.objects.get(ci=user_id)
-    else:
-        user_data = Teacher.objects.get(ci=user_id)
+    user_data = request.school_user
     
     return render(request, 'profile.html', {
         'user_type': user_type,
@@ -302,15 +320,29 @@ def my_subjects(request):
         messages.error(request, 'Acceso denied')
         return redirect('dashboard')
     
-    user_data = Student.objects.get(ci=user_id)
+    user_data = request.school_user
     
     log_user_activity(request, 'VIEW', f'Visualizó lista de materias del grado {user_data.grade}')
     
+    subjects_data, overall_average = cached(
+        'my_subjects', [user_tag('student', user_data.ci), grade_tag(user_data.grade)],
+        lambda: student_subjects_data(user_data)
+    )
+    
+    return render(request, 'my_subjects.html', {
+        'user_type': user_type,
+        'user_data': user_data,
+        'subjects_data': subjects_data,
+        'overall_average': overall_average
+    })
+
+def student_subjects_data(user_data):
+    """Materias del grado con el promedio del estudiante en cada una (se guardan en caché)"""
     # Obtener todas las materias del grado del estudiante
-    all_courses = Course.objects.filter(grade=user_data.grade)
+    all_courses = Course.objects.filter(grade=user_data.grade).select_related('teacher')
     
-    # Obtener puntuaciones del estudiante
-    punctuations = Punctuation.objects.filter(student=user_data).select_related('evaluation__course')
+    # Estadísticas precalculadas del estudiante por materia
+    stats = {item.course_id: item for item in StudentCourseStats.objects.filter(student=user_data)}
     
     # Inicializar datos de materias
     subjects_data = {}
@@ -319,37 +351,18 @@ def my_subjects(request):
     
     # Crear entrada para todas las materias del grado
     for course in all_courses:
+        course_stats = stats.get(course.id)
         subjects_data[course.name_course] = {
             'course': course,
-            'scores': [],
-            'evaluations': [],
-            'average': 0
+            'evaluations_count': course_stats.count if course_stats else 0,
+            'average': float(course_stats.average) if course_stats else 0
         }
-    
-    # Agregar puntuaciones existentes
-    for punctuation in punctuations:
-        course_name = punctuation.evaluation.course.name_course
-        if course_name in subjects_data:
-            subjects_data[course_name]['scores'].append(float(punctuation.score))
-            subjects_data[course_name]['evaluations'].append(punctuation.evaluation)
-            total_score += float(punctuation.score)
-            total_count += 1
-            # Debug: imprimir información
-            print(f"Materia: {course_name}, Nota: {punctuation.score}, Evaluación: {punctuation.evaluation.subject}")
-    
-    # Calcular promedios
-    for subject in subjects_data.values():
-        if subject['scores']:
-            subject['average'] = sum(subject['scores']) / len(subject['scores'])
+        if course_stats:
+            total_score += float(course_stats.total)
+            total_count += course_stats.count
     
     overall_average = total_score / total_count if total_count > 0 else 0
-    
-    return render(request, 'my_subjects.html', {
-        'user_type': user_type,
-        'user_data': user_data,
-        'subjects_data': subjects_data,
-        'overall_average': overall_average
-    })
+    return subjects_data, overall_average
 
 def subject_detail(request, subject_name):
     user_type = request.session.get('user_type')
@@ -359,7 +372,7 @@ def subject_detail(request, subject_name):
         messages.error(request, 'Acceso denegado')
         return redirect('dashboard')
     
-    user_data = Student.objects.get(ci=user_id)
+    user_data = request.school_user
     
     # Obtener el curso específico
     try:
@@ -376,9 +389,11 @@ def subject_detail(request, subject_name):
     
     log_user_activity(request, 'VIEW', f'Visualizó calificaciones de materia: {subject_name}')
     
-    # Calcular promedio
-    scores = [float(p.score) for p in punctuations]
-    average = sum(scores) / len(scores) if scores else 0
+    # Promedio precalculado del estudiante en la materia
+    average = StudentCourseStats.objects.filter(
+        student=user_data, course=course
+    ).values_list('average', flat=True).first()
+    average = float(average) if average is not None else 0
     
     return render(request, 'subject_detail.html', {
         'user_type': user_type,
@@ -397,34 +412,34 @@ def grade_evaluation(request, eval_id):
         messages.error(request, 'Acceso denegado')
         return redirect('dashboard')
     
-    teacher = Teacher.objects.get(ci=user_id)
-    evaluation = Evaluation.objects.get(id=eval_id, course__teacher=teacher)
+    teacher = request.school_user
+    evaluation = Evaluation.objects.select_related('course').get(id=eval_id, course__teacher=teacher)
     
     # Obtener estudiantes del grado de la materia
     students = Student.objects.filter(grade=evaluation.course.grade).order_by('name', 'last_name')
     
     if request.method == 'POST':
-        for student in students:
-            score_key = f'score_{student.ci}'
-            if score_key in request.POST and request.POST[score_key]:
-                score = float(request.POST[score_key])
-                # Crear o actualizar puntuación
-                punctuation, created = Punctuation.objects.get_or_create(
-                    evaluation=evaluation,
-                    student=student,
-                    defaults={'score': score}
-                )
-                if not created:
-                    punctuation.score = score
-                    punctuation.save()
-        
-        log_user_activity(request, 'UPDATE', f'Registró notas para evaluación: {evaluation.subject}')
-        messages.success(request, 'Notas registradas correctamente')
+        # Validar todas las notas antes de escribir
+        raw_scores = [
+            (key[len('score_'):], value)
+            for key, value in request.POST.items()
+            if key.startswith('score_')
+        ]
+        scores, errors = validate_scores(raw_scores, students.values_list('ci', flat=True))
+        if errors:
+            for error in errors:
+                messages.error(request, error)
+            return redirect('grade_evaluation', eval_id=evaluation.id)
+        
+        # Crear o actualizar todas las puntuaciones en una sola transacción
+        inserted, updated = save_scores(evaluation, scores)
+        
+        log_user_activity(request, 'UPDATE', f'Registró notas para evaluación: {evaluation.subject} ({len(inserted)} nuevas, {len(updated)} actualizadas)')
+        messages.success(request, f'Notas registradas correctamente: {len(inserted)} nuevas, {len(updated)} actualizadas')
         return redirect('manage_evaluations')
     
-    # Obtener puntuaciones existentes y agregar a estudiantes
-    punctuations = Punctuation.objects.filter(evaluation=evaluation)
-    scores_dict = {p.student.ci: p.score for p in punctuations}
+    # Obtener puntuaciones existentes sin cargar cada estudiante
+    scores_dict = dict(Punctuation.objects.filter(evaluation=evaluation).values_list('student_id', 'score'))
     
     # Agregar score a cada estudiante
     students_with_scores = []
@@ -436,19 +451,101 @@ def grade_evaluation(request, eval_id):
         'user_type': user_type,
         'user_data': teacher,
         'evaluation': evaluation,
-        'students': students_with_scores
+        'students': students_with_scores,
+        'xlsx_supported': xlsx_supported(),
     })
 
+def import_grades(request, eval_id):
+    user_type = request.session.get('user_type')
+    
+    if user_type != 'teacher':
+        messages.error(request, 'Acceso denegado')
+        return redirect('dashboard')
+    
+    teacher = request.school_user
+    try:
+        evaluation = Evaluation.objects.select_related('course').get(id=eval_id, course__teacher=teacher)
+    except Evaluation.DoesNotExist:
+        messages.error(request, 'Evaluación no encontrada')
+        return redirect('manage_evaluations')
+    
+    grades_file = request.FILES.get('grades_file')
+    if request.method != 'POST' or not grades_file:
+        messages.error(request, 'Debe seleccionar un archivo CSV o XLSX' if xlsx_supported() else 'Debe seleccionar un archivo CSV')
+        return redirect('grade_evaluation', eval_id=evaluation.id)
+    
+    try:
+        inserted, updated, errors = import_gradebook(evaluation, grades_file)
+    except GradebookImportError as e:
+        messages.error(request, str(e))
+        return redirect('grade_evaluation', eval_id=evaluation.id)
+    
+    if errors:
+        # Mostrar solo los primeros errores para no llenar la página
+        for error in errors[:20]:
+            messages.error(request, error)
+        if len(errors) > 20:
+            messages.error(request, f'... y {len(errors) - 20} errores más. No se guardó ninguna nota.')
+        return redirect('grade_evaluation', eval_id=evaluation.id)
+    
+    log_user_activity(request, 'UPDATE', f'Importó notas de {grades_file.name} para evaluación: {evaluation.subject} ({len(inserted)} nuevas, {len(updated)} actualizadas)')
+    messages.success(request, f'Notas importadas: {len(inserted)} nuevas, {len(updated)} actualizadas')
+    return redirect('grade_evaluation', eval_id=evaluation.id)
+
+def export_grades(request):
+    user_type = request.session.get('user_type')
+    
+    if user_type not in ['teacher', 'admin']:
+        messages.error(request, 'Acceso denegado')
+        return redirect('dashboard')
+    
+    evaluation_id = request.GET.get('evaluation')
+    course_id = request.GET.get('course')
+    
+    evaluations = Evaluation.objects.select_related('course')
+    punctuations = Punctuation.objects.all()
+    if user_type == 'teacher':
+        evaluations = evaluations.filter(course__teacher=request.school_user)
+        punctuations = punctuations.filter(evaluation__course__teacher=request.school_user)
+    
+    if evaluation_id:
+        try:
+            evaluation = evaluations.get(id=evaluation_id)
+        except (Evaluation.DoesNotExist, ValueError):
+            messages.error(request, 'Evaluación no encontrada')
+            return redirect('dashboard')
+        rows = iter_evaluation_gradebook(evaluation)
+        filename = f'notas_evaluacion_{evaluation.id}.csv'
+        description = f'Exportó notas de la evaluación: {evaluation.subject}'
+    elif course_id:
+        if not course_id.isdigit():
+            messages.error(request, 'Materia no encontrada')
+            return redirect('dashboard')
+        punctuations = punctuations.filter(evaluation__course_id=course_id)
+        rows = iter_gradebook(punctuations)
+        filename = f'notas_materia_{course_id}.csv'
+        description = f'Exportó notas de la materia {course_id}'
+    else:
+        rows = iter_gradebook(punctuations)
+        filename = 'notas.csv'
+        description = 'Exportó planilla de notas'
+    
+    log_user_activity(request, 'EXPORT', description)
+    
+    response = StreamingHttpResponse(rows, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 def student_reports(request):
     user_type = request.session.get('user_type')
     user_id = request.session.get('user_id')
     
     if user_type == 'admin':
-        admin_data = Admin.objects.get(ci=user_id)
+        admin_data = request.school_user
         students = Student.objects.all().order_by('name', 'last_name')
         user_data = admin_data
     elif user_type == 'teacher':
-        teacher = Teacher.objects.get(ci=user_id)
+        teacher = request.school_user
         teacher_courses = Course.objects.filter(teacher=teacher)
         students = Student.objects.filter(grade__in=teacher_courses.values('grade')).distinct().order_by('name', 'last_name')
         user_data = teacher
@@ -519,155 +616,18 @@ def generate_student_report(request, student_ci):
         messages.error(request, 'Acceso denegado')
         return redirect('dashboard')
     
-    if user_type == 'admin':
-        user_data = Admin.objects.get(ci=user_id)
-    else:
-        user_data = Teacher.objects.get(ci=user_id)
+    user_data = request.school_user
     
     student = Student.objects.get(ci=student_ci)
     
-    # Obtener materias del grado del estudiante
-    courses = Course.objects.filter(grade=student.grade)
-    
-    # Obtener calificaciones del estudiante
-    report_data = []
-    total_score = 0
-    total_count = 0
-    
-    for course in courses:
-        punctuations = Punctuation.objects.filter(
-            student=student,
-            evaluation__course=course
-        ).select_related('evaluation')
-        
-        scores = [float(p.score) for p in punctuations]
-        average = sum(scores) / len(scores) if scores else 0
-        
-        if scores:
-            total_score += average
-            total_count += 1
-        
-        report_data.append({
-            'course': course,
-            'punctuations': punctuations,
-            'average': average,
-            'status': 'Aprobado' if average >= 10 else 'Reprobado'
-        })
-    
-    overall_average = total_score / total_count if total_count > 0 else 0
+    # Materias, notas y promedios del estudiante en consultas agrupadas
+    report = build_student_report(student)
     
     if request.GET.get('pdf'):
         try:
-            from django.http import HttpResponse
-            from reportlab.pdfgen import canvas
-            from reportlab.lib.pagesizes import letter
-            from reportlab.lib.colors import HexColor, black, white
-            from reportlab.lib.units import inch
-            from datetime import datetime
-            
             response = HttpResponse(content_type='application/pdf')
             response['Content-Disposition'] = f'attachment; filename="boletin_{student.name}_{student.last_name}.pdf"'
-            
-            p = canvas.Canvas(response, pagesize=letter)
-            width, height = letter
-            
-            # Colors
-            primary_color = HexColor('#667eea')
-            secondary_color = HexColor('#764ba2')
-            
-            # Header background
-            p.setFillColor(primary_color)
-            p.rect(0, height - 120, width, 120, fill=1, stroke=0)
-            
-            # Logo placeholder (circle)
-            p.setFillColor(white)
-            p.circle(80, height - 60, 30, fill=1, stroke=0)
-            p.setFillColor(primary_color)
-            p.setFont("Helvetica-Bold", 20)
-            p.drawString(75, height - 65, "T")
-            
-            # Institution info
-            p.setFillColor(white)
-            p.setFont("Helvetica-Bold", 24)
-            p.drawString(130, height - 45, "ThinkIt Academy")
-            p.setFont("Helvetica", 12)
-            p.drawString(130, height - 65, "Sistema de Gestion Academica")
-            p.drawString(130, height - 80, "Excelencia en Educacion")
-            
-            # Document title
-            p.setFillColor(black)
-            p.setFont("Helvetica-Bold", 20)
-            p.drawString(width/2 - 100, height - 150, "BOLETIN DE CALIFICACIONES")
-            
-            # Student info box
-            p.setStrokeColor(primary_color)
-            p.setLineWidth(2)
-            p.rect(50, height - 250, width - 100, 80, fill=0, stroke=1)
-            
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(70, height - 185, "INFORMACION DEL ESTUDIANTE")
-            
-            p.setFont("Helvetica", 11)
-            p.drawString(70, height - 205, f"Nombre: {student.name} {student.last_name}")
-            p.drawString(70, height - 220, f"Cedula: {student.ci}")
-            p.drawString(300, height - 205, f"Grado: {student.grade}")
-            p.drawString(300, height - 220, f"Fecha: {datetime.now().strftime('%d/%m/%Y')}")
-            p.drawString(300, height - 235, f"Promedio: {overall_average:.2f}")
-            
-            # Table header
-            y = height - 290
-            p.setFillColor(primary_color)
-            p.rect(50, y - 20, width - 100, 25, fill=1, stroke=0)
-            
-            p.setFillColor(white)
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(70, y - 12, "MATERIA")
-            p.drawString(250, y - 12, "PROMEDIO")
-            p.drawString(350, y - 12, "ESTADO")
-            p.drawString(450, y - 12, "OBSERVACION")
-            
-            # Table content
-            p.setFillColor(black)
-            p.setFont("Helvetica", 10)
-            y -= 35
-            row_count = 0
-            
-            for data in report_data:
-                if data['average'] > 0:
-                    # Alternate row colors
-                    if row_count % 2 == 0:
-                        p.setFillColor(HexColor('#f8f9fa'))
-                        p.rect(50, y - 15, width - 100, 20, fill=1, stroke=0)
-                    
-                    p.setFillColor(black)
-                    p.drawString(70, y - 5, str(data['course'].name_course))
-                    p.drawString(260, y - 5, f"{data['average']:.2f}")
-                    
-                    # Color-coded status
-                    if data['average'] >= 10:
-                        p.setFillColor(HexColor('#28a745'))
-                    else:
-                        p.setFillColor(HexColor('#dc3545'))
-                    p.drawString(360, y - 5, str(data['status']))
-                    
-                    # Observation
-                    p.setFillColor(black)
-                    obs = "Excelente" if data['average'] >= 15 else "Bueno" if data['average'] >= 12 else "Regular" if data['average'] >= 10 else "Deficiente"
-                    p.drawString(460, y - 5, obs)
-                    
-                    y -= 20
-                    row_count += 1
-            
-            # Footer
-            p.setFillColor(primary_color)
-            p.rect(0, 0, width, 50, fill=1, stroke=0)
-            p.setFillColor(white)
-            p.setFont("Helvetica", 8)
-            p.drawString(width/2 - 120, 25, "ThinkIt Academy - Sistema de Gestion Academica")
-            p.drawString(width/2 - 140, 15, "www.thinkit.edu | contacto@thinkit.edu | Tel: (555) 123-4567")
-            
-            p.showPage()
-            p.save()
+            render_report_pdf(report, response)
             return response
         except Exception as e:
             messages.error(request, f'Error al generar PDF: {str(e)}')
@@ -677,8 +637,8 @@ def generate_student_report(request, student_ci):
         'user_type': user_type,
         'user_data': user_data,
         'student': student,
-        'report_data': report_data,
-        'overall_average': overall_average
+        'report_data': report.rows,
+        'overall_average': report.overall_average
     })
 
 def teacher_subjects(request):
@@ -690,40 +650,13 @@ def teacher_subjects(request):
         messages.error(request, 'Acceso denegado')
         return redirect('dashboard')
     
-    teacher = Teacher.objects.get(ci=user_id)
+    teacher = request.school_user
     
     # Obtener materias asignadas al profesor
     courses = Course.objects.filter(teacher=teacher).order_by('grade', 'name_course')
     
-    # Obtener estadísticas por materia
-    subjects_data = []
-    for course in courses:
-        # Contar estudiantes del grado
-        students_count = Student.objects.filter(grade=course.grade).count()
-        
-        # Contar evaluaciones de la materia
-        evaluations_count = Evaluation.objects.filter(course=course).count()
-        
-        # Calcular promedio general de la materia
-        from django.db.models import Avg
-        avg_score = Punctuation.objects.filter(
-            evaluation__course=course
-        ).aggregate(avg=Avg('score'))['avg'] or 0
-        
-        # Próxima evaluación
-        from django.utils import timezone
-        next_evaluation = Evaluation.objects.filter(
-            course=course,
-            date__gt=timezone.now()
-        ).order_by('date').first()
-        
-        subjects_data.append({
-            'course': course,
-            'students_count': students_count,
-            'evaluations_count': evaluations_count,
-            'average_score': round(avg_score, 2),
-            'next_evaluation': next_evaluation
-        })
+    # Estudiantes, evaluaciones, promedio y próxima evaluación de todas las materias en dos consultas
+    subjects_data = get_course_stats(courses)
     
     return render(request, 'teacher_subjects.html', {
         'user_type': user_type,
@@ -739,10 +672,7 @@ def edit_profile(request):
     if not user_type or not user_id:
         return redirect('home')
     
-    if user_type == 'student':
-        user_data = Student.objects.get(ci=user_id)
-    else:
-        user_data = Teacher.objects.get(ci=user_id)
+    user_data = request.school_user
     
     if request.method == 'POST':
         try:
@@ -753,10 +683,17 @@ def edit_profile(request):
             if 'profile_photo' in request.FILES:
                 user_data.profile_photo = request.FILES['profile_photo']
             
-            user_data.save()
+            with transaction.atomic():
+                user_data.save()
+            remember_user(request, user_type, user_data)
             messages.success(request, 'Perfil actualizado exitosamente')
+        except IdentityConflictError as e:
+            messages.error(request, str(e))
+            # No se guardó nada: mostrar los datos actuales, no los rechazados
+            user_data.refresh_from_db()
         except Exception as e:
             messages.error(request, f'Error al actualizar el perfil: {str(e)}')
+            user_data.refresh_from_db()
     
     return render(request, 'edit_profile.html', {
         'user_type': user_type,
@@ -775,16 +712,17 @@ def virtual_classroom(request, course_id):
         return redirect('home')
     
     try:
-        course = Course.objects.get(id=course_id)
+        # La materia ya trae sus estadísticas (estudiantes, evaluaciones, promedio)
+        course = annotate_course_stats(Course.objects.select_related('teacher')).get(id=course_id)
         
         # Verificar acceso
         if user_type == 'student':
-            user_data = Student.objects.get(ci=user_id)
+            user_data = request.school_user
             if user_data.grade != course.grade:
                 messages.error(request, 'No tienes acceso a esta aula virtual')
                 return redirect('classroom')
         elif user_type == 'teacher':
-            user_data = Teacher.objects.get(ci=user_id)
+            user_data = request.school_user
             if course.teacher != user_data:
                 messages.error(request, 'No tienes acceso a esta aula virtual')
                 return redirect('classroom')
@@ -1,55 +1,388 @@
+import atexit
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
 from model_students.models import SystemLog
 
+# Configuración por defecto del buffer de logs (se puede sobreescribir con
+# SYSTEM_LOG_BUFFER en settings.py)
+DEFAULT_BUFFER_SETTINGS = {
+    'ENABLED': True,
+    'MAX_SIZE': 10000,        # Máximo de registros en memoria
+    'BATCH_SIZE': 200,        # Registros por bulk_create
+    'FLUSH_INTERVAL': 2.0,    # Segundos máximos antes de escribir un lote
+    'OVERFLOW': 'drop_oldest',  # drop_new, drop_oldest, block, sync
+    'BLOCK_TIMEOUT': 0.5,     # Espera máxima con la política "block"
+}
+
+OVERFLOW_POLICIES = ('drop_new', 'drop_oldest', 'block', 'sync')
+
+# Política de registro (se puede sobreescribir con SYSTEM_LOG_POLICY en settings.py)
+DEFAULT_POLICY_SETTINGS = {
+    'DISABLED_ACTIONS': [],   # Acciones que no se registran
+    'ALWAYS_LOG': ['CREATE', 'UPDATE', 'DELETE', 'BACKUP', 'RESTORE'],  # Nunca se filtran
+    'SAMPLE_RATES': {},       # Fracción registrada por vista (url_name) o por acción: {'home': 0.1}
+    'DEDUPE_ACTIONS': ['VIEW'],
+    'DEDUPE_WINDOW': 300,     # Segundos en que se ignora el mismo evento del mismo usuario (0 = no)
+    'DEDUPE_MAX_KEYS': 10000, # Eventos recordados para deduplicar
+}
+
+POLICY_OUTCOMES = ('logged', 'disabled', 'sampled', 'duplicate')
+
+
+def get_buffer_settings():
+    """Combina la configuración por defecto con SYSTEM_LOG_BUFFER"""
+    config = dict(DEFAULT_BUFFER_SETTINGS)
+    config.update(getattr(settings, 'SYSTEM_LOG_BUFFER', {}))
+    if config['OVERFLOW'] not in OVERFLOW_POLICIES:
+        raise ValueError(f"Política de desborde inválida: {config['OVERFLOW']}")
+    return config
+
+
+def get_policy_settings():
+    """Combina la configuración por defecto con SYSTEM_LOG_POLICY"""
+    config = dict(DEFAULT_POLICY_SETTINGS)
+    config.update(getattr(settings, 'SYSTEM_LOG_POLICY', {}))
+    for key, rate in config['SAMPLE_RATES'].items():
+        if not 0 <= rate <= 1:
+            raise ValueError(f'Tasa de muestreo inválida para {key}: {rate}')
+    return config
+
+
+class LogPolicy:
+    """Decide qué eventos se registran y cuenta cuántas escrituras se evitaron"""
+
+    def __init__(self, disabled_actions=(), always_log=(), sample_rates=None, dedupe_actions=(),
+                 dedupe_window=0, dedupe_max_keys=10000, rng=random.random):
+        self.disabled_actions = set(disabled_actions)
+        self.always_log = set(always_log)
+        self.sample_rates = dict(sample_rates or {})
+        self.dedupe_actions = set(dedupe_actions)
+        self.dedupe_window = dedupe_window
+        self.dedupe_max_keys = dedupe_max_keys
+        self.rng = rng
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()
+        self._counts = {}
+
+    def decide(self, action, user_key, description, view_name=None):
+        """Devuelve 'logged' si el evento se debe registrar, o el motivo para omitirlo"""
+        outcome = self._outcome(action, user_key, description, view_name)
+        with self._lock:
+            counts = self._counts.setdefault(action, dict.fromkeys(POLICY_OUTCOMES, 0))
+            counts[outcome] += 1
+        return outcome
+
+    def _outcome(self, action, user_key, description, view_name):
+        if action in self.always_log:
+            return 'logged'
+        if action in self.disabled_actions:
+            return 'disabled'
+
+        rate = self.sample_rates.get(view_name, self.sample_rates.get(action, 1.0))
+        if rate < 1 and self.rng() >= rate:
+            return 'sampled'
+
+        if action in self.dedupe_actions and self.dedupe_window > 0:
+            key = (user_key, action, description)
+            now = time.monotonic()
+            with self._lock:
+                # Las claves quedan en orden de registro: las vencidas están al principio
+                while self._seen and next(iter(self._seen.values())) <= now - self.dedupe_window:
+                    self._seen.popitem(last=False)
+                if key in self._seen:
+                    return 'duplicate'
+                self._seen[key] = now
+                if len(self._seen) > self.dedupe_max_keys:
+                    self._seen.popitem(last=False)
+        return 'logged'
+
+    def stats(self):
+        """Eventos registrados y omitidos, en total y por acción"""
+        with self._lock:
+            by_action = {action: dict(counts) for action, counts in sorted(self._counts.items())}
+        totals = dict.fromkeys(POLICY_OUTCOMES, 0)
+        for counts in by_action.values():
+            counts['skipped'] = counts['disabled'] + counts['sampled'] + counts['duplicate']
+            for outcome in POLICY_OUTCOMES:
+                totals[outcome] += counts[outcome]
+        totals['skipped'] = totals['disabled'] + totals['sampled'] + totals['duplicate']
+        total = totals['logged'] + totals['skipped']
+        totals['saved_percent'] = round(100 * totals['skipped'] / total, 1) if total else 0.0
+        totals['by_action'] = by_action
+        return totals
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class LogBuffer:
+    """Cola acotada de logs que un hilo en segundo plano escribe por lotes"""
+
+    def __init__(self, max_size=10000, batch_size=200, flush_interval=2.0,
+                 overflow='drop_oldest', block_timeout=0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._worker = None
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def put(self, record):
+        """Encola un SystemLog sin guardar; devuelve False si se descartó"""
+        self._ensure_worker()
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == 'drop_new':
+                self._count('dropped')
+                return False
+            elif self.overflow == 'drop_oldest':
+                try:
+                    self._queue.get_nowait()
+                    self._count('dropped')
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(record)
+                except queue.Full:
+                    self._count('dropped')
+                    return False
+            elif self.overflow == 'block':
+                try:
+                    self._queue.put(record, timeout=self.block_timeout)
+                except queue.Full:
+                    self._count('dropped')
+                    return False
+            else:
+                # Política "sync": escribir directamente en el hilo actual
+                self._count('queued')
+                self._write([record])
+                return True
+
+        self._count('queued')
+        return True
+
+    def flush(self):
+        """Escribe de inmediato todo lo pendiente en el hilo actual"""
+        written = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def stop(self, timeout=5.0):
+        """Detiene el hilo y vacía la cola (se llama al cerrar el proceso)"""
+        self._stop_event.set()
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            worker.join(timeout)
+        self.flush()
+
+    def stats(self):
+        """Contadores del buffer"""
+        with self._lock:
+            return {
+                'queued': self.queued,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'pending': self._queue.qsize(),
+            }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stop_event.clear()
+            self._worker = threading.Thread(target=self._run, name='system-log-writer', daemon=True)
+            self._worker.start()
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0.05)))
+                except queue.Empty:
+                    pass
+
+                # Escribir por tamaño o por tiempo
+                if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                    self._write(batch)
+                    batch = []
+                if not batch or time.monotonic() >= deadline:
+                    deadline = time.monotonic() + self.flush_interval
+        finally:
+            if batch:
+                self._write(batch)
+            connection.close()
+
+    def _write(self, batch):
+        with self._write_lock:
+            try:
+                SystemLog.objects.bulk_create(batch, batch_size=self.batch_size)
+            except Exception as e:
+                self._count('failed', len(batch))
+                print(f'Error al crear logs: {e}')
+                return 0
+        self._count('flushed', len(batch))
+        return len(batch)
+
+
+_log_buffer = None
+_log_buffer_lock = threading.Lock()
+
+
+def get_log_buffer():
+    """Devuelve el buffer de logs del proceso, creándolo si no existe"""
+    global _log_buffer
+    if _log_buffer is None:
+        with _log_buffer_lock:
+            if _log_buffer is None:
+                config = get_buffer_settings()
+                _log_buffer = LogBuffer(
+                    max_size=config['MAX_SIZE'],
+                    batch_size=config['BATCH_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    overflow=config['OVERFLOW'],
+                    block_timeout=config['BLOCK_TIMEOUT'],
+                )
+                atexit.register(_log_buffer.stop)
+    return _log_buffer
+
+
+_log_policy = None
+
+
+def get_log_policy():
+    """Devuelve la política de logs del proceso, creándola si no existe"""
+    global _log_policy
+    if _log_policy is None:
+        with _log_buffer_lock:
+            if _log_policy is None:
+                config = get_policy_settings()
+                _log_policy = LogPolicy(
+                    disabled_actions=config['DISABLED_ACTIONS'],
+                    always_log=config['ALWAYS_LOG'],
+                    sample_rates=config['SAMPLE_RATES'],
+                    dedupe_actions=config['DEDUPE_ACTIONS'],
+                    dedupe_window=config['DEDUPE_WINDOW'],
+                    dedupe_max_keys=config['DEDUPE_MAX_KEYS'],
+                )
+    return _log_policy
+
+
+def log_policy_stats():
+    """Escrituras de logs evitadas por la política"""
+    return get_log_policy().stats()
+
+
+def stop_log_buffer():
+    """Escribe lo pendiente, detiene el hilo y descarta el buffer del proceso.
+
+    El ejecutor de pruebas lo llama antes de borrar la base de prueba; si no, la
+    cola se escribiría al salir del intérprete en la base de datos real.
+    """
+    global _log_buffer
+    with _log_buffer_lock:
+        buffer, _log_buffer = _log_buffer, None
+    if buffer is None:
+        return
+    atexit.unregister(buffer.stop)
+    buffer.stop()
+
+
+def flush_logs():
+    """Escribe los logs pendientes del buffer (si existe)"""
+    if _log_buffer is None:
+        return 0
+    return _log_buffer.flush()
+
+
+def log_buffer_stats():
+    """Contadores de logs encolados, escritos y descartados"""
+    if _log_buffer is None:
+        return {'queued': 0, 'flushed': 0, 'dropped': 0, 'failed': 0, 'pending': 0}
+    return _log_buffer.stats()
+
+
 def log_user_activity(request, action, description):
     """Registra la actividad del usuario en el sistema"""
     user_type = request.session.get('user_type')
     user_id = request.session.get('user_id')
-    
+
     # Solo registrar si hay usuario logueado
     if not user_type or not user_id:
         return
-    
-    # Obtener nombre del usuario
-    if user_type == 'student':
-        from model_students.models import Student
-        try:
-            user = Student.objects.get(ci=user_id)
-            user_name = f"{user.name} {user.last_name}"
-        except:
-            user_name = "Usuario desconocido"
-    elif user_type == 'teacher':
-        from model_students.models import Teacher
-        try:
-            user = Teacher.objects.get(ci=user_id)
-            user_name = f"{user.name} {user.last_name}"
-        except:
-            user_name = "Usuario desconocido"
-    elif user_type == 'admin':
-        from model_students.models import Admin
-        try:
-            user = Admin.objects.get(ci=user_id)
-            user_name = f"{user.name} {user.last_name}"
-        except:
-            user_name = "Usuario desconocido"
-    else:
-        user_name = "Usuario desconocido"
-    
+
+    # La política se aplica antes de buscar el nombre: un evento omitido no cuesta nada
+    match = getattr(request, 'resolver_match', None)
+    view_name = match.url_name if match else None
+    if get_log_policy().decide(action, (user_type, str(user_id)), description, view_name) != 'logged':
+        return
+
+    # Obtener nombre del usuario (copia guardada en la sesión al iniciar sesión)
+    from pages.identity import get_user_name
+    user_name = get_user_name(request)
+
     # Obtener IP
     ip_address = request.META.get('HTTP_X_FORWARDED_FOR')
     if ip_address:
         ip_address = ip_address.split(',')[0]
     else:
         ip_address = request.META.get('REMOTE_ADDR')
-    
+
+    log = SystemLog(
+        user_type=user_type,
+        user_id=str(user_id),
+        user_name=user_name,
+        action=action,
+        description=description,
+        ip_address=ip_address or '127.0.0.1',
+        timestamp=timezone.now()
+    )
+
+    # Encolar el log; el hilo de escritura lo guarda por lotes
+    if get_buffer_settings()['ENABLED']:
+        get_log_buffer().put(log)
+        return
+
     # Crear log
     try:
-        SystemLog.objects.create(
-            user_type=user_type,
-            user_id=str(user_id),
-            user_name=user_name,
-            action=action,
-            description=description,
-            ip_address=ip_address or '127.0.0.1'
-        )
+        log.save()
     except Exception as e:
-        print(f'Error al crear log: {e}')
\ No newline at end of file
+        print(f'Error al crear log: {e}')